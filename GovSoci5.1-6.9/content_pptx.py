@@ -1,10 +1,26 @@
 """Content engine for PPT generation (中文版)."""
-import anthropic
 import re
+import sys
+from pathlib import Path
 from typing import Optional, Dict, Any
 
-from config_pptx import ANTHROPIC_API_KEY, CLAUDE_MODEL, CLAUDE_MODEL_FALLBACKS, LLM_WORD_COUNT
-from env_log_reader import load_latest_environment_log, get_prompt_context
+if __package__:
+    # 由 shared.engine_loader 以套件載入（wrapper）
+    from .config_pptx import ANTHROPIC_API_KEY, CLAUDE_MODEL, CLAUDE_MODEL_FALLBACKS, LLM_WORD_COUNT
+    from .env_log_reader import load_latest_environment_log, get_prompt_context
+else:
+    # 直接執行（main_pptx.py）
+    from config_pptx import ANTHROPIC_API_KEY, CLAUDE_MODEL, CLAUDE_MODEL_FALLBACKS, LLM_WORD_COUNT
+    from env_log_reader import load_latest_environment_log, get_prompt_context
+
+# 共享模組（LLM 快取等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+from shared.llm_cache import cached_completion
+from shared.anthropic_pool import get_anthropic_client
+from shared.model_resolver import resolve_model
+from shared.report_context import ReportContext
 
 LLM_WORD_COUNT = 280
 # 中文約 1.5 字 = 1 英文單字，所以 280 英文單字約等於 420 中文字
@@ -19,14 +35,19 @@ META_PREFIXES = (
 
 
 class PPTContentEngine:
-    def __init__(self):
-        if not ANTHROPIC_API_KEY:
+    def __init__(self, context: Optional[ReportContext] = None):
+        # API Key / session_id 由呼叫端的 context 傳入；未指定時使用 config 的預設值
+        self.context = context or ReportContext()
+        self.api_key = self.context.api_key or ANTHROPIC_API_KEY
+        if not self.api_key:
             raise RuntimeError("ANTHROPIC_API_KEY is not configured.")
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.client = get_anthropic_client(self.api_key)
         self.model = self._resolve_model()
         # 載入環境段 log 資料
         self.env_log_data = self._load_environment_log()
-        self.env_context = get_prompt_context(self.env_log_data)
+        self.env_context = get_prompt_context(
+            self.env_log_data, log_dir=self.context.log_dir, session_id=self.context.session_id
+        )
 
     def _resolve_model(self) -> str:
         candidates = []
@@ -36,15 +57,8 @@ class PPTContentEngine:
             if fallback not in candidates:
                 candidates.append(fallback)
 
-        try:
-            available = [m.id for m in self.client.models.list().data]
-        except Exception:
-            available = []
-
-        for candidate in candidates:
-            if candidate in available:
-                return candidate
-        return candidates[0] if candidates else "claude-3-haiku-20240307"
+        # 可用模型清單依 API key 快取（記憶體 + 磁碟），過期時背景刷新，不阻塞引擎建構
+        return resolve_model(self.client, self.api_key, candidates, default="claude-3-haiku-20240307")
 
     def _call(self, prompt: str, word_count: int = LLM_WORD_COUNT, is_chinese: bool = True) -> str:
         """
@@ -62,17 +76,7 @@ class PPTContentEngine:
         else:
             content = f"Respond in English with exactly {word_count} words.\n\n{prompt}"
         
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=word_count * 5,
-            messages=[
-                {
-                    "role": "user",
-                    "content": content,
-                }
-            ],
-        )
-        text = response.content[0].text if response.content else ""
+        text = cached_completion(self.client, self.model, content, max_tokens=word_count * 5)
         return self._clean(text, is_chinese=is_chinese)
 
     @staticmethod
@@ -117,12 +121,13 @@ class PPTContentEngine:
 
     def _load_environment_log(self) -> Optional[Dict[str, Any]]:
         """
-        載入最新的環境段 log 資料
+        載入環境段 log 資料（context 指定 session_id 時讀取該 session，否則讀取最新的；
+        context 指定 log_dir 時讀取該資料夾）
         
         Returns:
             Log 資料 dict，如果找不到則返回 None
         """
-        return load_latest_environment_log()
+        return load_latest_environment_log(log_dir=self.context.log_dir, session_id=self.context.session_id)
 
     # Slide-specific generators (中文版)
     def generate_governance_overview(self) -> str:
@@ -4,10 +4,22 @@ Reads standardized environment log files and provides data for LLM prompts.
 """
 import json
 import os
+import sys
 from pathlib import Path
 from typing import Optional, Dict, Any
 from datetime import datetime
 
+# 共享模組（session log 索引等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+try:
+    from shared.session_store import get_session_store
+    from shared.session_journal import read_session_log
+except ImportError:
+    get_session_store = None
+    read_session_log = None
+
 
 # ============ Log 標準格式 ============
 # 標準 log 檔案格式（JSON）：
@@ -29,12 +41,13 @@ from datetime import datetime
 DEFAULT_LOG_DIR = Path(r"C:\Users\User\Desktop\ESG_Output\_Backend\user_logs")
 
 
-def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+def load_latest_environment_log(log_dir: Optional[Path] = None, session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     讀取最新的環境段 log 檔案
     
     Args:
         log_dir: Log 資料夾路徑（預設使用 DEFAULT_LOG_DIR）
+        session_id: 指定讀取的 session（找不到時退回最新的 log）
     
     Returns:
         解析後的 log 資料 dict，如果找不到則返回 None
@@ -48,19 +61,51 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
         print(f"[WARN] Log directory not found: {log_dir}")
         return None
     
-    # 尋找所有 JSON 檔案
+    store = get_session_store() if get_session_store else None
+    if store is not None:
+        # 以索引查詢最新的 log，不再對資料夾中每個檔案做 stat
+        store.ensure_indexed(log_dir)
+        requested = store.session_logs(log_dir, session_id) if session_id else []
+        latest = requested[-1] if requested else store.latest(log_dir)
+        if latest is None:
+            print(f"[WARN] No log files found in: {log_dir}")
+            return None
+        latest_name, data = latest
+        standardized = _standardize_log_data(data)
+        print(f"[OK] Loaded environment log: {latest_name}")
+        return standardized
+    
+    # 索引不可用時退回掃描資料夾
     json_files = list(log_dir.glob("*.json"))
     
     if not json_files:
         print(f"[WARN] No log files found in: {log_dir}")
         return None
     
-    # 按修改時間排序，取最新的
-    latest_file = max(json_files, key=lambda f: f.stat().st_mtime)
+    # 按修改時間排序，取最新的（指定 session_id 時取該 session 最新的）
+    json_files.sort(key=lambda f: f.stat().st_mtime, reverse=True)
+    latest_file = json_files[0]
+    
+    def read(log_file: Path) -> Dict[str, Any]:
+        if read_session_log:
+            # 快照 + session 日誌尾端
+            return read_session_log(log_file)[0]
+        with open(log_file, "r", encoding="utf-8") as f:
+            return json.load(f)
     
     try:
-        with open(latest_file, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        data = None
+        if session_id:
+            for log_file in json_files:
+                try:
+                    candidate = read(log_file)
+                except Exception:
+                    continue
+                if candidate.get("session_id") == session_id:
+                    latest_file, data = log_file, candidate
+                    break
+        if data is None:
+            data = read(latest_file)
         
         # 轉換為標準格式（如果來源格式不同）
         standardized = _standardize_log_data(data)
@@ -135,18 +180,21 @@ def _standardize_log_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
     return standardized
 
 
-def get_prompt_context(log_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+def get_prompt_context(log_data: Optional[Dict[str, Any]] = None, log_dir: Optional[Path] = None,
+                       session_id: Optional[str] = None) -> Dict[str, str]:
     """
     從 log 資料中提取用於 LLM prompt 的上下文
     
     Args:
-        log_data: Log 資料（如果為 None，則自動讀取最新的）
+        log_data: Log 資料（如果為 None，則以 log_dir / session_id 讀取最新的）
+        log_dir: 同 load_latest_environment_log（呼叫端的 ReportContext.log_dir）
+        session_id: 同 load_latest_environment_log（呼叫端的 ReportContext.session_id）
     
     Returns:
         包含 prompt 上下文的 dict
     """
     if log_data is None:
-        log_data = load_latest_environment_log()
+        log_data = load_latest_environment_log(log_dir=log_dir, session_id=session_id)
     
     if log_data is None:
         return {
@@ -1,5 +1,4 @@
 """Lightweight PPT engine supporting Layout A (text-right image) and Layout B (left media, right text)."""
-from pptx import Presentation
 from pptx.util import Pt, Inches
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE_TYPE
@@ -7,12 +6,32 @@ from pptx.enum.dml import MSO_LINE_DASH_STYLE
 from pptx.enum.text import PP_ALIGN
 from typing import List, Dict, Any, Optional, Tuple
 import re
-import importlib.util
 import os
+import sys
 from pathlib import Path
 
-from config_pptx import PPT_CONFIG, SLIDE_CONFIGS, SEED_TEMPLATE_PATH, OUTPUT_PATH
-from content_pptx import PPTContentEngine
+if __package__:
+    # 由 shared.engine_loader 以套件載入（wrapper）
+    from .config_pptx import PPT_CONFIG, SLIDE_CONFIGS, SEED_TEMPLATE_PATH, OUTPUT_PATH
+    from .content_pptx import PPTContentEngine
+else:
+    # 直接執行（main_pptx.py）
+    from config_pptx import PPT_CONFIG, SLIDE_CONFIGS, SEED_TEMPLATE_PATH, OUTPUT_PATH
+    from content_pptx import PPTContentEngine
+
+# 共享模組（元件註冊表、媒體去重、模板快取等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+from shared.component_registry import (
+    component_files_from_configs,
+    get_component_attr,
+    warm_up_components,
+    warmup_enabled,
+)
+from shared.media_dedup import add_picture
+from shared.template_cache import layout_ref, load_template, resolve_layout
+from shared.report_context import ReportContext
 
 CM_TO_INCH = 1 / 2.54
 
@@ -22,25 +41,46 @@ def cm(value: float) -> float:
 
 
 class PPTFullEngine:
-    def __init__(self, content_engine: PPTContentEngine):
+    def __init__(self, content_engine: PPTContentEngine, context: Optional[ReportContext] = None):
         if not os.path.exists(SEED_TEMPLATE_PATH):
             raise FileNotFoundError(f"Seed template missing: {SEED_TEMPLATE_PATH}")
         
-        # 載入 handdrawppt.pptx 模板
-        self.prs = Presentation(SEED_TEMPLATE_PATH)
         self.content_engine = content_engine
         self.slide_configs = SLIDE_CONFIGS
-        self.output_path = Path(OUTPUT_PATH)
-        self.output_path.mkdir(exist_ok=True)
+        # 輸出目錄由 context 傳入（未指定時使用 config 的 OUTPUT_PATH）
+        context = context or content_engine.context
+        self.output_path = Path(context.output_dir or OUTPUT_PATH)
+        self.output_path.mkdir(parents=True, exist_ok=True)
         self.font_family = PPT_CONFIG.get("font_family", "Calibri")
+
+        # COMPONENT_WARMUP=1 -> 預先載入 SLIDE_CONFIGS 中的所有元件模組
+        if warmup_enabled():
+            warm_up_components(component_files_from_configs(self.slide_configs))
         
+        # 預先建立所有頁面（模板骨架每個程序只建立一次，之後從記憶體複製）
+        self.total_slides = PPT_CONFIG.get("total_slides", 18)
+        self.prs, template_meta = load_template(
+            SEED_TEMPLATE_PATH,
+            lambda prs: self._prepare_template(prs, self.total_slides),
+            variant=f"slides={self.total_slides}",
+        )
+        self.blank_layout = resolve_layout(self.prs, template_meta["blank_layout"])
+        self._slides_by_index = {idx: self.prs.slides[idx - 1] for idx in range(1, self.total_slides + 1)}
+        existing_slides = template_meta["existing_slides"]
+        print(f"[INFO] 預先建立 {self.total_slides} 張投影片完成（模板原有 {existing_slides} 頁，總共 {len(self.prs.slides)} 頁，索引字典 {len(self._slides_by_index)} 項）")
+
+    def _prepare_template(self, prs, total_slides: int) -> Dict[str, Any]:
+        """
+        模板骨架：找出乾淨的母版並預先建立 total_slides 張投影片（清除 placeholder 文字）
+        只在模板快取未命中時執行，返回版面位置等 metadata 供複本使用
+        """
         # 檢查模板中所有頁面，找到完全沒有 placeholder 的乾淨頁面
-        layouts = self.prs.slide_layouts
-        self.blank_layout = None
+        layouts = prs.slide_layouts
+        blank_layout = None
         
-        if len(self.prs.slides) > 0:
+        if len(prs.slides) > 0:
             # 遍歷模板中所有頁面，找到完全沒有 placeholder 的乾淨頁面
-            for idx, slide in enumerate(self.prs.slides):
+            for idx, slide in enumerate(prs.slides):
                 placeholder_count = 0
                 try:
                     for shape in slide.shapes:
@@ -49,8 +89,8 @@ class PPTFullEngine:
                     
                     # 如果這個頁面完全沒有 placeholder，使用它的母版
                     if placeholder_count == 0:
-                        self.blank_layout = slide.slide_layout
-                        layout_name = self.blank_layout.name if hasattr(self.blank_layout, 'name') else 'Unknown'
+                        blank_layout = slide.slide_layout
+                        layout_name = blank_layout.name if hasattr(blank_layout, 'name') else 'Unknown'
                         print(f"[INFO] 找到乾淨頁面（第 {idx + 1} 頁），使用其母版: {layout_name}")
                         break
                 except Exception as e:
@@ -58,52 +98,41 @@ class PPTFullEngine:
                     continue
             
             # 如果沒找到完全乾淨的，使用第一個頁面的母版（fallback）
-            if self.blank_layout is None:
-                self.blank_layout = self.prs.slides[0].slide_layout
-                layout_name = self.blank_layout.name if hasattr(self.blank_layout, 'name') else 'Unknown'
+            if blank_layout is None:
+                blank_layout = prs.slides[0].slide_layout
+                layout_name = blank_layout.name if hasattr(blank_layout, 'name') else 'Unknown'
                 print(f"[WARN] 未找到完全乾淨的頁面，使用第一頁的母版: {layout_name}")
         else:
             # 如果模板沒有現有頁面，使用最後一個 layout（通常是最簡單/最空白的）
             if len(layouts) > 0:
-                self.blank_layout = layouts[len(layouts) - 1]
-                layout_name = self.blank_layout.name if hasattr(self.blank_layout, 'name') else f'Layout {len(layouts)-1}'
+                blank_layout = layouts[len(layouts) - 1]
+                layout_name = blank_layout.name if hasattr(blank_layout, 'name') else f'Layout {len(layouts)-1}'
                 print(f"[INFO] 使用最後一個母版: {layout_name}")
             else:
-                self.blank_layout = layouts[0]
+                blank_layout = layouts[0]
                 print(f"[WARN] 使用第一個母版（fallback）")
         
         # 預先建立所有頁面（避免在生成過程中 add/clear，導致 PowerPoint 結構問題）
-        self.total_slides = PPT_CONFIG.get("total_slides", 18)
-        
         # 先創建 5 頁空白頁來確保母版是乾淨的
         # 然後用這個乾淨的母版來生成所有頁面
-        existing_slides = len(self.prs.slides)
-        needed_slides = self.total_slides
-        
-        # 確保總頁數正好是18頁（如果模板頁數不足，補足；如果過多，只使用前18頁）
-        self._slides_by_index = {}
+        existing_slides = len(prs.slides)
         
         # 先創建 5 頁空白頁（確保母版是乾淨的）
         for i in range(5):
-            new_slide = self.prs.slides.add_slide(self.blank_layout)
+            new_slide = prs.slides.add_slide(blank_layout)
             self._clear_placeholder_text_only(new_slide)
         
-        # 現在用這個乾淨的母版補足到 18 頁
-        while len(self.prs.slides) < needed_slides:
-            new_slide = self.prs.slides.add_slide(self.blank_layout)
+        # 現在用這個乾淨的母版補足到 total_slides 頁
+        while len(prs.slides) < total_slides:
+            new_slide = prs.slides.add_slide(blank_layout)
             # 立即清除所有 placeholder 中的預設文字（如「按一下已新增文字」）
             self._clear_placeholder_text_only(new_slide)
-            idx = len(self.prs.slides)
-            self._slides_by_index[idx] = new_slide
         
-        # 確保索引字典包含所有18頁的引用，並清除所有現有頁面的 placeholder 文字
-        for idx in range(1, needed_slides + 1):
-            if idx not in self._slides_by_index:
-                slide = self.prs.slides[idx - 1]
-                self._clear_placeholder_text_only(slide)
-                self._slides_by_index[idx] = slide
+        # 清除模板原有頁面的 placeholder 文字
+        for idx in range(min(existing_slides, total_slides)):
+            self._clear_placeholder_text_only(prs.slides[idx])
         
-        print(f"[INFO] 預先建立 {self.total_slides} 張投影片完成（模板原有 {existing_slides} 頁，總共 {len(self.prs.slides)} 頁，索引字典 {len(self._slides_by_index)} 項）")
+        return {"blank_layout": layout_ref(prs, blank_layout), "existing_slides": existing_slides}
 
     def generate(self):
         for idx in range(1, self.total_slides + 1):
@@ -247,7 +276,8 @@ class PPTFullEngine:
                 top_cm = background_cfg.get("top_cm", 3.0)
                 width_cm_val = background_cfg.get("width_cm")
                 height_cm_val = background_cfg.get("height_cm")
-                pic = slide.shapes.add_picture(
+                pic = add_picture(
+                    slide.shapes,
                     str(path),
                     Inches(cm(left_cm_val)),
                     Inches(cm(top_cm)),
@@ -269,7 +299,8 @@ class PPTFullEngine:
             image_width = cfg.get("image_width_cm", 14.0)
             top_cm = cfg.get("image_top_cm", 4.0)
             left_cm_val = cfg.get("image_left_cm", 19.0)
-            pic = slide.shapes.add_picture(
+            pic = add_picture(
+                slide.shapes,
                 str(image_path),
                 Inches(cm(left_cm_val)),
                 Inches(cm(top_cm)),
@@ -369,7 +400,7 @@ class PPTFullEngine:
             for path in paths:
                 if not Path(path).exists():
                     continue
-                pic = slide.shapes.add_picture(str(path), Inches(cm(area_left)), Inches(cm(current_top)), width=Inches(cm(width_cm_val)))
+                pic = add_picture(slide.shapes, str(path), Inches(cm(area_left)), Inches(cm(current_top)), width=Inches(cm(width_cm_val)))
                 pic.left = Inches(cm(area_right)) - pic.width
                 pictures.append(pic)
                 current_top += pic.height * CM_TO_INCH + gap_cm
@@ -405,7 +436,8 @@ class PPTFullEngine:
                     if not Path(path).exists():
                         continue
                     width_cm_current = widths_override[idx] if idx < len(widths_override) else width_cm_val
-                    pic = slide.shapes.add_picture(
+                    pic = add_picture(
+                        slide.shapes,
                         str(path),
                         Inches(cm(area_left)),
                         Inches(cm(area_top)),
@@ -436,7 +468,8 @@ class PPTFullEngine:
                 if not Path(right_path).exists():
                     return
                 right_width_cm = widths_override[len(paths) - 1] if len(widths_override) >= len(paths) else width_cm_val
-                right_pic = slide.shapes.add_picture(
+                right_pic = add_picture(
+                    slide.shapes,
                     str(right_path),
                     Inches(cm(area_left)),
                     Inches(cm(area_top)),
@@ -513,7 +546,8 @@ class PPTFullEngine:
                 if not Path(path).exists():
                     continue
                 current_width_cm = widths_override[idx] if idx < len(widths_override) else width_cm_val
-                pic = slide.shapes.add_picture(
+                pic = add_picture(
+                    slide.shapes,
                     str(path),
                     Inches(cm(area_left)),
                     Inches(cm(area_top)),
@@ -572,7 +606,7 @@ class PPTFullEngine:
             left_cm_val = media_cfg.get("area_left_cm", area_left)
             image_path = paths[0]
             if Path(image_path).exists():
-                slide.shapes.add_picture(str(image_path), Inches(cm(left_cm_val)), Inches(cm(top_cm)), width=Inches(cm(width_cm_val)))
+                add_picture(slide.shapes, str(image_path), Inches(cm(left_cm_val)), Inches(cm(top_cm)), width=Inches(cm(width_cm_val)))
 
     # ------------------------------------------------------------------
     # Layout C (top text, middle component/image, bottom text)
@@ -663,7 +697,8 @@ class PPTFullEngine:
                 left_cm_val = media_cfg.get("left_cm", 2.5)
                 top_offset_cm = media_cfg.get("top_cm", 8.5)
                 if image_path and Path(image_path).exists():
-                    slide.shapes.add_picture(
+                    add_picture(
+                        slide.shapes,
                         str(image_path),
                         Inches(cm(left_cm_val)),
                         Inches(cm(top_offset_cm)),
@@ -708,7 +743,8 @@ class PPTFullEngine:
             top_cm = cfg.get("image_top_cm", 0)
             
             # 先添加圖片作為背景
-            pic = slide.shapes.add_picture(
+            pic = add_picture(
+                slide.shapes,
                 str(image_path),
                 Inches(cm(left_cm)),
                 Inches(cm(top_cm)),
@@ -874,10 +910,8 @@ class PPTFullEngine:
             return
         class_name = media_cfg.get("class")
         method_name = media_cfg.get("method", "add_to_slide")
-        spec = importlib.util.spec_from_file_location("ppt_component", file_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)  # type: ignore
-        component_class = getattr(module, class_name)
+        # 元件模組每個程序只載入一次（依路徑與 mtime 快取）
+        component_class = get_component_attr(file_path, class_name)
         instance = component_class(self.prs, **media_cfg.get("init_kwargs", {}))
         method = getattr(instance, method_name)
         method(slide, **media_cfg.get("method_kwargs", {}))
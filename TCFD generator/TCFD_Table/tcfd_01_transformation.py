@@ -15,22 +15,8 @@ TYPE_NAME = "轉型風險"
 RISK_TYPES = ['政策與法規', '綠色產品與科技']
 
 
-def create_table(csv_lines, industry="企業", filename=None, output_dir=None):
-    """從 CSV 生成 TCFD PPTX
-    output_dir: 輸出資料夾（可選，預設使用內部 OUTPUT_DIR）
-    """
-    if output_dir is None:
-        output_dir = OUTPUT_DIR
-    else:
-        output_dir = Path(output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
-    
-    prs = Presentation()
-    # A4 橫向: 11.69" x 8.27"
-    prs.slide_width = Inches(11.69)
-    prs.slide_height = Inches(8.27)
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    
+def render_table(slide, csv_lines, industry="企業"):
+    """在指定的投影片上繪製標題與表格（環境篇直接在記憶體中組裝，不需要先輸出檔案）"""
     # 表格尺寸與置中計算（A4 橫向）
     slide_w = 11.69
     table_w = 10.0  # 表格寬度 ≈ 25cm
@@ -119,6 +105,27 @@ def create_table(csv_lines, industry="企業", filename=None, output_dir=None):
         if len(parts) >= 3:
             _set_bullet_text(tbl.cell(r, 5), parts[2])
     
+    return tbl
+
+
+def create_table(csv_lines, industry="企業", filename=None, output_dir=None):
+    """從 CSV 生成 TCFD PPTX
+    output_dir: 輸出資料夾（可選，預設使用內部 OUTPUT_DIR）
+    """
+    if output_dir is None:
+        output_dir = OUTPUT_DIR
+    else:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+    
+    prs = Presentation()
+    # A4 橫向: 11.69" x 8.27"
+    prs.slide_width = Inches(11.69)
+    prs.slide_height = Inches(8.27)
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    
+    render_table(slide, csv_lines, industry)
+    
     # 儲存
     if filename is None:
         from datetime import datetime
@@ -15,21 +15,8 @@ TYPE_NAME = "溫升風險"
 RISK_TYPES = ['升溫1.5°C情境', '升溫2°C以上情境']
 
 
-def create_table(csv_lines, industry="企業", filename=None, output_dir=None):
-    """從 CSV 生成 TCFD PPTX"""
-    if output_dir is None:
-        output_dir = OUTPUT_DIR
-    else:
-        output_dir = Path(output_dir)
-        output_dir.mkdir(parents=True, exist_ok=True)
-    
-    prs = Presentation()
-    # 16:9 寬螢幕
-    # A4 橫向: 11.69" x 8.27"
-    prs.slide_width = Inches(11.69)
-    prs.slide_height = Inches(8.27)
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    
+def render_table(slide, csv_lines, industry="企業"):
+    """在指定的投影片上繪製標題與表格（環境篇直接在記憶體中組裝，不需要先輸出檔案）"""
     # 表格尺寸與置中計算
     slide_w = 11.69  # A4 橫向
     table_w = 10.0   # 表格寬度 ≈ 25cm  # 表格寬度
@@ -118,6 +105,26 @@ def create_table(csv_lines, industry="企業", filename=None, output_dir=None):
         if len(parts) >= 3:
             _set_bullet_text(tbl.cell(r, 5), parts[2])
     
+    return tbl
+
+
+def create_table(csv_lines, industry="企業", filename=None, output_dir=None):
+    """從 CSV 生成 TCFD PPTX"""
+    if output_dir is None:
+        output_dir = OUTPUT_DIR
+    else:
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+    
+    prs = Presentation()
+    # 16:9 寬螢幕
+    # A4 橫向: 11.69" x 8.27"
+    prs.slide_width = Inches(11.69)
+    prs.slide_height = Inches(8.27)
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    
+    render_table(slide, csv_lines, industry)
+    
     # 儲存
     if filename is None:
         from datetime import datetime
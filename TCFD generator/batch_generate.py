@@ -0,0 +1,354 @@
+"""
+批次生成完整 ESG 報告（命令列，不需要 Streamlit）
+
+讀取 CSV / XLSX（每列一家公司：公司名稱、產業、月電費，選填碳排活動數據），
+每家公司執行 碳排放 -> Step 1 log -> 產業別分析 / TCFD 表格 -> 環境篇 / 公司段 / 治理與社會段 -> 合併
+（依 report_pipeline.STAGE_DEPENDENCIES 的相依圖，互不相依的階段同時執行），
+多家公司以行程池同時生成，最後輸出 manifest.json / manifest.csv。
+
+用法：
+    python batch_generate.py companies.xlsx --workers 4
+    python batch_generate.py companies.csv --output D:/ESG_Batch/2025Q1 --resume
+
+- 每家公司輸出到 <output>/<序號>_<公司名稱>/，引擎的輸出訊息寫入該資料夾的 run.log
+- 每完成一個階段就寫入 status.json；--resume 時已完成的公司直接略過，
+  失敗的公司只重新執行未完成的階段與依賴它們的階段（已完成階段的輸出檔案仍存在時才沿用）
+- API Key 只在記憶體中傳給工作行程，不寫入 status.json / manifest
+
+欄位（英文或中文標題皆可）：
+    company_name / 公司名稱、industry / 產業、monthly_bill_ntd / 月電費
+    選填（任一欄位有值時使用 Detail 模式）：price_per_kwh_ntd / 每度電價、annual_kwh / 年用電量、
+    car_count / 汽車台數、motorcycles / 機車台數、gasoline_liters_year / 汽油、
+    refrigerant_leak_kg / 冷媒逸散、refrigerant_gwp / 冷媒GWP
+
+環境變數：
+- BATCH_WORKERS     -> 預設同時生成的公司數（預設 2）
+- ANTHROPIC_API_KEY -> 未指定 --api-key 時使用
+"""
+import argparse
+import contextlib
+import csv
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).parent))
+from shared.config import ESG_OUTPUT_ROOT
+from shared.dag_scheduler import StageFailed
+from shared.report_pipeline import EMISSION_ACTIVITY_FIELDS
+
+BATCH_OUTPUT_ROOT = ESG_OUTPUT_ROOT / "Batch"
+STATUS_FILE = "status.json"
+
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# 階段 -> 輸出檔案欄位（resume 時檔案不存在就重新執行）
+STAGE_OUTPUT_FILES = {
+    "environment": "path",
+    "company": "path",
+    "govsoci": "path",
+    "merge": "path",
+}
+
+# 標題（去除括號內的單位、空白，轉小寫） -> 欄位
+COLUMN_ALIASES = {
+    "company_name": "company_name", "company": "company_name", "公司名稱": "company_name", "公司": "company_name",
+    "industry": "industry", "產業": "industry", "產業別": "industry",
+    "monthly_bill_ntd": "monthly_bill_ntd", "monthly_bill": "monthly_bill_ntd", "月電費": "monthly_bill_ntd",
+    "price_per_kwh_ntd": "price_per_kwh_ntd", "每度電價": "price_per_kwh_ntd",
+    "annual_kwh": "annual_kwh", "年用電量": "annual_kwh",
+    "car_count": "car_count", "汽車台數": "car_count",
+    "motorcycles": "motorcycles", "機車台數": "motorcycles",
+    "gasoline_liters_year": "gasoline_liters_year", "汽油": "gasoline_liters_year",
+    "refrigerant_leak_kg": "refrigerant_leak_kg", "冷媒逸散": "refrigerant_leak_kg",
+    "refrigerant_gwp": "refrigerant_gwp", "冷媒gwp": "refrigerant_gwp",
+}
+REQUIRED_COLUMNS = ("company_name", "industry", "monthly_bill_ntd")
+
+
+# ============ 讀取輸入 ============
+def _normalize_header(header: Any) -> str:
+    text = re.sub(r"[（(].*?[）)]", "", str(header))
+    return re.sub(r"\s+", "", text).lower()
+
+
+def _to_text(value: Any) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value).strip()
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.replace(",", "").strip()
+        if not value:
+            return None
+    number = float(value)
+    return None if math.isnan(number) else number
+
+
+def load_companies(input_path: Path) -> List[Dict[str, Any]]:
+    """讀取 CSV / XLSX，返回 [{index, company_name, industry, monthly_bill_ntd, activity}]"""
+    import pandas as pd
+
+    input_path = Path(input_path)
+    if input_path.suffix.lower() in (".xlsx", ".xls"):
+        df = pd.read_excel(input_path, dtype=object)
+    else:
+        df = pd.read_csv(input_path, dtype=object, encoding="utf-8-sig")
+
+    columns = {}
+    for header in df.columns:
+        field = COLUMN_ALIASES.get(_normalize_header(header))
+        if field and field not in columns:
+            columns[field] = header
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ValueError(f"輸入檔缺少欄位: {', '.join(missing)}（現有欄位: {', '.join(map(str, df.columns))}）")
+
+    companies = []
+    for index, record in enumerate(df.to_dict("records"), start=1):
+        company_name = _to_text(record[columns["company_name"]])
+        if not company_name:
+            continue
+        monthly_bill = _to_number(record[columns["monthly_bill_ntd"]])
+        if not monthly_bill or monthly_bill <= 0:
+            raise ValueError(f"第 {index} 列（{company_name}）月電費無效: {record[columns['monthly_bill_ntd']]}")
+        activity = {}
+        for field in EMISSION_ACTIVITY_FIELDS:
+            if field in columns:
+                number = _to_number(record[columns[field]])
+                if number is not None:
+                    activity[field] = number
+        companies.append({
+            "index": index,
+            "company_name": company_name,
+            "industry": _to_text(record[columns["industry"]]) or "企業",
+            "monthly_bill_ntd": monthly_bill,
+            "activity": activity,
+        })
+    return companies
+
+
+def row_dir_name(company: Dict[str, Any]) -> str:
+    safe_name = re.sub(r'[\\/:*?"<>|\s]+', "_", company["company_name"]).strip("_")
+    return f"{company['index']:03d}_{safe_name}"
+
+
+# ============ 狀態檔 ============
+def _read_status(path: Path) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_status(path: Path, status: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp, path)
+
+
+def _stage_done(status: Dict[str, Any], stage: str) -> bool:
+    record = status["stages"].get(stage)
+    if not record or record.get("status") != SUCCEEDED:
+        return False
+    field = STAGE_OUTPUT_FILES.get(stage)
+    return not field or Path(record["result"][field]).exists()
+
+
+# ============ 單一公司（在工作行程中執行） ============
+def _run_stages(company: Dict[str, Any], row_dir: Path, status: Dict[str, Any], status_path: Path, options: Dict[str, Any]) -> None:
+    from shared import report_pipeline as pipeline
+    from shared.dag_scheduler import run_dag
+
+    stages = pipeline.build_report_stages(
+        options["api_key"],
+        company,
+        status["session_id"],
+        {"environment": row_dir / "C_Environment", "company": row_dir / "D_Company", "govsoci": row_dir / "F_Governance_Social"},
+        row_dir / f"ESG完整報告_{row_dir.name}.pptx",
+        uncertainty=options["uncertainty"],
+    )
+    lock = threading.Lock()
+    rerun = set()  # 重新執行的階段：依賴它們的階段也要重新執行（不沿用以舊輸入生成的結果）
+
+    def checkpointed(stage: str, func):
+        def run(upstream: Dict[str, Any]) -> Any:
+            with lock:
+                reuse = not rerun.intersection(pipeline.STAGE_DEPENDENCIES[stage]) and _stage_done(status, stage)
+                if not reuse:
+                    rerun.add(stage)
+            if reuse:
+                print(f"[Batch] 略過已完成的階段: {stage}")
+                return status["stages"][stage]["result"]
+            print(f"[Batch] ▶ {stage}")
+            started = time.time()
+            result = func(upstream)
+            with lock:
+                status["stages"][stage] = {"status": SUCCEEDED, "result": result, "seconds": round(time.time() - started, 1)}
+                _write_status(status_path, status)
+            return result
+        return run
+
+    run_dag({stage: checkpointed(stage, func) for stage, func in stages.items()}, pipeline.STAGE_DEPENDENCIES)
+
+
+def process_company(company: Dict[str, Any], output_root: str, options: Dict[str, Any]) -> Dict[str, Any]:
+    """生成單一公司的完整報告（工作行程的進入點），返回寫入 status.json 的狀態"""
+    row_dir = Path(output_root) / row_dir_name(company)
+    row_dir.mkdir(parents=True, exist_ok=True)
+    status_path = row_dir / STATUS_FILE
+
+    status = _read_status(status_path) if options["resume"] else None
+    if status and status.get("status") == SUCCEEDED and _stage_done(status, "merge"):
+        status["resumed"] = True
+        return status
+    if not status:
+        status = {
+            "index": company["index"],
+            "company_name": company["company_name"],
+            "industry": company["industry"],
+            "session_id": f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_batch{company['index']:03d}",
+            "stages": {},
+        }
+    status.update(status=FAILED, error=None, failed_stage=None, started_at=datetime.now().isoformat())
+
+    started = time.time()
+    with open(row_dir / "run.log", "a", encoding="utf-8") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        print(f"\n===== {status['started_at']} {company['company_name']} (session {status['session_id']}) =====")
+        try:
+            _run_stages(company, row_dir, status, status_path, options)
+            status["status"] = SUCCEEDED
+        except Exception as e:
+            traceback.print_exc(file=log)
+            status["failed_stage"] = ", ".join(e.failed) if isinstance(e, StageFailed) else None
+            status["error"] = str(e) or type(e).__name__
+
+    status["seconds"] = round(time.time() - started, 1)
+    status["finished_at"] = datetime.now().isoformat()
+    _write_status(status_path, status)
+    return status
+
+
+# ============ manifest ============
+def _manifest_row(status: Dict[str, Any]) -> Dict[str, Any]:
+    """status.json -> manifest 的一列（只保留輸出路徑與各階段耗時，不含 TCFD 內容）"""
+    stages = status.get("stages", {})
+    outputs = {stage: (stages.get(stage) or {}).get("result", {}).get("path")
+               for stage in STAGE_OUTPUT_FILES if stage in stages}
+    return {
+        "index": status["index"],
+        "company_name": status["company_name"],
+        "industry": status.get("industry", ""),
+        "session_id": status.get("session_id", ""),
+        "status": status["status"],
+        "report_path": outputs.pop("merge", None),
+        "slides": (stages.get("merge") or {}).get("result", {}).get("slides"),
+        "outputs": outputs,
+        "failed_stage": status.get("failed_stage"),
+        "error": status.get("error"),
+        "seconds": status.get("seconds"),
+        "stage_seconds": {stage: record.get("seconds") for stage, record in stages.items()},
+        "resumed": bool(status.get("resumed")),
+    }
+
+
+def write_manifest(output_root: Path, input_path: Path, statuses: List[Dict[str, Any]], started_at: str, workers: int) -> Path:
+    """輸出 manifest.json（批次摘要）與 manifest.csv（每家公司一列）"""
+    rows = sorted((_manifest_row(status) for status in statuses), key=lambda row: row["index"])
+    manifest = {
+        "input": str(input_path),
+        "output": str(output_root),
+        "started_at": started_at,
+        "finished_at": datetime.now().isoformat(),
+        "workers": workers,
+        "total": len(rows),
+        "succeeded": sum(1 for row in rows if row["status"] == SUCCEEDED),
+        "failed": sum(1 for row in rows if row["status"] == FAILED),
+        "companies": rows,
+    }
+    manifest_path = output_root / "manifest.json"
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+
+    csv_columns = ["index", "company_name", "industry", "status", "report_path", "slides", "failed_stage", "error", "seconds", "session_id"]
+    with open(output_root / "manifest.csv", "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=csv_columns, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+    return manifest_path
+
+
+# ============ 命令列 ============
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="批次生成完整 ESG 報告（CSV / XLSX，每列一家公司）")
+    parser.add_argument("input", type=Path, help="公司清單（.csv / .xlsx）")
+    parser.add_argument("--output", type=Path, default=None, help="輸出資料夾（預設 ESG_Output/Batch/<輸入檔名>）")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("BATCH_WORKERS", "2")), help="同時生成的公司數（預設 2）")
+    parser.add_argument("--resume", action="store_true", help="沿用輸出資料夾中的 status.json，略過已完成的公司與階段")
+    parser.add_argument("--uncertainty", action="store_true", help="計算碳排放 Monte Carlo 不確定性區間")
+    parser.add_argument("--api-key", default=os.getenv("ANTHROPIC_API_KEY", ""), help="Claude API Key（預設讀取 ANTHROPIC_API_KEY）")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = parse_args(argv)
+    if not args.api_key:
+        print("[Batch] ❌ 請以 --api-key 或環境變數 ANTHROPIC_API_KEY 提供 API Key")
+        return 2
+
+    companies = load_companies(args.input)
+    if not companies:
+        print(f"[Batch] ❌ {args.input} 沒有任何公司資料")
+        return 2
+
+    output_root = args.output or BATCH_OUTPUT_ROOT / args.input.stem
+    output_root.mkdir(parents=True, exist_ok=True)
+    workers = max(1, min(args.workers, len(companies)))
+    options = {"api_key": args.api_key, "resume": args.resume, "uncertainty": args.uncertainty}
+    started_at = datetime.now().isoformat()
+    print(f"[Batch] {len(companies)} 家公司，{workers} 個行程，輸出到 {output_root}")
+
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(process_company, company, str(output_root), options): company for company in companies}
+        for done, future in enumerate(as_completed(futures), start=1):
+            company = futures[future]
+            try:
+                row = future.result()
+            except Exception as e:
+                # 工作行程異常結束（例如記憶體不足），沒有寫出 status
+                row = {"index": company["index"], "company_name": company["company_name"], "industry": company["industry"],
+                       "status": FAILED, "error": f"工作行程異常結束: {e}", "stages": {}}
+            rows.append(row)
+            if row["status"] == SUCCEEDED:
+                note = "（沿用先前結果）" if row.get("resumed") else f"（{row.get('seconds', 0):.0f} 秒）"
+                print(f"[Batch] ✓ [{done}/{len(companies)}] {company['company_name']}{note}")
+            else:
+                print(f"[Batch] ❌ [{done}/{len(companies)}] {company['company_name']} 失敗於 {row.get('failed_stage')}: {row.get('error')}")
+
+    manifest_path = write_manifest(output_root, args.input, rows, started_at, workers)
+    failed = sum(1 for row in rows if row["status"] != SUCCEEDED)
+    print(f"[Batch] 完成：成功 {len(rows) - failed}、失敗 {failed}，manifest: {manifest_path}")
+    if failed:
+        print(f"[Batch] 💡 修正問題後以 --resume 重新執行，只會重跑失敗的階段")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
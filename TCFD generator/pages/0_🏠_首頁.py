@@ -35,6 +35,8 @@ st.info("""
 3. **Step 3**: 治理與社會段報告
 
 4. **Step 4**: 彙整總報告
+
+或使用 **🚀 一鍵生成完整報告**：輸入產業與月電費後一次完成 Step 1–4
 """)
 
 st.divider()
@@ -80,11 +82,14 @@ st.markdown("""
 請從左側導航選擇步驟，或點擊下方按鈕快速開始：
 """)
 
-col1, col2 = st.columns(2)
+col1, col2, col3 = st.columns(3)
 with col1:
     if st.button("🌍 開始 Step 1", use_container_width=True, type="primary"):
         switch_page("pages/1_🌍_碳排與TCFD氣候治理.py")
 with col2:
     if st.button("🏭 TCFD與環境段報告", use_container_width=True):
         switch_page("pages/2_🏭_TCFD報告生成器.py")
+with col3:
+    if st.button("🚀 一鍵生成完整報告", use_container_width=True):
+        switch_page("pages/7_🚀_一鍵完整報告.py")
 
@@ -5,168 +5,80 @@ import sys
 import zipfile
 import io
 import json
+import uuid
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 # 導入共享模組
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from shared.config import *
 from shared.utils import render_output_folder_links, render_api_key_input, render_sidebar_navigation, generate_report_summary, switch_page
-
-# 加入 TCFD_Table 路徑（tcfd_* 模組位於此目錄）
-tcfd_table_path = Path(__file__).parent.parent / "TCFD_Table"
-sys.path.insert(0, str(tcfd_table_path))
-
-# 從 TCFD_Table 目錄導入 tcfd 模組
-from tcfd_01_transformation import create_table as create_01
-from tcfd_02_market import create_table as create_02
-from tcfd_03_physical import create_table as create_03
-from tcfd_04_temperature import create_table as create_04
-from tcfd_05_resource import create_table as create_05
+from shared.anthropic_pool import get_anthropic_client
+from shared.session_journal import append_session_log
+from shared import speculation
+from shared.report_pipeline import COMPANY_ENGINE_PATH, estimate_emissions
+from shared.tcfd_tables import (
+    TABLES, TCFD_MODEL, build_prompt_params, calculate_company_profile,
+    create_tcfd_file, generate_tcfd_table, update_tcfd_summary,
+)
 
 # ============ 後台 Log 函數 ============
 def save_session_log(session_data):
-    """儲存用戶 session log 到 TCFD generator/logs 文件夾"""
+    """儲存用戶 session log 到 TCFD generator/logs 文件夾（附加到 session 日誌，不重寫整個檔案）"""
     # 使用 TCFD generator/logs 文件夾
     log_dir = Path(__file__).parent.parent / "logs"
-    log_dir.mkdir(parents=True, exist_ok=True)
     
-    # 使用現有的 session_id 或生成新的
-    session_id = session_data.get("session_id", datetime.now().strftime("%Y%m%d_%H%M%S"))
-    log_file = log_dir / f"session_{session_id}.json"
-    
-    # 如果文件已存在，讀取並合併數據
-    if log_file.exists():
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                existing_data = json.load(f)
-            # 合併數據（新數據覆蓋舊數據）
-            existing_data.update(session_data)
-            session_data = existing_data
-        except:
-            pass
-    
-    session_data["session_id"] = session_id
-    session_data["timestamp"] = datetime.now().isoformat()
-    
-    # 硬寫入 log 文件
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(session_data, f, ensure_ascii=False, indent=2)
-        f.flush()
-        import os
-        os.fsync(f.fileno())
+    log_file = append_session_log(log_dir, session_data)
     
     print(f"[TCFD Log] 已保存到: {log_file.name}")
     
     print(f"  ✓ Session log 已儲存: {log_file.name}")
     return log_file
 
-def calculate_company_profile(monthly_bill_ntd, industry_name):
-    """根據月電費估算公司規模和節能投資預算"""
-    annual_revenue_ntd = monthly_bill_ntd * 360
-    annual_revenue_wan = annual_revenue_ntd / 10000
-    
-    if annual_revenue_ntd > 100_000_000:
-        size = "中大型"
-    elif annual_revenue_ntd > 50_000_000:
-        size = "中型"
-    else:
-        size = "中小型"
-    
-    budget_ntd = annual_revenue_ntd * 0.02
-    budget_wan = budget_ntd / 10000
-    
-    revenue_display = f"{annual_revenue_wan:.0f}萬元 ({annual_revenue_ntd:,.0f})"
-    
-    return {
-        "monthly_bill_ntd": monthly_bill_ntd,
-        "annual_revenue_ntd": annual_revenue_ntd,
-        "annual_revenue_wan": annual_revenue_wan,
-        "revenue_display": revenue_display,
-        "revenue_for_prompt": f"{annual_revenue_wan:.0f}萬元",
-        "size": size,
-        "budget_ntd": budget_ntd,
-        "budget_wan": budget_wan,
-        "budget_display": f"{budget_wan:.1f}萬元",
-        "budget_for_prompt": f"{budget_wan:.1f}萬元"
-    }
+def export_tcfd_files(results):
+    """按需輸出 TCFD 表格 PPTX（供下載），返回 [{name, filename, path, data}]"""
+    exported = []
+    for r in results:
+        filepath = create_tcfd_file(TABLES[r["idx"]], r["lines"], r["industry"], OUTPUT_A_TCFD)
+        with open(filepath, "rb") as f:
+            file_data = f.read()
+        exported.append({
+            "name": r["name"],
+            "filename": filepath.name,
+            "path": filepath,
+            "data": file_data
+        })
+    return exported
+
+# ============ 預先生成（輸入穩定後先在背景呼叫 LLM） ============
+def tcfd_speculation_key(api_key, industry, monthly_bill):
+    """TCFD 表格的 prompt 只由產業與月電費（公司規模）決定"""
+    return (speculation.key_fingerprint(api_key), industry, float(monthly_bill))
+
+def industry_analysis_speculation_key(api_key, industry, monthly_bill, emission_total):
+    """產業別分析的 prompt 由產業、月電費與年碳排放總額決定"""
+    return (speculation.key_fingerprint(api_key), industry, float(monthly_bill), emission_total)
+
+def start_speculation(owner, api_key, industry, monthly_bill, emission_total):
+    """登錄 TCFD 表格與產業別分析的預先生成（輸入停止變動後才送出，輸入改變時捨棄）"""
+    company_profile = calculate_company_profile(monthly_bill, industry)
+    prompt_params = build_prompt_params(industry, company_profile)
 
-# 專家角色
-EXPERT_ROLE = "你是 ESG 的 GRI 和 TCFD 專家。"
+    def submit_tcfd(executor):
+        client = get_anthropic_client(api_key)
+        return [executor.submit(generate_tcfd_table, client, table, prompt_params, industry) for table in TABLES]
 
-# 5 個表格設定
-TABLES = [
-    {
-        "name": "01 轉型風險",
-        "create": create_01,
-        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 轉型風險分析，用繁體中文回答。
-本公司年營收約 {revenue}，請以此規模為基準。
-建議短期節能投資以營收的 2% 為基準（約 {budget}）。
-金額請以萬元為單位，避免使用億元或億美元。
-請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
-輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
-風險描述|||財務影響|||因應措施
-第1行：政策與法規風險
-第2行：綠色產品與科技風險
-只輸出 2 行，不要其他文字。"""
-    },
-    {
-        "name": "02 市場風險",
-        "create": create_02,
-        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 市場風險分析，聚焦 2026 年以後趨勢，用繁體中文回答。
-本公司年營收約 {revenue}，請以此規模為基準。
-建議短期節能投資以營收的 2% 為基準（約 {budget}）。
-金額請以萬元為單位，避免使用億元或億美元。
-請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
-輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
-風險描述|||財務影響|||因應措施
-第1行：消費者偏好變化風險
-第2行：市場需求變化風險
-只輸出 2 行，不要其他文字。"""
-    },
-    {
-        "name": "03 實體風險",
-        "create": create_03,
-        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 實體風險分析，用繁體中文回答。
-本公司年營收約 {revenue}，請以此規模為基準。
-建議短期節能投資以營收的 2% 為基準（約 {budget}）。
-金額請以萬元為單位，避免使用億元或億美元。
-請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
-輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
-風險描述|||財務影響|||因應措施
-第1行：極端氣候事件風險
-第2行：長期氣候變遷風險
-只輸出 2 行，不要其他文字。"""
-    },
-    {
-        "name": "04 溫升風險",
-        "create": create_04,
-        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 溫升情境風險分析，用繁體中文回答。
-本公司年營收約 {revenue}，請以此規模為基準。
-建議短期節能投資以營收的 2% 為基準（約 {budget}）。
-金額請以萬元為單位，避免使用億元或億美元。
-請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
-輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
-風險描述|||財務影響|||因應措施
-第1行：升溫1.5°C情境風險
-第2行：升溫2°C以上情境風險
-只輸出 2 行，不要其他文字。"""
-    },
-    {
-        "name": "05 資源效率",
-        "create": create_05,
-        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 資源效率機會分析，用繁體中文回答。
-本公司年營收約 {revenue}，請以此規模為基準。
-建議短期節能投資以營收的 2% 為基準（約 {budget}）。
-金額請以萬元為單位，避免使用億元或億美元。
-請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
-輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
-機會描述|||潛在效益|||行動方案
-第1行：能源效率提升機會
-第2行：資源循環利用機會
-只輸出 2 行，不要其他文字。"""
-    },
-]
+    def submit_industry_analysis(executor):
+        from shared.engine_loader import load_engine_module
+        analyze_industry = load_engine_module(COMPANY_ENGINE_PATH, "industry_analysis").analyze_industry
+        return [executor.submit(analyze_industry, industry, monthly_bill, emission_total, api_key=api_key, model=TCFD_MODEL)]
+
+    tcfd_key = tcfd_speculation_key(api_key, industry, monthly_bill)
+    analysis_key = industry_analysis_speculation_key(api_key, industry, monthly_bill, emission_total)
+    speculation.speculate(owner, "tcfd_tables", tcfd_key, submit_tcfd)
+    speculation.speculate(owner, "industry_analysis", analysis_key, submit_industry_analysis)
+    return speculation.progress(owner, "tcfd_tables", tcfd_key)
 
 # ============ 頁面配置 ============
 st.set_page_config(page_title="Step 1: 碳排與TCFD氣候治理", page_icon="🌍", layout="wide")
@@ -188,6 +100,14 @@ with col1:
 with col2:
     monthly_bill = st.number_input("💰 月電費（NTD）", value=0.0, min_value=0.0, key="monthly_bill")
 
+speculative_mode = st.checkbox(
+    "⚡ 預先生成（輸入完成後先在背景生成 TCFD 表格與產業別分析，按下按鈕時直接取用）",
+    value=speculation.speculation_enabled_by_default(),
+    key="speculative_mode",
+    help="產業、月電費或碳排放數據改變時會捨棄先前的結果重新生成，可能增加 API 用量",
+)
+SPECULATION_OWNER = st.session_state.setdefault("speculation_owner", uuid.uuid4().hex)
+
 st.divider()
 
 # 子步驟1: 碳排計算
@@ -199,6 +119,7 @@ BASE_DIR = Path(__file__).parent.parent.parent  # ESG--report/
 EMISSION_ENGINE_PATH = BASE_DIR / "emission"
 sys.path.insert(0, str(EMISSION_ENGINE_PATH))
 from emission_calc import Inputs, estimate
+from emission_uncertainty import DEFAULT_DRAWS, estimate_uncertainty
 
 # 選擇模式
 calc_mode = st.radio("估算模式", ["Quick (80%)", "Detail (95%)"], horizontal=True, key="calc_mode")
@@ -222,6 +143,37 @@ else:
         refrigerant_kg = st.number_input("冷媒逸散（kg/年）", value=2.0, key="ref_kg")
         refrigerant_gwp = st.number_input("冷媒 GWP", value=1000.0, key="ref_gwp")
 
+show_uncertainty = st.checkbox(
+    "📊 計算不確定性區間（Monte Carlo P5 / P50 / P95，顯示於排放表格）",
+    value=False,
+    key="show_emission_uncertainty",
+    help="對電價、電力係數、車輛里程與油耗、冷媒逸散量抽樣 10 萬次（固定亂數種子，結果可重現）",
+)
+
+# 預先生成：產業與月電費確定後，prompt 所需的公司規模與碳排放總額都已確定
+if speculative_mode and API_KEY and industry and monthly_bill > 0:
+    if st.session_state.get("emission_done"):
+        predicted_total = st.session_state.get("emission_data", {}).get("total")
+    elif "Quick" in calc_mode:
+        predicted_total = estimate_emissions(emission_monthly_bill)["total"]
+    else:
+        predicted_total = estimate_emissions(emission_monthly_bill, {
+            "price_per_kwh_ntd": price_per_kwh,
+            "annual_kwh": annual_kwh or None,
+            "car_count": car_count,
+            "motorcycles": motorcycles,
+            "gasoline_liters_year": gas_liters or None,
+            "refrigerant_leak_kg": refrigerant_kg,
+            "refrigerant_gwp": refrigerant_gwp,
+        })["total"]
+    tcfd_progress = start_speculation(SPECULATION_OWNER, API_KEY, industry, monthly_bill, predicted_total)
+    if tcfd_progress and tcfd_progress[1]:
+        st.caption(f"⚡ 背景預先生成 TCFD 表格：{tcfd_progress[0]}/{tcfd_progress[1]} 完成")
+    else:
+        st.caption("⚡ 輸入穩定後會在背景預先生成 TCFD 表格與產業別分析")
+elif not speculative_mode:
+    speculation.discard(SPECULATION_OWNER)
+
 if st.button("🧮 計算碳排放", type="primary", use_container_width=True, key="btn_emission"):
     if not API_KEY:
         st.error("請先在左側輸入 API Key")
@@ -263,6 +215,24 @@ if st.button("🧮 計算碳排放", type="primary", use_container_width=True, k
         
         st.markdown(f"**占比：** 電力 {result['占比(%)']['電力']}% | 車輛 {result['占比(%)']['車輛']}% | 冷媒 {result['占比(%)']['冷媒']}%")
         
+        # 不確定性區間（選用）
+        uncertainty = None
+        if show_uncertainty:
+            mc = estimate_uncertainty(inp)
+            uncertainty = {
+                "scope1": mc["Scope1_合計"],
+                "scope2": mc["Scope2_電力"],
+                "scope3": mc["Scope3_小項"],
+                "total": mc["總排放_S1S2"],
+            }
+            st.markdown(
+                f"**不確定性區間（P5–P95，{DEFAULT_DRAWS:,} 次抽樣）：** "
+                + " | ".join(
+                    f"{label} {band['p5']:.2f}–{band['p95']:.2f} t"
+                    for label, band in (("範疇一", uncertainty["scope1"]), ("範疇二", uncertainty["scope2"]), ("總排放", uncertainty["total"]))
+                )
+            )
+        
         # 準備 emission_data_for_pptx（無論 PPTX 生成是否成功都需要）
         emission_data_for_pptx = {
             "scope1": result['Scope1_合計'],
@@ -271,6 +241,7 @@ if st.button("🧮 計算碳排放", type="primary", use_container_width=True, k
             "gasoline": result['Scope1_車輛'],
             "refrigerant": result['Scope1_冷媒'],
             "electricity": result['Scope2_電力'],
+            "uncertainty": uncertainty,
             "占比": result['占比(%)']
         }
         
@@ -278,20 +249,22 @@ if st.button("🧮 計算碳排放", type="primary", use_container_width=True, k
         try:
             BASE_DIR = Path(__file__).parent.parent.parent  # ESG go/
             env_assets_path = BASE_DIR / "environment report" / "assets"
-            sys.path.insert(0, str(env_assets_path))
+            if str(env_assets_path) not in sys.path:
+                sys.path.insert(0, str(env_assets_path))
             
-            from emission_pptx import set_emission_data, create_emission_table_pptx, create_emission_pie_chart
+            from emission_pptx import build_emission_data, create_emission_table_pptx, create_emission_pie_chart
             
-            set_emission_data(emission_data_for_pptx)
+            # 排放數據以參數傳入（不修改 emission_pptx 的全域 EMISSION_DATA，其他 session 不受影響）
+            emission_table_data = build_emission_data(emission_data_for_pptx)
             
             # 生成表格 PPTX
             table_path = OUTPUT_B_EMISSION / f"Emission_Table_{result['總排放_S1S2']:.0f}t.pptx"
-            create_emission_table_pptx(str(table_path))
+            create_emission_table_pptx(str(table_path), emission_table_data)
             st.success(f"✅ 表格已生成：{table_path.name}")
             
             # 生成圓餅圖
             pie_path = OUTPUT_B_EMISSION / "Emission_PieChart.png"
-            create_emission_pie_chart(str(pie_path))
+            create_emission_pie_chart(str(pie_path), emission_table_data)
             st.success(f"✅ 圓餅圖已生成：{pie_path.name}")
             
         except Exception as e:
@@ -398,104 +371,88 @@ if st.button("🚀 生成 5 個 TCFD 表格", type="primary", use_container_widt
     
     # 初始化 Anthropic client（加入錯誤處理）
     try:
-        client = anthropic.Anthropic(api_key=API_KEY.strip())
+        client = get_anthropic_client(API_KEY)
     except Exception as e:
         st.error(f"❌ API Key 初始化失敗：{str(e)}")
         st.info("💡 請檢查 API Key 是否正確，或前往 https://console.anthropic.com/ 獲取新的 API Key")
         st.stop()
     
-    results = []
+    results_by_idx = {}
     tcfd_summary = {}
     
     progress_bar = st.progress(0)
     
     # 準備 prompt 參數
-    prompt_params = {
-        "industry": industry,
-        "revenue": company_profile["revenue_for_prompt"],
-        "budget": company_profile["budget_for_prompt"]
-    }
+    prompt_params = build_prompt_params(industry, company_profile)
+    
+    # 5 個表格互不相依：同時送出 LLM 請求，哪個先完成就先更新進度
+    executor = ThreadPoolExecutor(max_workers=len(TABLES), thread_name_prefix="tcfd-table")
+    speculative_futures = speculation.claim(
+        SPECULATION_OWNER, "tcfd_tables", tcfd_speculation_key(API_KEY, industry, monthly_bill)
+    ) if speculative_mode else None
+    if speculative_futures:
+        # 輸入與預先生成時相同：已完成的表格立即可用，進行中的接著等待
+        st.info(f"⚡ 使用背景預先生成的 {len(TABLES)} 個 TCFD 表格...")
+        futures = {future: idx for idx, future in enumerate(speculative_futures)}
+    else:
+        st.info(f"⏳ 同時生成 {len(TABLES)} 個 TCFD 表格...")
+        futures = {
+            executor.submit(generate_tcfd_table, client, table, prompt_params, industry): idx
+            for idx, table in enumerate(TABLES)
+        }
     
-    for idx, table in enumerate(TABLES):
-        st.info(f"⏳ {table['name']}...")
+    for done_count, future in enumerate(as_completed(futures), start=1):
+        idx = futures[future]
+        table = TABLES[idx]
         
         # LLM（加入錯誤處理）
         try:
-            response = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=1024,
-                messages=[{"role": "user", "content": table["prompt"].format(**prompt_params)}]
-            )
-            llm_output = response.content[0].text.strip()
-            lines = [line.strip() for line in llm_output.split('\n') if line.strip() and '|||' in line]
-            
-            # 偵錯：如果沒有解析到資料
-            if len(lines) == 0:
-                st.warning(f"⚠️ {table['name']} LLM 回傳格式異常，重試中...")
-                with st.expander(f"LLM 原始回應 - {table['name']}"):
-                    st.code(llm_output)
-                # 重試一次
-                try:
-                    response = client.messages.create(
-                        model="claude-sonnet-4-20250514",
-                        max_tokens=1024,
-                        messages=[{"role": "user", "content": table["prompt"].format(**prompt_params)}]
-                    )
-                    llm_output = response.content[0].text.strip()
-                    lines = [line.strip() for line in llm_output.split('\n') if line.strip() and '|||' in line]
-                except anthropic.AuthenticationError as auth_err:
-                    st.error(f"❌ API 認證失敗：{str(auth_err)}")
-                    st.info("💡 請檢查 API Key 是否正確或已過期")
-                    st.stop()
-                except Exception as retry_err:
-                    st.error(f"❌ 重試失敗：{str(retry_err)}")
-                    st.stop()
+            table_result = future.result()
         except anthropic.AuthenticationError as auth_err:
+            executor.shutdown(wait=False, cancel_futures=True)
             st.error(f"❌ API 認證失敗：{str(auth_err)}")
             st.info("💡 請檢查 API Key 是否正確或已過期。前往 https://console.anthropic.com/ 確認 API Key 狀態")
             st.stop()
         except anthropic.APIError as api_err:
-            st.error(f"❌ API 調用失敗：{str(api_err)}")
+            executor.shutdown(wait=False, cancel_futures=True)
+            st.error(f"❌ {table['name']} API 調用失敗：{str(api_err)}")
             st.info("💡 可能是 API 配額用盡或服務暫時不可用，請稍後再試")
             st.stop()
         except Exception as e:
-            st.error(f"❌ 發生錯誤：{str(e)}")
+            executor.shutdown(wait=False, cancel_futures=True)
+            st.error(f"❌ {table['name']} 發生錯誤：{str(e)}")
             st.stop()
         
-        # 擷取 TCFD 摘要
-        if idx == 0 and lines:  # 01 轉型風險
-            first_line = lines[0].split("|||")
-            if len(first_line) >= 1:
-                policy_desc = first_line[0].strip()[:200]
-                tcfd_summary["transformation_policy"] = policy_desc
-                tcfd_summary["transformation_raw"] = llm_output
-        
-        if idx == 1 and lines:  # 02 市場風險
-            first_line = lines[0].split("|||")
-            if len(first_line) >= 1:
-                market_desc = first_line[0].strip()[:200]
-                tcfd_summary["market_trend"] = market_desc
-                tcfd_summary["market_raw"] = llm_output
+        # 偵錯：格式異常的回應已在背景單獨重試，這裡顯示原始回應
+        for attempt, raw_output in enumerate(table_result["failed_outputs"], start=1):
+            st.warning(f"⚠️ {table['name']} LLM 回傳格式異常，已重試（第 {attempt} 次）")
+            with st.expander(f"LLM 原始回應 - {table['name']}（第 {attempt} 次）"):
+                st.code(raw_output)
         
-        # 生成 PPTX
-        filepath = table["create"](lines, industry, output_dir=OUTPUT_A_TCFD)
+        lines = table_result["lines"]
         
-        # 讀取檔案內容
-        with open(filepath, "rb") as f:
-            file_data = f.read()
+        # 擷取 TCFD 摘要
+        update_tcfd_summary(tcfd_summary, idx, table_result)
         
-        results.append({
-            "name": table["name"], 
-            "path": filepath,
-            "filename": filepath.name,
-            "data": file_data
-        })
+        results_by_idx[idx] = {
+            "name": table["name"],
+            "idx": idx,
+            "key": f"{idx + 1:02d}",
+            "industry": industry,
+            "lines": lines
+        }
         st.success(f"✅ {table['name']} 完成（{len(lines)} 行資料）")
         
-        progress_bar.progress((idx + 1) / len(TABLES))
+        progress_bar.progress(done_count / len(TABLES))
     
-    # 儲存結果到 session_state
+    executor.shutdown(wait=True)
+    # 依表格順序排列（下載區依賴順序）
+    results = [results_by_idx[idx] for idx in sorted(results_by_idx)]
+    
+    # 儲存結果到 session_state（環境篇直接使用 tcfd_tables 繪製表格；下載檔案重新按需產生）
     st.session_state.results = results
+    st.session_state.tcfd_tables = {r["key"]: r["lines"] for r in results}
+    st.session_state.tcfd_downloads = None
     st.session_state.tcfd_summary = tcfd_summary
     
     # 顯示擷取的摘要
@@ -506,11 +463,10 @@ if st.button("🚀 生成 5 個 TCFD 表格", type="primary", use_container_widt
             if "market_trend" in tcfd_summary:
                 st.markdown(f"**市場風險/趨勢：** {tcfd_summary['market_trend'][:100]}...")
     
-    # 儲存 TCFD 輸出資料夾路徑
+    # 儲存 TCFD 輸出資料夾路徑（下載檔案按需輸出到這裡）
     if results:
-        tcfd_output_folder = str(results[0]["path"].parent)
+        tcfd_output_folder = str(OUTPUT_A_TCFD)
         st.session_state.tcfd_output_folder = tcfd_output_folder
-        st.info(f"📁 TCFD 輸出資料夾：{tcfd_output_folder}")
     
     st.balloons()
     st.session_state.step1_done = True
@@ -537,15 +493,34 @@ if st.button("🚀 生成 5 個 TCFD 表格", type="primary", use_container_widt
         # 最簡單的導入方式
         if str(company_path) not in sys.path:
             sys.path.insert(0, str(company_path))
-        from industry_analysis import generate_industry_analysis, LOG_FILE_BASE
+        from industry_analysis import generate_industry_analysis, save_industry_analysis_to_log, LOG_FILE_BASE
+        
+        # 預先生成的結果（輸入相同時）補上 session_id 後寫入 log
+        industry_analysis_data = None
+        speculative_analysis = speculation.claim(
+            SPECULATION_OWNER, "industry_analysis",
+            industry_analysis_speculation_key(API_KEY, industry, monthly_bill, emission_data.get("total"))
+        ) if speculative_mode else None
+        if speculative_analysis:
+            try:
+                industry_analysis_data = dict(
+                    speculative_analysis[0].result(),
+                    session_id=session_id,
+                    timestamp=datetime.now().isoformat()
+                )
+                save_industry_analysis_to_log(industry_analysis_data)
+            except Exception as e:
+                print(f"[Speculation] 預先生成的產業別分析無法使用，重新生成: {e}")
+                industry_analysis_data = None
         
         # 調用函數（傳入 session_id、API_KEY 和 model）- 只寫入 log，不生成 pptx
         # 使用 Streamlit UI 輸入的 API_KEY 和與 TCFD 表格相同的模型
-        industry_analysis_data = generate_industry_analysis(
-            session_id=session_id, 
-            api_key=API_KEY.strip(),
-            model="claude-sonnet-4-20250514"  # 與 TCFD 5 個表格使用相同的模型
-        )
+        if industry_analysis_data is None:
+            industry_analysis_data = generate_industry_analysis(
+                session_id=session_id, 
+                api_key=API_KEY.strip(),
+                model=TCFD_MODEL  # 與 TCFD 5 個表格使用相同的模型
+            )
         
         analysis_text = industry_analysis_data.get("industry_analysis", "")
         analysis_length = len(analysis_text) if analysis_text else 0
@@ -613,40 +588,52 @@ if st.button("🚀 生成 5 個 TCFD 表格", type="primary", use_container_widt
         "results_count": len(results)
     }
     save_session_log(session_log)
-    
-    # 下載區
+
+# 下載區（TCFD PPTX 只在需要下載時才輸出）
+if st.session_state.get("results"):
     st.subheader("📁 下載 TCFD 報告")
     
-    # 打包全部下載 (ZIP)
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
-        for r in results:
-            zip_file.writestr(r["filename"], r["data"])
-    zip_buffer.seek(0)
-    
-    st.download_button(
-        label="📦 一次下載全部 (ZIP)",
-        data=zip_buffer.getvalue(),
-        file_name=f"TCFD_{industry}_全部報告.zip",
-        mime="application/zip",
-        use_container_width=True,
-        type="primary"
-    )
-    
-    st.divider()
-    st.write("或個別下載：")
-    
-    # 個別下載
-    cols = st.columns(2)
-    for idx, r in enumerate(results):
-        with cols[idx % 2]:
-            st.download_button(
-                label=f"⬇️ {r['name']}", 
-                data=r["data"], 
-                file_name=r["filename"], 
-                key=f"download_{idx}",
-                use_container_width=True
-            )
+    tcfd_downloads = st.session_state.get("tcfd_downloads")
+    if not tcfd_downloads:
+        if st.button("📁 輸出 TCFD 表格檔案（PPTX）", use_container_width=True, key="btn_tcfd_export"):
+            with st.spinner("正在輸出 TCFD 表格檔案..."):
+                tcfd_downloads = export_tcfd_files(st.session_state.results)
+            st.session_state.tcfd_downloads = tcfd_downloads
+            st.info(f"📁 TCFD 輸出資料夾：{OUTPUT_A_TCFD}")
+    
+    if tcfd_downloads:
+        tcfd_industry = st.session_state.results[0]["industry"]
+        
+        # 打包全部下載 (ZIP)
+        zip_buffer = io.BytesIO()
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for r in tcfd_downloads:
+                zip_file.writestr(r["filename"], r["data"])
+        zip_buffer.seek(0)
+        
+        st.download_button(
+            label="📦 一次下載全部 (ZIP)",
+            data=zip_buffer.getvalue(),
+            file_name=f"TCFD_{tcfd_industry}_全部報告.zip",
+            mime="application/zip",
+            use_container_width=True,
+            type="primary"
+        )
+        
+        st.divider()
+        st.write("或個別下載：")
+        
+        # 個別下載
+        cols = st.columns(2)
+        for idx, r in enumerate(tcfd_downloads):
+            with cols[idx % 2]:
+                st.download_button(
+                    label=f"⬇️ {r['name']}", 
+                    data=r["data"], 
+                    file_name=r["filename"], 
+                    key=f"download_{idx}",
+                    use_container_width=True
+                )
 
 st.divider()
 
@@ -760,7 +747,8 @@ else:
                     api_key=API_KEY,
                     industry=industry_name,
                     company_profile=company_profile,
-                    emission_data=emission_data
+                    emission_data=emission_data,
+                    tcfd_tables=st.session_state.get("tcfd_tables")
                 )
                 report = engine.generate()
                 
@@ -4,10 +4,10 @@ TCFD與環境段報告 - 輸入產業自動生成 PPTX
 """
 
 import streamlit as st
-import anthropic
 import json
 import io
 import re
+import sys
 from datetime import datetime
 from pathlib import Path
 from pptx import Presentation
@@ -16,6 +16,10 @@ from pptx.dml.color import RGBColor
 from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.enum.shapes import MSO_SHAPE
 
+# 導入共享模組
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from shared.anthropic_pool import get_anthropic_client
+
 # 設定 output 資料夾
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
 OUTPUT_DIR.mkdir(exist_ok=True)
@@ -368,7 +372,7 @@ if st.button("⚡ 生成 TCFD 報告", type="primary", use_container_width=True)
     else:
         with st.spinner(f"🤖 AI 正在分析 {industry_input} 的氣候風險..."):
             try:
-                client = anthropic.Anthropic(api_key=api_key)
+                client = get_anthropic_client(api_key)
                 
                 prompt = f"""請為「{industry_input}」產業生成一份 TCFD 氣候風險分析報告。
 
@@ -2,18 +2,14 @@
 import streamlit as st
 import sys
 import json
-import io
 from pathlib import Path
 from datetime import datetime
-from pptx import Presentation
-from pptx.util import Pt
-from pptx.dml.color import RGBColor
-from lxml import etree
 
 # 導入共享模組
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from shared.config import *
 from shared.utils import render_output_folder_links, render_api_key_input, render_sidebar_navigation
+from shared.pptx_merger import merge_pptx_packages
 
 # ============ PPTX 合併函數 ============
 def find_latest_pptx(directory):
@@ -29,176 +25,28 @@ def find_latest_pptx(directory):
     latest = max(pptx_files, key=lambda p: p.stat().st_mtime)
     return latest
 
-def normalize_fonts_in_slide(slide, target_font="Microsoft JhengHei"):
-    """統一投影片中的字體（避免字體不一致導致修復提示）"""
-    try:
-        for shape in slide.shapes:
-            if hasattr(shape, 'text_frame') and shape.text_frame:
-                for paragraph in shape.text_frame.paragraphs:
-                    for run in paragraph.runs:
-                        if run.font and run.font.name:
-                            # 統一替換字體
-                            run.font.name = target_font
-    except Exception as e:
-        # 字體統一失敗不影響合併
-        pass
-
 def merge_pptx_files(file_paths, output_path):
-    """合併多個 PPTX 文件（統一處理字體，避免修復提示）"""
+    """合併多個 PPTX 文件（在 zip / OPC 層直接複製投影片，並統一字體避免修復提示）"""
     if not file_paths:
         raise ValueError("沒有文件可以合併")
     
-    # 使用第一個文件作為基礎
-    base_prs = Presentation(str(file_paths[0]))
-    
-    # 刪除第一個文件的所有投影片（我們要重新添加）
-    while len(base_prs.slides) > 0:
-        rId = base_prs.slides._sldIdLst[0].rId
-        base_prs.part.drop_rel(rId)
-        del base_prs.slides._sldIdLst[0]
-    
-    total_slides = 0
-    
     # 統一使用的字體（使用環境段的字體，因為它最完整）
     unified_font = "Microsoft JhengHei"
     
+    existing_paths = []
     for file_path in file_paths:
         if not file_path or not file_path.exists():
             st.warning(f"⚠️ 跳過不存在的文件：{file_path}")
             continue
-        
-        try:
-            source_prs = Presentation(str(file_path))
-            
-            # 確保簡報尺寸一致
-            if total_slides == 0:
-                base_prs.slide_width = source_prs.slide_width
-                base_prs.slide_height = source_prs.slide_height
-            
-            # 使用更可靠的方法：直接複製投影片的完整 XML
-            # 安全地獲取空白版面（避免索引超出範圍）
-            blank_layout = None
-            
-            # 首先檢查是否有可用的布局
-            if len(base_prs.slide_layouts) == 0:
-                st.error(f"❌ 模板文件沒有可用的版面配置：{file_path.name}")
-                continue
-            
-            # 嘗試找到空白布局
-            for layout in base_prs.slide_layouts:
-                try:
-                    name = (layout.name or "").lower()
-                except Exception:
-                    name = ""
-                if "blank" in name or "空白" in name or "title only" in name:
-                    blank_layout = layout
-                    break
-            
-            # 如果找不到空白布局，使用第一個可用的布局
-            if blank_layout is None:
-                try:
-                    blank_layout = base_prs.slide_layouts[0]
-                except IndexError:
-                    st.error(f"❌ 無法獲取版面配置：{file_path.name}")
-                    continue
-            
-            for slide in source_prs.slides:
-                # 創建新的投影片（使用空白版面）
-                new_slide = base_prs.slides.add_slide(blank_layout)
-                
-                # 獲取原始投影片的 XML
-                source_xml = slide.element
-                
-                # 清空新投影片的預設內容
-                for shape in list(new_slide.shapes):
-                    sp = shape._element
-                    sp.getparent().remove(sp)
-                
-                # 直接複製整個投影片的 XML（包括版面配置）
-                # 複製 cSld (common slide data) - 這是投影片的主要內容
-                source_cSld = source_xml.find('.//{http://schemas.openxmlformats.org/presentationml/2006/main}cSld')
-                if source_cSld is not None:
-                    # 找到新投影片的 cSld
-                    new_cSld = new_slide.element.find('.//{http://schemas.openxmlformats.org/presentationml/2006/main}cSld')
-                    if new_cSld is not None:
-                        # 清空新投影片的 cSld
-                        for child in list(new_cSld):
-                            new_cSld.remove(child)
-                        # 複製所有子元素（深層複製）
-                        for child in source_cSld:
-                            new_cSld.append(etree.fromstring(etree.tostring(child, encoding='unicode').encode('utf-8')))
-                
-                # 複製投影片的關係（圖片、媒體等）- 這很重要！
-                # 需要先複製關係，再複製 XML，這樣圖片引用才能正確
-                rel_map = {}  # 映射原始關係 ID 到新關係 ID
-                
-                for rel in slide.part.rels.values():
-                    try:
-                        if rel.is_external:
-                            continue
-                        
-                        # 獲取關係的目標部分（圖片數據）
-                        target_part = rel.target_part
-                        
-                        # 複製關係到新投影片
-                        new_rel = new_slide.part.rels.add_relationship(
-                            rel.rtype,
-                            rel.target_ref,
-                            target_part
-                        )
-                        
-                        # 記錄關係映射（原始 ID -> 新 ID）
-                        rel_map[rel.rId] = new_rel.rId
-                        
-                    except Exception as rel_error:
-                        # 如果關係複製失敗，嘗試直接複製圖片 blob
-                        try:
-                            if 'image' in rel.target_ref.lower() or rel.rtype.endswith('image'):
-                                # 嘗試從形狀中直接複製圖片
-                                for shape in slide.shapes:
-                                    if hasattr(shape, 'image') and shape.image:
-                                        try:
-                                            # 直接複製圖片到新投影片
-                                            left = shape.left
-                                            top = shape.top
-                                            width = shape.width
-                                            height = shape.height
-                                            image_blob = shape.image.blob
-                                            new_slide.shapes.add_picture(
-                                                io.BytesIO(image_blob),
-                                                left, top, width, height
-                                            )
-                                        except:
-                                            pass
-                        except:
-                            pass
-                
-                # 更新 XML 中的關係引用（將原始關係 ID 替換為新的關係 ID）
-                if rel_map:
-                    for old_rId, new_rId in rel_map.items():
-                        # 在投影片 XML 中替換關係引用
-                        xml_str = etree.tostring(new_slide.element, encoding='unicode')
-                        xml_str = xml_str.replace(f'rId="{old_rId}"', f'rId="{new_rId}"')
-                        xml_str = xml_str.replace(f'r:id="{old_rId}"', f'r:id="{new_rId}"')
-                        new_slide.element = etree.fromstring(xml_str.encode('utf-8'))
-                
-                # 統一字體（避免字體不一致導致修復提示）
-                normalize_fonts_in_slide(new_slide, unified_font)
-                
-                total_slides += 1
-            
-            st.success(f"✅ 已合併：{file_path.name} ({len(source_prs.slides)} 頁，字體已統一為 {unified_font})")
-            
-        except Exception as e:
-            st.error(f"❌ 合併 {file_path.name} 時出錯：{e}")
-            import traceback
-            st.code(traceback.format_exc())
-            # 繼續處理下一個文件
-            continue
+        existing_paths.append(file_path)
+    
+    def on_file_done(file_path, slide_count, error):
+        if error is not None:
+            st.error(f"❌ 合併 {file_path.name} 時出錯：{error}")
+        else:
+            st.success(f"✅ 已合併：{file_path.name} ({slide_count} 頁，字體已統一為 {unified_font})")
     
-    # 儲存合併後的簡報
-    base_prs.save(str(output_path))
-    return total_slides
+    return merge_pptx_packages(existing_paths, output_path, unified_font=unified_font, on_file_done=on_file_done)
 
 # 頁面配置
 st.set_page_config(page_title="Step 4: 彙整總報告", page_icon="📚", layout="wide")
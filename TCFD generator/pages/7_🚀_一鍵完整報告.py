@@ -0,0 +1,196 @@
+"""一鍵生成完整報告（Step 1–4 依相依圖平行執行）"""
+import streamlit as st
+import sys
+import time
+from pathlib import Path
+
+# 導入共享模組
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from shared.config import *
+from shared.utils import render_output_folder_links, render_api_key_input, render_sidebar_navigation, switch_page
+from shared.job_queue import FAILED, QUEUED, RUNNING, SUCCEEDED
+from shared.report_jobs import FULL_REPORT, get_report_job_queue, submit_section_job
+from shared.report_pipeline import STAGE_DEPENDENCIES, STAGE_LABELS, new_session_id
+
+# 背景工作輪詢間隔（秒）
+JOB_POLL_SECONDS = 2
+
+STAGE_STATUS_ICONS = {
+    "pending": "⬜ 等待中",
+    "running": "🔄 執行中",
+    "succeeded": "✅ 完成",
+    "failed": "❌ 失敗",
+    "skipped": "⏭️ 略過（前置階段失敗）",
+}
+
+
+def render_stage_status(detail):
+    """顯示每個階段的狀態與耗時"""
+    stages = (detail or {}).get("stages") or {}
+    now = time.time()
+    rows = []
+    for stage in STAGE_DEPENDENCIES:
+        state = stages.get(stage, {"status": "pending"})
+        seconds = state.get("seconds")
+        if seconds is None and state.get("started_at"):
+            seconds = round(now - state["started_at"], 1)
+        rows.append({
+            "階段": STAGE_LABELS[stage],
+            "前置階段": "、".join(STAGE_LABELS[dep] for dep in STAGE_DEPENDENCIES[stage]) or "—",
+            "狀態": STAGE_STATUS_ICONS.get(state["status"], state["status"]),
+            "耗時（秒）": f"{seconds:.0f}" if seconds is not None else "",
+            "錯誤": state.get("error") or "",
+        })
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
+# 頁面配置
+st.set_page_config(page_title="一鍵生成完整報告", page_icon="🚀", layout="wide")
+
+# 側邊欄（自定義導航）
+render_sidebar_navigation()
+st.sidebar.divider()
+API_KEY = render_api_key_input()
+render_output_folder_links()
+
+# 主頁面
+st.title("🚀 一鍵生成完整報告")
+st.info(
+    "輸入產業與月電費後一次完成 Step 1–4：碳排放 → TCFD 表格 + 產業別分析 → 環境篇 / 公司段 / 治理與社會段 → 彙整。"
+    "互不相依的階段同時執行，總時間約等於最長的一條路徑。"
+)
+
+# 背景工作狀態（job_id 同時放在網址參數，重新整理頁面後仍可取回）
+job_id = st.session_state.get("full_report_job_id") or st.query_params.get("full_job")
+job = get_report_job_queue().get(job_id) if job_id else None
+job_running = job is not None and job["status"] in (QUEUED, RUNNING)
+if job_running:
+    st.session_state.full_report_job_id = job_id
+    st.subheader("⏳ 生成進度")
+    st.progress(job["progress"])
+    if job["status"] == QUEUED:
+        waiting = get_report_job_queue().position(job_id)
+        st.info(f"⏳ 排隊中（前面還有 {waiting} 個工作）..." if waiting else "⏳ 等待其他報告生成完成...")
+    else:
+        st.info(f"{job['message'] or '生成中...'}（可離開此頁面，完成後回來查看）")
+    render_stage_status(job["detail"])
+elif job_id:
+    st.session_state.pop("full_report_job_id", None)
+    st.query_params.pop("full_job", None)
+    if job is not None and job["status"] == SUCCEEDED:
+        # 保存到 session_state（與逐步生成相同的欄位，其他頁面可直接沿用）
+        result = job["result"] or {}
+        outputs = result.get("outputs", {})
+        st.session_state.session_id = result["session_id"]
+        st.session_state.emission_done = True
+        st.session_state.emission_data = result.get("emission_data", {})
+        st.session_state.company_profile = result.get("company_profile", {})
+        st.session_state.tcfd_tables = result.get("tcfd_tables", {})
+        st.session_state.tcfd_summary = result.get("tcfd_summary", {})
+        st.session_state.industry_selected = job["params"].get("industry", "")
+        st.session_state.monthly_bill_from_step1 = job["params"].get("monthly_bill_ntd")
+        for step, stage in (("step1", "environment"), ("step2", "company"), ("step3", "govsoci")):
+            if outputs.get(stage):
+                st.session_state[f"{step}_output_path"] = outputs[stage]
+                st.session_state[f"{step}_output_filename"] = Path(outputs[stage]).name
+                st.session_state[f"{step}_done"] = True
+        st.session_state.step4_done = True
+        st.session_state.full_report_output_path = result["output_path"]
+        st.session_state.full_report_slides = result.get("slides")
+        st.session_state.full_report_detail = job["detail"]
+        st.balloons()
+    elif job is not None and job["status"] == FAILED:
+        st.error(f"❌ 生成失敗：{job['error']}")
+        render_stage_status(job["detail"])
+
+# 檢查是否已經生成過（持久化顯示）
+if "full_report_output_path" in st.session_state and not job_running:
+    output_path = Path(st.session_state.full_report_output_path)
+    if output_path.exists():
+        st.markdown("### ✅ 已生成的完整報告")
+        st.info(f"📁 **完整路徑：** `{output_path}`")
+        if st.session_state.get("full_report_slides"):
+            st.info(f"📊 **總頁數：** {st.session_state.full_report_slides} 頁")
+        if st.session_state.get("full_report_detail"):
+            with st.expander("⏱️ 各階段耗時"):
+                render_stage_status(st.session_state.full_report_detail)
+
+        with open(output_path, "rb") as f:
+            file_data = f.read()
+
+        st.download_button(
+            label="📥 下載完整 ESG 報告",
+            data=file_data,
+            file_name=output_path.name,
+            mime="application/vnd.openxmlformats-officedocument.presentationml.presentation",
+            type="primary",
+            use_container_width=True
+        )
+
+        if st.button("📚 前往 Step 4 查看各段報告", use_container_width=True, key="to_step4_full"):
+            switch_page("pages/6_📚_彙整總報告.py")
+
+        st.divider()
+
+# 輸入
+st.subheader("📝 公司資料")
+col1, col2, col3 = st.columns(3)
+with col1:
+    company_name = st.text_input("公司名稱（可選）", "", key="full_company_name", placeholder="留空則使用「本公司」")
+with col2:
+    industry = st.text_input("產業", st.session_state.get("industry_selected", ""), key="full_industry")
+with col3:
+    monthly_bill = st.number_input(
+        "月電費（NTD）",
+        value=float(st.session_state.get("monthly_bill_from_step1") or 50000.0),
+        key="full_monthly_bill",
+    )
+
+calc_mode = st.radio("估算模式", ["Quick (80%)", "Detail (95%)"], horizontal=True, key="full_calc_mode")
+activity = {}
+if "Detail" in calc_mode:
+    col1, col2 = st.columns(2)
+    with col1:
+        activity["price_per_kwh_ntd"] = st.number_input("每度電價（NTD）", value=4.4, key="full_price_kwh")
+        activity["annual_kwh"] = st.number_input("年用電量（kWh，選填）", value=0.0, key="full_annual_kwh") or None
+        activity["car_count"] = st.number_input("汽車台數", value=2, key="full_car_count")
+        activity["motorcycles"] = st.number_input("機車台數", value=5, key="full_mc_count")
+    with col2:
+        activity["gasoline_liters_year"] = st.number_input("汽油（L/年）", value=0.0, key="full_gas_l") or None
+        activity["refrigerant_leak_kg"] = st.number_input("冷媒逸散（kg/年）", value=2.0, key="full_ref_kg")
+        activity["refrigerant_gwp"] = st.number_input("冷媒 GWP", value=1000.0, key="full_ref_gwp")
+
+uncertainty = st.checkbox(
+    "📊 計算不確定性區間（Monte Carlo P5 / P50 / P95）",
+    value=False,
+    key="full_uncertainty",
+)
+
+if st.button("🚀 一鍵生成完整報告", type="primary", use_container_width=True, key="btn_full_report", disabled=job_running):
+    if not API_KEY:
+        st.error("請先在左側輸入 API Key")
+        st.stop()
+    if not industry:
+        st.error("請輸入產業")
+        st.stop()
+    if not monthly_bill or monthly_bill <= 0:
+        st.error("請輸入月電費")
+        st.stop()
+
+    session_id = new_session_id()
+    st.session_state.session_id = session_id
+    job_id = submit_section_job(FULL_REPORT, API_KEY, {
+        "company_name": company_name,
+        "industry": industry,
+        "monthly_bill_ntd": monthly_bill,
+        "activity": activity,
+        "uncertainty": uncertainty,
+        "session_id": session_id,
+    })
+    st.session_state.full_report_job_id = job_id
+    st.query_params["full_job"] = job_id
+    st.rerun()
+
+if job_running:
+    time.sleep(JOB_POLL_SECONDS)
+    st.rerun()
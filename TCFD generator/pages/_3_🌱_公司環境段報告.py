@@ -9,18 +9,13 @@ from datetime import datetime
 sys.path.insert(0, str(Path(__file__).parent.parent))
 from shared.config import *
 from shared.utils import render_output_folder_links, render_api_key_input
+from shared.session_journal import append_session_log
 
 # ============ 後台 Log 函數 ============
 def save_session_log(session_data):
     """儲存用戶 session log 到後台"""
     session_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-    log_file = BACKEND_LOGS / f"session_{session_id}.json"
-    
-    session_data["session_id"] = session_id
-    session_data["timestamp"] = datetime.now().isoformat()
-    
-    with open(log_file, "w", encoding="utf-8") as f:
-        json.dump(session_data, f, ensure_ascii=False, indent=2)
+    log_file = append_session_log(BACKEND_LOGS, session_data, session_id=session_id)
     
     print(f"  ✓ Session log 已儲存: {log_file.name}")
     return log_file
@@ -0,0 +1,71 @@
+"""
+Anthropic client 共用池
+
+每個 API key 在行程內只建立一個長期存活的 anthropic.Anthropic，底層 httpx 連線池
+開啟 keep-alive，所有引擎與 wrapper 都向這裡借用 client，避免每次呼叫重新做 TLS 握手，
+並限制每個 worker 對 API 開啟的 socket 數量。
+
+環境變數：
+- ANTHROPIC_POOL_MAX_CONNECTIONS   -> 每個 key 的連線上限（預設 20）
+- ANTHROPIC_POOL_MAX_KEEPALIVE     -> 保持存活的閒置連線數（預設 10）
+- ANTHROPIC_POOL_KEEPALIVE_EXPIRY  -> 閒置連線保留秒數（預設 60）
+- ANTHROPIC_POOL_TIMEOUT           -> 單次請求逾時秒數（預設 120）
+"""
+import os
+import threading
+from typing import Dict
+
+import anthropic
+import httpx
+
+MAX_CONNECTIONS = int(os.getenv("ANTHROPIC_POOL_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("ANTHROPIC_POOL_MAX_KEEPALIVE", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("ANTHROPIC_POOL_KEEPALIVE_EXPIRY", "60"))
+REQUEST_TIMEOUT = float(os.getenv("ANTHROPIC_POOL_TIMEOUT", "120"))
+
+_clients: Dict[str, anthropic.Anthropic] = {}
+_clients_lock = threading.Lock()
+
+
+def _build_http_client() -> httpx.Client:
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    timeout = httpx.Timeout(REQUEST_TIMEOUT, connect=10.0)
+    # 新版 SDK 提供 DefaultHttpxClient（保留 SDK 預設設定），舊版直接使用 httpx.Client
+    factory = getattr(anthropic, "DefaultHttpxClient", httpx.Client)
+    return factory(limits=limits, timeout=timeout)
+
+
+def get_anthropic_client(api_key: str) -> anthropic.Anthropic:
+    """
+    借用指定 API key 的共用 client（執行緒安全，可同時被多個引擎使用）
+
+    Args:
+        api_key: Claude API key（前後空白會被移除）
+    """
+    if not api_key or not api_key.strip():
+        raise ValueError("API Key 不能為空")
+    key = api_key.strip()
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = anthropic.Anthropic(api_key=key, http_client=_build_http_client())
+                _clients[key] = client
+                print(f"[Anthropic Pool] 建立共用 client（API Key: {key[:10]}...，連線上限 {MAX_CONNECTIONS}）")
+    return client
+
+
+def close_all_clients() -> None:
+    """關閉所有共用 client（行程結束或測試時使用）"""
+    with _clients_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
@@ -0,0 +1,180 @@
+"""
+圖表渲染快取（assets 元件共用）
+
+重大議題長條圖、泡泡矩陣、利害關係人雷達圖、排放圓餅圖等每份報告都用 matplotlib 從頭重畫，
+但資料大多是預設值或與上次相同。@cached_chart 以 (圖表函數, 函數程式碼, 資料, 尺寸, DPI)
+的 SHA-256 為 key 快取 PNG bytes（程序內 + 磁碟），命中時完全不呼叫 matplotlib。
+元件改為在渲染函數內才 import pyplot，快取命中或不畫圖的頁面不需要負擔 matplotlib 的載入時間。
+
+兩層都有容量上限：程序內依最後使用順序（LRU）淘汰；磁碟超過上限時依最後使用時間（mtime，
+命中時更新）刪除舊圖，一次刪到上限的 80%，不需要每次寫入都掃描資料夾。
+
+環境變數：
+- CHART_CACHE=0            -> 停用（每次重新渲染）
+- CHART_CACHE_DIR          -> 磁碟快取資料夾（預設 _Backend/chart_cache）
+- CHART_CACHE_MEMORY_MB    -> 程序內快取上限（MB，預設 64）
+- CHART_CACHE_MAX_MB       -> 磁碟快取上限（MB，預設 200）
+"""
+import functools
+import hashlib
+import json
+import os
+import threading
+import types
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Callable, List, Optional, Tuple
+
+from shared.config import BACKEND_PATH
+
+CHART_CACHE_DIR = BACKEND_PATH / "chart_cache"
+MEMORY_MAX_BYTES = int(float(os.getenv("CHART_CACHE_MEMORY_MB", "64")) * 1024 * 1024)
+DISK_MAX_BYTES = int(float(os.getenv("CHART_CACHE_MAX_MB", "200")) * 1024 * 1024)
+DISK_PRUNE_RATIO = 0.8
+
+# key -> PNG bytes（依最後使用順序，最舊的在前）
+_charts: "OrderedDict[str, bytes]" = OrderedDict()
+_memory_bytes = 0
+_lock = threading.Lock()
+# 磁碟快取的估計大小（第一次寫入時掃描資料夾，之後累加；刪除舊圖時重新計算）
+_disk_bytes: Optional[int] = None
+_disk_lock = threading.Lock()
+
+
+def chart_cache_enabled() -> bool:
+    return os.getenv("CHART_CACHE", "1") != "0"
+
+
+def _cache_dir() -> Path:
+    cache_dir = Path(os.getenv("CHART_CACHE_DIR", str(CHART_CACHE_DIR)))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def _recall(key: str) -> Optional[bytes]:
+    with _lock:
+        png = _charts.get(key)
+        if png is not None:
+            _charts.move_to_end(key)
+        return png
+
+
+def _remember(key: str, png: bytes) -> None:
+    global _memory_bytes
+    with _lock:
+        old = _charts.pop(key, None)
+        if old is not None:
+            _memory_bytes -= len(old)
+        _charts[key] = png
+        _memory_bytes += len(png)
+        while _memory_bytes > MEMORY_MAX_BYTES and len(_charts) > 1:
+            _, evicted = _charts.popitem(last=False)
+            _memory_bytes -= len(evicted)
+
+
+def _scan_disk(cache_dir: Path) -> List[Tuple[float, int, Path]]:
+    entries = []
+    for path in cache_dir.glob("*.png"):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue  # 其他程序剛刪除
+        entries.append((stat.st_mtime, stat.st_size, path))
+    return entries
+
+
+def _read_disk(disk_path: Path) -> Optional[bytes]:
+    try:
+        png = disk_path.read_bytes()
+    except OSError:
+        return None
+    try:
+        os.utime(disk_path)  # 更新最後使用時間，淘汰時保留常用的圖
+    except OSError:
+        pass
+    return png
+
+
+def _write_disk(disk_path: Path, png: bytes) -> None:
+    global _disk_bytes
+    tmp_path = disk_path.with_name(f"{disk_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        tmp_path.write_bytes(png)
+        os.replace(tmp_path, disk_path)
+    except OSError as e:
+        print(f"[Chart Cache] ⚠️ 無法寫入磁碟快取: {e}")
+        return
+
+    with _disk_lock:
+        if _disk_bytes is None:
+            _disk_bytes = sum(size for _, size, _ in _scan_disk(disk_path.parent))
+        else:
+            _disk_bytes += len(png)
+        if _disk_bytes <= DISK_MAX_BYTES:
+            return
+        entries = sorted(_scan_disk(disk_path.parent))
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= DISK_MAX_BYTES * DISK_PRUNE_RATIO:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        _disk_bytes = total
+    print(f"[Chart Cache] 磁碟快取超過上限，已刪除 {removed} 張舊圖")
+
+
+def _code_digest(code: types.CodeType, h) -> None:
+    """程式碼內容的雜湊（含巢狀 lambda；不使用 repr，避免記憶體位址造成每個程序都不同）"""
+    h.update(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            _code_digest(const, h)
+        else:
+            h.update(repr(const).encode("utf-8"))
+    h.update(repr(code.co_names).encode("utf-8"))
+
+
+def chart_key(render: Callable, data: Any, figsize: Optional[Tuple[float, float]], dpi: Optional[int]) -> str:
+    h = hashlib.sha256()
+    h.update(f"{render.__module__}.{render.__qualname__}".encode("utf-8"))
+    _code_digest(render.__code__, h)
+    h.update(json.dumps({"data": data, "figsize": figsize, "dpi": dpi},
+                        sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def cached_chart(data: Callable[..., Any], figsize: Optional[Tuple[float, float]] = None, dpi: Optional[int] = None):
+    """
+    圖表函數的快取裝飾器（被裝飾的函數返回 PNG 的 BytesIO）
+
+    Args:
+        data: 返回目前圖表資料的函數（每次呼叫時計算 key，資料改變就重新渲染；
+              接收與圖表函數相同的參數，資料以參數傳入時不需要讀取模組全域變數）
+        figsize / dpi: 圖表尺寸與解析度（寫進 key，與函數內的設定保持一致）
+    """
+    def decorator(render: Callable[..., BytesIO]) -> Callable[..., BytesIO]:
+        @functools.wraps(render)
+        def wrapper(*args, **kwargs) -> BytesIO:
+            if not chart_cache_enabled():
+                return render(*args, **kwargs)
+
+            key = chart_key(render, data(*args, **kwargs), figsize, dpi)
+            png = _recall(key)
+            if png is None:
+                disk_path = _cache_dir() / f"{key}.png"
+                png = _read_disk(disk_path)
+                if png is None:
+                    png = render(*args, **kwargs).getvalue()
+                    _write_disk(disk_path, png)
+                _remember(key, png)
+            return BytesIO(png)
+
+        return wrapper
+
+    return decorator
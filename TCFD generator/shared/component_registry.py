@@ -0,0 +1,106 @@
+"""
+元件模組註冊表（所有引擎共用）
+
+PPT 引擎的 _render_component 與環境篇 DOCX 的表格函數以前每次渲染都用
+spec_from_file_location(...).exec_module 從原始碼重新載入元件模組（連帶重新匯入
+matplotlib、python-docx 等）。這裡改為每個程序只載入一次，以 (路徑, mtime) 為 key：
+檔案被修改後下次取用會自動重新載入，否則直接返回快取的模組與類別。
+
+環境變數：
+- COMPONENT_WARMUP=1 -> 引擎建構時預先載入 SLIDE_CONFIGS / PAGE_CONFIGS 中的所有元件
+"""
+import hashlib
+import importlib.util
+import os
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Dict, Iterable, List, Tuple
+
+# 解析後的絕對路徑 -> (mtime, module)
+_modules: Dict[str, Tuple[float, ModuleType]] = {}
+# (絕對路徑, mtime, 屬性名稱) -> 類別 / 函數
+_attrs: Dict[Tuple[str, float, str], Any] = {}
+_lock = threading.RLock()
+
+
+def warmup_enabled() -> bool:
+    return os.getenv("COMPONENT_WARMUP", "0") == "1"
+
+
+def load_component_module(file_path) -> ModuleType:
+    """載入（或取用快取的）元件模組；檔案 mtime 改變時重新載入"""
+    path = Path(file_path).resolve()
+    key = str(path)
+    mtime = path.stat().st_mtime
+
+    cached = _modules.get(key)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _lock:
+        cached = _modules.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        # 每個檔案使用獨立的模組名稱，避免不同元件互相覆蓋
+        module_name = f"component_{path.stem}_{hashlib.sha1(key.encode('utf-8')).hexdigest()[:8]}"
+        spec = importlib.util.spec_from_file_location(module_name, key)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)  # type: ignore
+        _modules[key] = (mtime, module)
+        return module
+
+
+def get_component_attr(file_path, name: str) -> Any:
+    """取得元件模組中的類別或函數（找不到時拋出 AttributeError）"""
+    path = Path(file_path).resolve()
+    attr_key = (str(path), path.stat().st_mtime, name)
+    attr = _attrs.get(attr_key)
+    if attr is None:
+        attr = getattr(load_component_module(path), name)
+        _attrs[attr_key] = attr
+    return attr
+
+
+def component_files_from_configs(configs: Dict[str, Any], base_dir=None) -> List[str]:
+    """
+    從 SLIDE_CONFIGS / PAGE_CONFIGS 收集所有元件檔案路徑
+
+    Args:
+        configs: 投影片 / 頁面設定（會遞迴尋找 "file" 與 "table_file" 欄位中的 .py）
+        base_dir: 相對路徑（例如 PAGE_CONFIGS 的 table_file）的基準資料夾
+    """
+    files: List[str] = []
+
+    def walk(node):
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in ("file", "table_file") and isinstance(value, str) and value.endswith(".py"):
+                    path = Path(value)
+                    if base_dir is not None and not path.is_absolute():
+                        path = Path(base_dir) / path
+                    if str(path) not in files:
+                        files.append(str(path))
+                else:
+                    walk(value)
+        elif isinstance(node, (list, tuple)):
+            for item in node:
+                walk(item)
+
+    walk(configs)
+    return files
+
+
+def warm_up_components(files: Iterable[str]) -> int:
+    """預先載入元件模組，返回成功載入的數量（失敗只警告，渲染時會再嘗試）"""
+    loaded = 0
+    for file_path in files:
+        if not Path(file_path).exists():
+            continue
+        try:
+            load_component_module(file_path)
+            loaded += 1
+        except Exception as e:
+            print(f"[Component Registry] ⚠️ 預載失敗: {Path(file_path).name} - {e}")
+    print(f"[Component Registry] 已預載 {loaded} 個元件模組")
+    return loaded
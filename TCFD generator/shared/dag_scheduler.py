@@ -0,0 +1,143 @@
+"""
+相依圖排程器（報告各階段的平行執行）
+
+完整報告的各階段以前依頁面順序一個接一個執行，但其實只有部分階段彼此相依：
+公司段與治理社會段只需要 Step 1 log 與產業別分析，不需要等環境篇完成。
+這裡把階段描述成相依圖（階段 -> 前置階段），前置階段都成功後立刻送進執行緒池，
+總耗時約等於最長路徑，而不是所有階段耗時的總和。
+
+- 階段函數簽名：func(upstream) -> 結果；upstream 為 {前置階段: 結果}
+- 任一階段失敗時，依賴它的階段標記為 skipped，其他分支繼續執行
+- 每次狀態改變都呼叫 on_update(states)，供頁面 / 背景工作顯示每個階段的進度
+"""
+import threading
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+StageFunc = Callable[[Dict[str, Any]], Any]
+UpdateCallback = Callable[[Dict[str, Dict[str, Any]]], None]
+
+
+class StageFailed(RuntimeError):
+    """有階段失敗（failed 為 {階段: 錯誤訊息}）"""
+
+    def __init__(self, failed: Dict[str, str]):
+        self.failed = failed
+        super().__init__("; ".join(f"{stage}: {error}" for stage, error in failed.items()))
+
+
+def topological_order(dependencies: Dict[str, Iterable[str]]) -> List[str]:
+    """依相依關係排序（同一層維持定義順序）；有未定義的前置階段或循環時拋出 ValueError"""
+    for stage, deps in dependencies.items():
+        unknown = [dep for dep in deps if dep not in dependencies]
+        if unknown:
+            raise ValueError(f"階段 {stage} 的前置階段未定義: {', '.join(unknown)}")
+
+    order: List[str] = []
+    remaining = dict(dependencies)
+    while remaining:
+        ready = [stage for stage, deps in remaining.items() if all(dep in order for dep in deps)]
+        if not ready:
+            raise ValueError(f"相依圖有循環: {', '.join(remaining)}")
+        order.extend(ready)
+        for stage in ready:
+            del remaining[stage]
+    return order
+
+
+def run_dag(
+    stages: Dict[str, StageFunc],
+    dependencies: Dict[str, Tuple[str, ...]],
+    on_update: Optional[UpdateCallback] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    依相依圖平行執行各階段
+
+    Args:
+        stages: 階段 -> 函數
+        dependencies: 階段 -> 前置階段（未列出的階段視為沒有前置階段）
+        on_update: 狀態改變時的回呼，參數為 {階段: {status, error, started_at, finished_at, seconds}} 的快照
+        max_workers: 同時執行的階段數（預設為階段數）
+
+    Returns:
+        {階段: 結果}
+
+    Raises:
+        StageFailed: 有階段失敗（其餘可執行的分支仍會執行完畢）
+    """
+    dependencies = {stage: tuple(dependencies.get(stage, ())) for stage in stages}
+    order = topological_order(dependencies)
+
+    states: Dict[str, Dict[str, Any]] = {
+        stage: {"status": PENDING, "error": None, "started_at": None, "finished_at": None, "seconds": None}
+        for stage in order
+    }
+    results: Dict[str, Any] = {}
+    lock = threading.Lock()
+    publish_lock = threading.Lock()  # 依序送出快照，避免較舊的狀態覆蓋較新的狀態
+
+    def publish() -> None:
+        if on_update is None:
+            return
+        with publish_lock:
+            with lock:
+                snapshot = {stage: dict(state) for stage, state in states.items()}
+            on_update(snapshot)
+
+    def execute(stage: str) -> Any:
+        with lock:
+            states[stage].update(status=RUNNING, started_at=time.time())
+        publish()
+        return stages[stage]({dep: results[dep] for dep in dependencies[stage]})
+
+    publish()
+    with ThreadPoolExecutor(max_workers=max_workers or len(order), thread_name_prefix="dag-stage") as executor:
+        running = {}
+        while True:
+            changed = False
+            for stage in order:
+                if states[stage]["status"] != PENDING:
+                    continue
+                dep_status = [states[dep]["status"] for dep in dependencies[stage]]
+                if any(status in (FAILED, SKIPPED) for status in dep_status):
+                    with lock:
+                        states[stage]["status"] = SKIPPED
+                    changed = True
+                elif all(status == SUCCEEDED for status in dep_status) and stage not in running.values():
+                    running[executor.submit(execute, stage)] = stage
+            if changed:
+                publish()
+            if not running:
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage = running.pop(future)
+                finished_at = time.time()
+                try:
+                    result = future.result()
+                except Exception as e:
+                    traceback.print_exc()
+                    print(f"[DAG] ❌ 階段失敗: {stage}: {e}")
+                    update = {"status": FAILED, "error": str(e) or type(e).__name__}
+                else:
+                    results[stage] = result
+                    update = {"status": SUCCEEDED}
+                with lock:
+                    started_at = states[stage]["started_at"] or finished_at
+                    states[stage].update(finished_at=finished_at, seconds=round(finished_at - started_at, 1), **update)
+            publish()
+
+    failed = {stage: state["error"] for stage, state in states.items() if state["status"] == FAILED}
+    if failed:
+        raise StageFailed(failed)
+    return results
@@ -0,0 +1,52 @@
+"""
+引擎模組載入器（wrapper 共用）
+
+公司段（company1.1-3.6）與治理社會段（GovSoci5.1-6.9）以前由 wrapper 把引擎資料夾插入 sys.path
+再 import，兩個資料夾都有 env_log_reader 等同名模組，先載入的會佔住 sys.modules，
+而且每次呼叫都要修改、再還原全域的 sys.path，兩個報告同時生成時會互相干擾。
+這裡把每個引擎資料夾當成一個獨立的套件載入（名稱依路徑產生，不同資料夾不會衝突），
+引擎模組之間以相對 import 互相引用，整個程序只載入一次，不需要修改 sys.path。
+"""
+import hashlib
+import importlib
+import re
+import sys
+import threading
+from pathlib import Path
+from types import ModuleType
+
+_lock = threading.Lock()
+
+
+def engine_package_name(engine_dir) -> str:
+    """引擎資料夾 -> 套件名稱（例如 company1.1-3.6 -> esg_engine_company1_1_3_6_xxxxxxxx）"""
+    path = Path(engine_dir).resolve()
+    slug = re.sub(r"\W", "_", path.name)
+    return f"esg_engine_{slug}_{hashlib.sha1(str(path).encode('utf-8')).hexdigest()[:8]}"
+
+
+def _ensure_package(engine_dir) -> str:
+    path = Path(engine_dir).resolve()
+    if not path.is_dir():
+        raise FileNotFoundError(f"引擎路徑不存在: {path}")
+    name = engine_package_name(path)
+    if name not in sys.modules:
+        with _lock:
+            if name not in sys.modules:
+                package = ModuleType(name)
+                package.__path__ = [str(path)]
+                package.__file__ = str(path / "__init__.py")
+                package.__package__ = name
+                sys.modules[name] = package
+    return name
+
+
+def load_engine_module(engine_dir, module_name: str) -> ModuleType:
+    """
+    載入引擎資料夾中的模組（每個程序只載入一次，執行緒安全）
+
+    Args:
+        engine_dir: 引擎資料夾（例如 ESG--report/company1.1-3.6）
+        module_name: 模組名稱（例如 "full_pptx_company"）
+    """
+    return importlib.import_module(f"{_ensure_package(engine_dir)}.{module_name}")
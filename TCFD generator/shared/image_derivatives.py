@@ -0,0 +1,144 @@
+"""
+圖片衍生檔（依投影片上的實際尺寸預先縮圖、重新壓縮）
+
+assets1 / assets2 / assets3 的封面與照片多為 1.5–2.5 MB 的 PNG，但在投影片上只佔約 26×16 cm，
+PowerPoint 在這個尺寸下只需要 150–220 DPI。media_dedup.add_picture 插入圖片時會先呼叫
+derivative_for()，以 (原圖 SHA-256, 目標像素, DPI) 為 key 產生並快取衍生檔：
+- 沒有透明度的圖片 -> JPEG（品質 IMAGE_JPEG_QUALITY）
+- 有透明度的圖片   -> optimize 過的 PNG
+- 逐軸比較：原圖在某一軸的解析度不超過需要時該軸保留原尺寸（不放大）；
+  兩軸都不超過時只重新壓縮；衍生檔沒有比較小時直接使用原圖
+
+環境變數：
+- IMAGE_DERIVATIVES=0         -> 停用（一律使用原圖）
+- IMAGE_TARGET_DPI            -> 目標 DPI（預設 200）
+- IMAGE_JPEG_QUALITY          -> JPEG 品質（預設 85）
+- IMAGE_DERIVATIVE_CACHE      -> 衍生檔資料夾（預設 _Backend/image_cache）
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from shared.config import BACKEND_PATH
+
+try:
+    from PIL import Image as PILImage
+except ImportError:  # pragma: no cover - python-pptx 本身依賴 Pillow
+    PILImage = None
+
+EMU_PER_INCH = 914400
+# 原圖像素超過目標的這個倍數才縮圖（避免為了幾個像素重新壓縮）
+RESAMPLE_THRESHOLD = 1.2
+
+DERIVATIVE_CACHE_DIR = BACKEND_PATH / "image_cache"
+
+# (絕對路徑, mtime, 大小) -> SHA-256
+_digests: Dict[Tuple[str, float, int], str] = {}
+# (SHA-256, 目標寬, 目標高, DPI) -> 實際使用的檔案
+_resolved: Dict[Tuple[str, int, int, int], Path] = {}
+_lock = threading.Lock()
+
+
+def derivatives_enabled() -> bool:
+    return PILImage is not None and os.getenv("IMAGE_DERIVATIVES", "1") != "0"
+
+
+def target_dpi() -> int:
+    return int(os.getenv("IMAGE_TARGET_DPI", "200"))
+
+
+def _cache_dir() -> Path:
+    cache_dir = Path(os.getenv("IMAGE_DERIVATIVE_CACHE", str(DERIVATIVE_CACHE_DIR)))
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir
+
+
+def _source_digest(path: Path) -> str:
+    stat = path.stat()
+    key = (str(path), stat.st_mtime, stat.st_size)
+    digest = _digests.get(key)
+    if digest is None:
+        digest = hashlib.sha256(path.read_bytes()).hexdigest()
+        _digests[key] = digest
+    return digest
+
+
+def _has_alpha(img) -> bool:
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def _target_pixels(img_size: Tuple[int, int], width_emu: Optional[int], height_emu: Optional[int],
+                   dpi: int) -> Optional[Tuple[int, int]]:
+    """依放置尺寸計算目標像素（只給一邊時依原圖比例推算另一邊）"""
+    px_w, px_h = img_size
+    if width_emu:
+        target_w = width_emu / EMU_PER_INCH * dpi
+    if height_emu:
+        target_h = height_emu / EMU_PER_INCH * dpi
+    if width_emu and not height_emu:
+        target_h = target_w * px_h / px_w
+    elif height_emu and not width_emu:
+        target_w = target_h * px_w / px_h
+    elif not width_emu and not height_emu:
+        return None
+    return max(1, round(target_w)), max(1, round(target_h))
+
+
+def _write_derivative(img, size: Tuple[int, int], out_path: Path) -> None:
+    resized = img if img.size == size else img.resize(size, PILImage.LANCZOS)
+    tmp_path = out_path.with_name(f"{out_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    if out_path.suffix == ".jpg":
+        resized.convert("RGB").save(tmp_path, "JPEG", quality=int(os.getenv("IMAGE_JPEG_QUALITY", "85")),
+                                    optimize=True, progressive=True)
+    else:
+        resized.save(tmp_path, "PNG", optimize=True)
+    os.replace(tmp_path, out_path)
+
+
+def derivative_for(image_path, width_emu: Optional[int] = None, height_emu: Optional[int] = None) -> Path:
+    """
+    返回要插入投影片的圖片檔（衍生檔或原圖）
+
+    Args:
+        image_path: 原圖路徑
+        width_emu / height_emu: 投影片上的放置尺寸（EMU，與 add_picture 的參數相同）
+    """
+    path = Path(image_path).resolve()
+    if not derivatives_enabled() or not (width_emu or height_emu):
+        return path
+
+    dpi = target_dpi()
+    try:
+        digest = _source_digest(path)
+        with PILImage.open(path) as img:
+            size = _target_pixels(img.size, width_emu, height_emu, dpi)
+            if size is None:
+                return path
+            key = (digest, size[0], size[1], dpi)
+            resolved = _resolved.get(key)
+            if resolved is not None and resolved.exists():
+                return resolved
+            # 逐軸判斷：原圖在該軸的解析度不超過需要時保留原尺寸（不放大），兩軸都保留時只重新壓縮
+            size = tuple(
+                source if source <= target * RESAMPLE_THRESHOLD else target
+                for source, target in zip(img.size, size)
+            )
+
+            suffix = ".png" if _has_alpha(img) else ".jpg"
+            out_path = _cache_dir() / f"{path.stem}_{digest[:16]}_{size[0]}x{size[1]}_{dpi}dpi{suffix}"
+            with _lock:
+                if not out_path.exists():
+                    img.load()
+                    _write_derivative(img, size, out_path)
+                    print(f"[Image Derivative] {path.name}: {img.size[0]}x{img.size[1]} -> "
+                          f"{size[0]}x{size[1]} ({out_path.stat().st_size // 1024} KB)")
+    except Exception as e:
+        print(f"[Image Derivative] ⚠️ 無法產生衍生檔，使用原圖: {path.name} - {e}")
+        return path
+
+    # 衍生檔沒有比較小（例如原圖已是高度壓縮的 JPEG）-> 使用原圖
+    resolved = out_path if out_path.stat().st_size < path.stat().st_size else path
+    _resolved[key] = resolved
+    return resolved
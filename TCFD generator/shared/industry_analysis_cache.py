@@ -0,0 +1,40 @@
+"""
+產業別分析（150 字）快取
+
+公司段引擎幾乎每次 _call 都需要 Step 1 產生的 150 字產業別分析。以前每次都重新
+glob 兩個 log 資料夾、依 mtime 排序並讀取 JSON；這裡改為依 session 快取讀取結果，
+只有在 save_industry_analysis_to_log 為該 session 寫入新檔案時才失效。
+
+若某個 session 的結果其實來自「最新的分析檔」（找不到該 session 專屬檔案時的後備），
+任何 session 寫入新分析都會讓它失效，因為「最新」已經改變。
+"""
+import threading
+from typing import Dict, Optional, Set
+
+_cache: Dict[str, str] = {}
+# 結果來自「最新分析檔」後備路徑的 session
+_from_latest: Set[str] = set()
+_lock = threading.Lock()
+
+
+def get_industry_analysis(session_id: str) -> Optional[str]:
+    """取得快取的分析文字；未快取時返回 None（空字串代表已確認讀不到）"""
+    return _cache.get(session_id or "")
+
+
+def set_industry_analysis(session_id: str, text: str, from_latest: bool = False) -> None:
+    key = session_id or ""
+    with _lock:
+        _cache[key] = text or ""
+        if from_latest or not text:
+            _from_latest.add(key)
+        else:
+            _from_latest.discard(key)
+
+
+def invalidate_industry_analysis(session_id: str) -> None:
+    """save_industry_analysis_to_log 寫入新檔案後呼叫"""
+    with _lock:
+        for key in {session_id or ""} | _from_latest:
+            _cache.pop(key, None)
+        _from_latest.clear()
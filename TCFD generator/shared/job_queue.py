@@ -0,0 +1,252 @@
+"""
+背景工作佇列（段落生成等長時間工作）
+
+公司段、治理與社會段的生成需要 2–3 分鐘，以前直接在 Streamlit script 執行緒內執行：
+重新整理或切換頁面就會中斷工作，同一個 worker 上的其他使用者也要排在後面。
+這裡改成「送出工作 -> 背景執行緒池執行 -> 頁面輪詢狀態」：
+- 工作紀錄（狀態、進度、參數、結果、錯誤）保存在 SQLite，重新整理後仍可用 job_id 取回
+- 工作在行程內的執行緒池執行，與 UI session 的生命週期無關
+- API Key 等機密只留在記憶體（secrets），不寫入資料庫
+- 每個工作記錄送出它的行程（owner = 開機識別碼:pid）；啟動時只把 owner 已不存在的
+  queued / running 工作標記為失敗（interrupted），同時運行的其他行程的工作不受影響
+
+handler 簽名：handler(params, secrets, progress) -> dict（結果）；progress(百分比, 訊息, detail=None)
+detail 為 JSON 可序列化的進度細節（例如完整報告每個階段的狀態），頁面可從 job["detail"] 取回。
+
+環境變數：
+- JOB_WORKERS     -> 執行緒數（預設 2）
+- JOB_QUEUE_PATH  -> SQLite 路徑（預設 _Backend/jobs.sqlite3）
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from shared.config import BACKEND_PATH
+
+JOB_QUEUE_PATH = BACKEND_PATH / "jobs.sqlite3"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+FINISHED_STATES = (SUCCEEDED, FAILED)
+
+ProgressCallback = Callable[..., None]
+JobHandler = Callable[[Dict[str, Any], Dict[str, Any], ProgressCallback], Dict[str, Any]]
+
+
+def _boot_id() -> str:
+    """開機識別碼（重新開機後 pid 會被重複使用）；取不到時為空字串，只比對 pid"""
+    try:
+        return Path("/proc/sys/kernel/random/boot_id").read_text().strip()
+    except OSError:
+        pass
+    try:
+        import psutil
+        return str(int(psutil.boot_time()))
+    except Exception:
+        return ""
+
+
+def _pid_alive(pid: int) -> bool:
+    if pid == os.getpid():
+        return True
+    if os.name == "nt":
+        # Windows 的 os.kill(pid, 0) 會結束該行程，改以 OpenProcess 查詢
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)  # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return kernel32.GetLastError() == 5  # ERROR_ACCESS_DENIED：行程存在但無權限
+        try:
+            code = ctypes.c_ulong()
+            kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+            return code.value == 259  # STILL_ACTIVE
+        finally:
+            kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+BOOT_ID = _boot_id()
+OWNER_ID = f"{BOOT_ID}:{os.getpid()}"
+
+
+def _owner_alive(owner: Optional[str]) -> bool:
+    """owner 所指的行程是否仍在執行（舊版資料庫沒有 owner，視為已結束）"""
+    if not owner:
+        return False
+    boot_id, _, pid = owner.rpartition(":")
+    if boot_id != BOOT_ID or not pid.isdigit():
+        return False
+    return _pid_alive(int(pid))
+
+
+class JobQueue:
+    """SQLite 工作紀錄 + 行程內執行緒池"""
+
+    def __init__(self, path: Path = JOB_QUEUE_PATH, workers: int = 2):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._handlers: Dict[str, JobHandler] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="job")
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    progress INTEGER NOT NULL DEFAULT 0,
+                    message TEXT,
+                    params TEXT NOT NULL,
+                    result TEXT,
+                    error TEXT,
+                    detail TEXT,
+                    owner TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_kind ON jobs(kind, created_at)")
+            # 舊版資料庫沒有 detail / owner 欄位
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for column in ("detail", "owner"):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} TEXT")
+            # 已結束的行程留下的工作不會再有人執行；仍在執行的行程（例如另一個 worker）的工作保留
+            unfinished = conn.execute(
+                "SELECT job_id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            orphaned = [job_id for job_id, owner in unfinished if not _owner_alive(owner)]
+            now = time.time()
+            conn.executemany(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE job_id = ?",
+                [(FAILED, "工作在完成前中斷（伺服器重新啟動）", now, job_id) for job_id in orphaned],
+            )
+            interrupted = len(orphaned)
+        if interrupted:
+            print(f"[Job Queue] ⚠️ {interrupted} 個未完成的工作已標記為中斷")
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """開啟連線：區塊結束時提交（例外時回滾）並關閉（sqlite3 的 with 只負責交易，不會關閉連線）"""
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {columns} WHERE job_id = ?", (*fields.values(), job_id))
+
+    # ------------------------------------------------------------------
+    # 送出 / 查詢
+    # ------------------------------------------------------------------
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """登錄工作種類（重複登錄會覆寫，頁面重跑時可安全呼叫）"""
+        self._handlers[kind] = handler
+
+    def submit(self, kind: str, params: Dict[str, Any], secrets: Optional[Dict[str, Any]] = None) -> str:
+        """
+        送出工作
+
+        Args:
+            kind: register 過的工作種類
+            params: 工作參數（JSON 可序列化，會寫入工作紀錄）
+            secrets: 只傳給 handler、不寫入資料庫的參數（例如 API Key）
+
+        Returns:
+            job_id
+        """
+        if kind not in self._handlers:
+            raise KeyError(f"未登錄的工作種類: {kind}")
+        job_id = uuid.uuid4().hex
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (job_id, kind, status, message, params, owner, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, "排隊中", json.dumps(params, ensure_ascii=False, default=str), OWNER_ID, time.time()),
+            )
+        self._executor.submit(self._run, job_id, kind, params, dict(secrets or {}))
+        print(f"[Job Queue] 已送出工作 {kind} ({job_id[:8]})")
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """取得工作紀錄；不存在時返回 None"""
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["detail"] = json.loads(job["detail"]) if job["detail"] else None
+        return job
+
+    def position(self, job_id: str) -> int:
+        """排在這個工作前面、尚未開始的工作數"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < "
+                "(SELECT created_at FROM jobs WHERE job_id = ?)",
+                (QUEUED, job_id),
+            ).fetchone()
+        return int(row[0]) if row else 0
+
+    # ------------------------------------------------------------------
+    # 執行
+    # ------------------------------------------------------------------
+    def _run(self, job_id: str, kind: str, params: Dict[str, Any], secrets: Dict[str, Any]) -> None:
+        def progress(percent: int, message: str = "", detail: Optional[Dict[str, Any]] = None) -> None:
+            fields: Dict[str, Any] = {"progress": int(max(0, min(100, percent))), "message": message}
+            if detail is not None:
+                fields["detail"] = json.dumps(detail, ensure_ascii=False, default=str)
+            self._update(job_id, **fields)
+
+        try:
+            self._update(job_id, status=RUNNING, started_at=time.time(), message="執行中")
+            result = self._handlers[kind](params, secrets, progress) or {}
+            self._update(job_id, status=SUCCEEDED, progress=100, message="完成", finished_at=time.time(),
+                         result=json.dumps(result, ensure_ascii=False, default=str))
+            print(f"[Job Queue] ✓ 工作完成 {kind} ({job_id[:8]})")
+        except Exception as e:
+            traceback.print_exc()
+            self._update(job_id, status=FAILED, error=str(e) or type(e).__name__, finished_at=time.time())
+            print(f"[Job Queue] ❌ 工作失敗 {kind} ({job_id[:8]}): {e}")
+
+
+_queue_instance: Optional[JobQueue] = None
+_queue_lock = threading.Lock()
+
+
+def get_job_queue() -> JobQueue:
+    """取得行程共用的 JobQueue（所有 Streamlit session 共用同一個執行緒池）"""
+    global _queue_instance
+    if _queue_instance is None:
+        with _queue_lock:
+            if _queue_instance is None:
+                _queue_instance = JobQueue(
+                    Path(os.getenv("JOB_QUEUE_PATH", str(JOB_QUEUE_PATH))),
+                    workers=int(os.getenv("JOB_WORKERS", "2")),
+                )
+    return _queue_instance
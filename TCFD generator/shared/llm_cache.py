@@ -0,0 +1,228 @@
+"""
+LLM 回應快取（所有內容引擎共用）
+
+以 (model, prompt, max_tokens) 的 SHA-256 作為 key，將 LLM 原始回應存在磁碟上的 SQLite 檔案。
+- 容量上限：超過 max_bytes 或 max_entries 時，依最後使用時間（LRU）淘汰
+  （項目數與總大小由 trigger 維護在 llm_cache_stats，寫入時不需要掃描整張表）
+- TTL：可選，過期的項目視為未命中並刪除
+- 多執行緒 / 多程序安全（WAL 模式，每次操作獨立連線）
+
+環境變數：
+- LLM_CACHE_DISABLED=1       -> 完全停用快取（每次都呼叫 API）
+- LLM_CACHE_PATH             -> 快取檔案路徑（預設 ESG_Output/_Backend/llm_cache.sqlite3）
+- LLM_CACHE_MAX_MB           -> 容量上限（MB，預設 200）
+- LLM_CACHE_MAX_ENTRIES      -> 項目數上限（預設 20000）
+- LLM_CACHE_TTL_SECONDS      -> 有效期限（秒，預設 0 = 不過期）
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from shared.config import BACKEND_PATH
+
+DEFAULT_CACHE_PATH = BACKEND_PATH / "llm_cache.sqlite3"
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+DEFAULT_MAX_ENTRIES = 20000
+# 只超過容量（bytes）時每次淘汰的項目數
+EVICT_BATCH = 16
+
+
+def make_cache_key(model: str, prompt: str, max_tokens: int) -> str:
+    """以 (model, prompt, max_tokens) 產生內容定址的 key"""
+    payload = json.dumps(
+        {"model": model, "prompt": prompt, "max_tokens": int(max_tokens)},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """磁碟上的 LLM 回應快取（SQLite，LRU 淘汰，可選 TTL）"""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds or None
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    max_tokens INTEGER NOT NULL,
+                    text TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_created ON llm_cache(created_at)")
+            # 項目數 / 總大小（單列），由 trigger 隨 INSERT / UPDATE / DELETE 更新
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache_stats ("
+                "id INTEGER PRIMARY KEY CHECK (id = 0), entries INTEGER NOT NULL, bytes INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO llm_cache_stats (id, entries, bytes) "
+                "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS llm_cache_stats_insert AFTER INSERT ON llm_cache BEGIN "
+                "UPDATE llm_cache_stats SET entries = entries + 1, bytes = bytes + NEW.size; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS llm_cache_stats_update AFTER UPDATE OF size ON llm_cache BEGIN "
+                "UPDATE llm_cache_stats SET bytes = bytes + NEW.size - OLD.size; END"
+            )
+            conn.execute(
+                "CREATE TRIGGER IF NOT EXISTS llm_cache_stats_delete AFTER DELETE ON llm_cache BEGIN "
+                "UPDATE llm_cache_stats SET entries = entries - 1, bytes = bytes - OLD.size; END"
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self.path), timeout=30, isolation_level=None)
+
+    def get(self, model: str, prompt: str, max_tokens: int) -> Optional[str]:
+        """讀取快取，未命中或已過期時返回 None"""
+        key = make_cache_key(model, prompt, max_tokens)
+        now = time.time()
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT text, created_at FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            text, created_at = row
+            if self.ttl_seconds and now - created_at > self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                return None
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return text
+        finally:
+            conn.close()
+
+    def set(self, model: str, prompt: str, max_tokens: int, text: str) -> None:
+        """寫入快取，並在超過容量時依 LRU 淘汰"""
+        key = make_cache_key(model, prompt, max_tokens)
+        now = time.time()
+        size = len(text.encode("utf-8"))
+        conn = self._connect()
+        try:
+            # 以 UPSERT 取代 INSERT OR REPLACE：REPLACE 刪除舊列時不會觸發 DELETE trigger
+            conn.execute(
+                "INSERT INTO llm_cache (key, model, max_tokens, text, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET text = excluded.text, size = excluded.size, "
+                "created_at = excluded.created_at, accessed_at = excluded.accessed_at",
+                (key, model, int(max_tokens), text, size, now, now),
+            )
+            self._evict(conn)
+        finally:
+            conn.close()
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        with self._lock:
+            if self.ttl_seconds:
+                conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+            while True:
+                count, total = conn.execute("SELECT entries, bytes FROM llm_cache_stats").fetchone()
+                if count <= self.max_entries and total <= self.max_bytes:
+                    return
+                # 依 LRU 分批刪除最久未使用的項目（只讀取 accessed_at 索引的開頭）
+                deleted = conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN (SELECT key FROM llm_cache ORDER BY accessed_at ASC LIMIT ?)",
+                    (max(count - self.max_entries, EVICT_BATCH),),
+                ).rowcount
+                if not deleted:
+                    return
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            conn.execute("DELETE FROM llm_cache")
+        finally:
+            conn.close()
+
+
+_cache_instance: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> Optional[LLMCache]:
+    """取得行程共用的快取實例；LLM_CACHE_DISABLED=1 或初始化失敗時返回 None"""
+    global _cache_instance
+    if os.getenv("LLM_CACHE_DISABLED", "0") == "1":
+        return None
+    if _cache_instance is None:
+        with _cache_lock:
+            if _cache_instance is None:
+                try:
+                    _cache_instance = LLMCache(
+                        path=Path(os.getenv("LLM_CACHE_PATH", str(DEFAULT_CACHE_PATH))),
+                        max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+                        max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+                        ttl_seconds=float(os.getenv("LLM_CACHE_TTL_SECONDS", "0")) or None,
+                    )
+                except Exception as e:
+                    print(f"[LLM Cache] ⚠️ 初始化失敗，停用快取: {e}")
+                    return None
+    return _cache_instance
+
+
+def cached_completion(client, model: str, prompt: str, max_tokens: int) -> str:
+    """
+    先查快取，未命中才呼叫 client.messages.create，並將非空回應寫回快取
+
+    Returns:
+        LLM 原始回應文字（尚未清理，由各引擎自行處理）
+    """
+    cache = get_llm_cache()
+    if cache is not None:
+        try:
+            cached = cache.get(model, prompt, max_tokens)
+        except Exception as e:
+            print(f"[LLM Cache] ⚠️ 讀取失敗: {e}")
+            cached = None
+        if cached is not None:
+            print(f"[LLM Cache] 命中 ({model}, {len(prompt)}字 prompt)")
+            return cached
+
+    response = client.messages.create(
+        model=model,
+        max_tokens=max_tokens,
+        messages=[{"role": "user", "content": prompt}],
+    )
+    text = response.content[0].text if response.content else ""
+
+    if cache is not None and text:
+        try:
+            cache.set(model, prompt, max_tokens, text)
+        except Exception as e:
+            print(f"[LLM Cache] ⚠️ 寫入失敗: {e}")
+    return text
@@ -0,0 +1,112 @@
+"""
+圖片媒體去重（所有 PPT 引擎共用）
+
+python-pptx 的 shapes.add_picture 每次都重新讀取整個圖片檔，並且在尋找可重用的圖片 part 時
+走訪整個套件、對每一個既有圖片重新計算 SHA-1 —— 封面、CEO 照片等 1.5–2.5 MB 的圖片
+重複插入時成本會隨簡報大小線性增加。這裡改為：
+- 圖片檔內容以 (路徑, mtime) 快取在程序內，並同時記下 SHA-256
+- 每個 Presentation 套件維護一份 SHA-256 -> ImagePart 索引，內容相同的圖片只保存一個 part
+- 指定放置尺寸時改用 image_derivatives 依目標 DPI 產生的縮圖（見該模組的環境變數）
+
+環境變數：
+- MEDIA_CACHE_MB -> 程序內圖片快取上限（MB，預設 256；0 表示不快取檔案內容）
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Tuple
+
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.parts.image import Image, ImagePart
+
+from shared.image_derivatives import derivative_for
+
+CACHE_BYTES = int(float(os.getenv("MEDIA_CACHE_MB", "256")) * 1024 * 1024)
+
+# (絕對路徑, mtime) -> (內容, SHA-256)
+_blobs: "OrderedDict[Tuple[str, float], Tuple[bytes, str]]" = OrderedDict()
+_blob_bytes = 0
+_lock = threading.Lock()
+
+# 套件上存放索引的屬性名稱
+_INDEX_ATTR = "_esg_media_index"
+
+
+def read_image(image_file) -> Tuple[bytes, str, str]:
+    """
+    讀取圖片內容
+
+    Returns:
+        (內容, SHA-256, 檔名)；檔案路徑會使用程序內快取
+    """
+    global _blob_bytes
+    if not isinstance(image_file, (str, Path)):
+        image_file.seek(0)
+        blob = image_file.read()
+        return blob, hashlib.sha256(blob).hexdigest(), None
+
+    path = Path(image_file).resolve()
+    key = (str(path), path.stat().st_mtime)
+    with _lock:
+        cached = _blobs.get(key)
+        if cached is not None:
+            _blobs.move_to_end(key)
+            return cached[0], cached[1], path.name
+
+    blob = path.read_bytes()
+    digest = hashlib.sha256(blob).hexdigest()
+    if len(blob) <= CACHE_BYTES:
+        with _lock:
+            if key not in _blobs:
+                _blobs[key] = (blob, digest)
+                _blob_bytes += len(blob)
+            while _blob_bytes > CACHE_BYTES and _blobs:
+                _, (old_blob, _) = _blobs.popitem(last=False)
+                _blob_bytes -= len(old_blob)
+    return blob, digest, path.name
+
+
+def _media_index(package) -> Dict[str, ImagePart]:
+    """取得套件的 SHA-256 -> ImagePart 索引（第一次使用時登記模板中既有的圖片）"""
+    index = getattr(package, _INDEX_ATTR, None)
+    if index is None:
+        index = {}
+        for part in package.iter_parts():
+            if isinstance(part, ImagePart):
+                index.setdefault(hashlib.sha256(part.blob).hexdigest(), part)
+        setattr(package, _INDEX_ATTR, index)
+    return index
+
+
+def get_or_add_image_part(slide_part, image_file) -> Tuple[ImagePart, str]:
+    """返回 (圖片 part, 投影片上的 rId)；內容相同的圖片共用同一個 part"""
+    blob, digest, filename = read_image(image_file)
+    index = _media_index(slide_part.package)
+    image_part = index.get(digest)
+    if image_part is None:
+        image_part = ImagePart.new(slide_part.package, Image.from_blob(blob, filename))
+        index[digest] = image_part
+    return image_part, slide_part.relate_to(image_part, RT.IMAGE)
+
+
+def add_picture(shapes, image_file, left, top, width=None, height=None):
+    """
+    與 shapes.add_picture 相同的介面與結果，但圖片 part 以 SHA-256 去重
+
+    image_file 可以是路徑或 file-like 物件；路徑且指定了寬或高時會改用縮圖衍生檔。
+    """
+    if isinstance(image_file, (str, Path)) and (width or height):
+        image_file = derivative_for(image_file, width, height)
+    try:
+        image_part, rId = get_or_add_image_part(shapes.part, image_file)
+    except (AttributeError, TypeError):
+        # 不是一般投影片的 shapes（例如群組）-> 使用 python-pptx 原本的行為
+        if not isinstance(image_file, (str, Path)):
+            image_file.seek(0)
+        return shapes.add_picture(str(image_file) if isinstance(image_file, Path) else image_file,
+                                  left, top, width, height)
+    pic = shapes._add_pic_from_image_part(image_part, rId, left, top, width, height)
+    shapes._recalculate_extents()
+    return shapes._shape_factory(pic)
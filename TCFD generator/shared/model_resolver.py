@@ -0,0 +1,118 @@
+"""
+模型解析快取
+
+PPTContentEngine 以前在每次建構時呼叫 client.models.list() 來挑選候選模型，
+每個段落生成都多一次網路往返。這裡改為依 API key 快取可用模型清單（記憶體 + 磁碟），
+超過 TTL 時在背景執行緒刷新，引擎建構永遠不會等待 models 端點：
+- 有快取（即使已過期）：立即使用快取挑選模型，過期時順便觸發背景刷新
+- 完全沒有快取：立即返回第一個候選模型，並觸發背景刷新供下一次使用
+- models 端點失敗：保留舊快取，不影響任何呼叫
+
+環境變數：
+- MODEL_CACHE_TTL_SECONDS -> 快取有效期限（秒，預設 86400）
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional
+
+from shared.config import BACKEND_PATH
+
+MODEL_CACHE_PATH = BACKEND_PATH / "model_cache.json"
+MODEL_CACHE_TTL_SECONDS = float(os.getenv("MODEL_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+DEFAULT_MODEL = "claude-3-haiku-20240307"
+
+# key_hash -> {"available": [...], "resolved_at": float}
+_memory_cache: Dict[str, Dict] = {}
+_refreshing = set()
+_lock = threading.Lock()
+
+
+def _key_hash(api_key: str) -> str:
+    """不在磁碟上保存 API key 本身，只保存雜湊"""
+    return hashlib.sha256(api_key.strip().encode("utf-8")).hexdigest()[:16]
+
+
+def _load_disk_cache() -> Dict[str, Dict]:
+    if not MODEL_CACHE_PATH.exists():
+        return {}
+    try:
+        with open(MODEL_CACHE_PATH, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _save_disk_cache(key_hash: str, entry: Dict) -> None:
+    try:
+        data = _load_disk_cache()
+        data[key_hash] = entry
+        MODEL_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = MODEL_CACHE_PATH.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, MODEL_CACHE_PATH)
+    except Exception as e:
+        print(f"[Model Cache] ⚠️ 寫入磁碟快取失敗: {e}")
+
+
+def _get_entry(key_hash: str) -> Optional[Dict]:
+    entry = _memory_cache.get(key_hash)
+    if entry is None:
+        entry = _load_disk_cache().get(key_hash)
+        if entry:
+            _memory_cache[key_hash] = entry
+    return entry
+
+
+def _refresh(client, key_hash: str) -> None:
+    try:
+        available = [m.id for m in client.models.list().data]
+        entry = {"available": available, "resolved_at": time.time()}
+        _memory_cache[key_hash] = entry
+        _save_disk_cache(key_hash, entry)
+        print(f"[Model Cache] 已刷新可用模型清單（{len(available)} 個）")
+    except Exception as e:
+        print(f"[Model Cache] ⚠️ models 端點不可用，沿用既有快取: {e}")
+    finally:
+        with _lock:
+            _refreshing.discard(key_hash)
+
+
+def _schedule_refresh(client, key_hash: str) -> None:
+    with _lock:
+        if key_hash in _refreshing:
+            return
+        _refreshing.add(key_hash)
+    threading.Thread(target=_refresh, args=(client, key_hash), name="model-cache-refresh", daemon=True).start()
+
+
+def resolve_model(client, api_key: str, candidates: List[str], default: str = DEFAULT_MODEL) -> str:
+    """
+    依快取的可用模型清單，從 candidates 中挑選第一個可用的模型（不會阻塞）
+
+    Args:
+        client: anthropic client（背景刷新時使用）
+        api_key: 用來區分快取的 API key
+        candidates: 依優先順序排列的候選模型
+        default: 沒有任何候選時的預設模型
+    """
+    fallback = candidates[0] if candidates else default
+    if not api_key:
+        return fallback
+
+    key_hash = _key_hash(api_key)
+    entry = _get_entry(key_hash)
+    if entry is None or time.time() - entry.get("resolved_at", 0) > MODEL_CACHE_TTL_SECONDS:
+        _schedule_refresh(client, key_hash)
+    if entry is None:
+        return fallback
+
+    available = entry.get("available") or []
+    for candidate in candidates:
+        if candidate in available:
+            return candidate
+    return fallback
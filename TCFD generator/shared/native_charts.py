@@ -0,0 +1,278 @@
+"""
+原生 PowerPoint 圖表（python-pptx chart_data，所有 PPT 引擎共用）
+
+排放圓餅圖、重大議題長條圖、重大性泡泡矩陣以前都由 matplotlib 以 150–300 DPI 畫成 PNG 再插入投影片：
+渲染慢、每張圖數百 KB，而且在 PowerPoint 中無法編輯。這裡以同一份資料（EMISSION_DATA、BAR_DATA、
+BUBBLE_DATA）直接建立原生圖表，幾毫秒完成、只增加數 KB，使用者也能在 PowerPoint 中修改數值與樣式。
+matplotlib 版本保留為備援：CHART_BACKEND=matplotlib 或原生圖表建立失敗時，元件改插入（快取的）PNG。
+
+環境變數：
+- CHART_BACKEND=native（預設）| matplotlib
+"""
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from pptx.chart.data import BubbleChartData, CategoryChartData
+from pptx.dml.color import RGBColor
+from pptx.enum.chart import XL_CHART_TYPE, XL_LABEL_POSITION, XL_LEGEND_POSITION, XL_TICK_LABEL_POSITION
+from pptx.oxml.xmlchemy import OxmlElement
+from pptx.util import Pt
+
+CHART_BACKENDS = ("native", "matplotlib")
+DEFAULT_FONT = "Microsoft JhengHei"
+
+Color = Union[str, Tuple[int, int, int]]
+
+
+def chart_backend() -> str:
+    backend = os.getenv("CHART_BACKEND", "native").strip().lower()
+    return backend if backend in CHART_BACKENDS else "native"
+
+
+def native_charts_enabled() -> bool:
+    return chart_backend() == "native"
+
+
+def to_rgb(color: Color) -> RGBColor:
+    """'#RRGGBB' 或 (r, g, b) -> RGBColor"""
+    if isinstance(color, str):
+        return RGBColor.from_string(color.lstrip("#").upper())
+    return RGBColor(*color)
+
+
+def _fill(fmt, color: Optional[Color]) -> None:
+    if color is None:
+        return
+    fmt.fill.solid()
+    fmt.fill.fore_color.rgb = to_rgb(color)
+
+
+def _style_chart(chart, title: Optional[str], title_color: Optional[Color], font_name: str, font_size: float) -> None:
+    chart.font.name = font_name
+    chart.font.size = Pt(font_size)
+    if title:
+        chart.has_title = True
+        paragraph = chart.chart_title.text_frame.paragraphs[0]
+        paragraph.text = title
+        paragraph.font.bold = True
+        paragraph.font.size = Pt(font_size + 3)
+        paragraph.font.name = font_name
+        if title_color is not None:
+            paragraph.font.color.rgb = to_rgb(title_color)
+    else:
+        chart.has_title = False
+
+
+def _set_axis_title(axis, text: Optional[str], font_size: float) -> None:
+    if not text:
+        return
+    axis.has_title = True
+    paragraph = axis.axis_title.text_frame.paragraphs[0]
+    paragraph.text = text
+    paragraph.font.bold = True
+    paragraph.font.size = Pt(font_size)
+
+
+def _set_gridlines(axis, color: Color = "#D9D9D9") -> None:
+    axis.has_major_gridlines = True
+    line = axis.major_gridlines.format.line
+    line.color.rgb = to_rgb(color)
+    line.width = Pt(0.5)
+
+
+def add_pie_chart(
+    shapes,
+    left,
+    top,
+    width,
+    height,
+    categories: Sequence[str],
+    values: Sequence[float],
+    colors: Optional[Sequence[Color]] = None,
+    title: Optional[str] = None,
+    title_color: Optional[Color] = None,
+    explode: Optional[Dict[int, int]] = None,
+    number_format: str = "0.00",
+    font_name: str = DEFAULT_FONT,
+    font_size: float = 11,
+):
+    """
+    新增原生圓餅圖
+
+    Args:
+        categories / values: 扇區名稱與數值
+        colors: 每個扇區的顏色
+        explode: {扇區索引: 突出百分比}（對應 matplotlib 的 explode）
+        number_format: 資料標籤的數值格式（標籤同時顯示數值與百分比）
+
+    Returns:
+        圖表的 GraphicFrame
+    """
+    chart_data = CategoryChartData(number_format=number_format)
+    chart_data.categories = list(categories)
+    chart_data.add_series("", list(values))
+    graphic_frame = shapes.add_chart(XL_CHART_TYPE.PIE, left, top, width, height, chart_data)
+    chart = graphic_frame.chart
+    _style_chart(chart, title, title_color, font_name, font_size)
+
+    chart.has_legend = True
+    chart.legend.position = XL_LEGEND_POSITION.RIGHT
+    chart.legend.include_in_layout = False
+
+    plot = chart.plots[0]
+    plot.has_data_labels = True
+    data_labels = plot.data_labels
+    data_labels.number_format = number_format
+    data_labels.number_format_is_linked = False
+    data_labels.show_value = True
+    data_labels.show_percentage = True
+    data_labels.show_category_name = False
+    data_labels.position = XL_LABEL_POSITION.BEST_FIT
+    data_labels.font.bold = True
+
+    series = plot.series[0]
+    for idx, color in enumerate(colors or []):
+        _fill(series.points[idx].format, color)
+    for idx, value in enumerate(values):
+        if not value:
+            # 0 值的扇區不顯示標籤（避免 "0.00 / 0%" 疊在其他標籤上）
+            series.points[idx].data_label.has_text_frame = True
+    for idx, percent in (explode or {}).items():
+        dPt = series._element.get_or_add_dPt_for_point(idx)
+        explosion = OxmlElement("c:explosion")
+        explosion.set("val", str(int(percent)))
+        dPt.insert_element_before(explosion, "c:spPr", "c:pictureOptions", "c:extLst")
+    return graphic_frame
+
+
+def add_bar_chart(
+    shapes,
+    left,
+    top,
+    width,
+    height,
+    categories: Sequence[str],
+    values: Sequence[float],
+    colors: Optional[Sequence[Color]] = None,
+    title: Optional[str] = None,
+    title_color: Optional[Color] = None,
+    horizontal: bool = True,
+    axis_title: Optional[str] = None,
+    value_range: Optional[Tuple[float, float]] = None,
+    major_unit: Optional[float] = None,
+    number_format: str = "0",
+    font_name: str = DEFAULT_FONT,
+    font_size: float = 9,
+):
+    """
+    新增原生長條圖（單一數列，每根長條可個別指定顏色）
+
+    horizontal=True 時第一個類別顯示在最上方（與 matplotlib 版本的排序一致）。
+
+    Returns:
+        圖表的 GraphicFrame
+    """
+    chart_data = CategoryChartData(number_format=number_format)
+    chart_data.categories = list(categories)
+    chart_data.add_series("", list(values))
+    chart_type = XL_CHART_TYPE.BAR_CLUSTERED if horizontal else XL_CHART_TYPE.COLUMN_CLUSTERED
+    graphic_frame = shapes.add_chart(chart_type, left, top, width, height, chart_data)
+    chart = graphic_frame.chart
+    _style_chart(chart, title, title_color, font_name, font_size)
+    chart.has_legend = False
+
+    plot = chart.plots[0]
+    plot.gap_width = 40
+    plot.has_data_labels = True
+    plot.data_labels.show_value = True
+    plot.data_labels.position = XL_LABEL_POSITION.OUTSIDE_END
+    plot.data_labels.font.bold = True
+
+    series = plot.series[0]
+    for idx, color in enumerate(colors or []):
+        _fill(series.points[idx].format, color)
+
+    category_axis = chart.category_axis
+    category_axis.format.line.fill.background()
+    category_axis.has_major_gridlines = False
+    if horizontal:
+        # 長條圖的類別預設由下往上排列；反轉後第一個類別在最上方，數值軸維持在底部
+        category_axis.reverse_order = True
+
+    value_axis = chart.value_axis
+    if value_range is not None:
+        value_axis.minimum_scale, value_axis.maximum_scale = value_range
+    if major_unit is not None:
+        value_axis.major_unit = major_unit
+    value_axis.tick_labels.number_format = number_format
+    value_axis.tick_labels.number_format_is_linked = False
+    _set_gridlines(value_axis)
+    _set_axis_title(value_axis, axis_title, font_size)
+    return graphic_frame
+
+
+def add_bubble_chart(
+    shapes,
+    left,
+    top,
+    width,
+    height,
+    points: List[Dict[str, Any]],
+    title: Optional[str] = None,
+    title_color: Optional[Color] = None,
+    x_title: Optional[str] = None,
+    y_title: Optional[str] = None,
+    axis_range: Tuple[float, float] = (0, 100),
+    major_unit: Optional[float] = None,
+    cross_at: Optional[float] = None,
+    bubble_scale: int = 100,
+    font_name: str = DEFAULT_FONT,
+    font_size: float = 8,
+):
+    """
+    新增原生泡泡圖
+
+    Args:
+        points: [{'label', 'x', 'y', 'r', 'color'}, ...]（與 BUBBLE_DATA 相同格式）；label 顯示為資料標籤
+        axis_range: X / Y 軸的最小與最大值
+        cross_at: 兩軸交會的位置（例如 50 -> 座標軸成為四象限的分隔線，刻度標籤保持在外側）
+        bubble_scale: 泡泡大小縮放百分比（PowerPoint 允許 0–300）
+
+    Returns:
+        圖表的 GraphicFrame
+    """
+    chart_data = BubbleChartData()
+    series_data = chart_data.add_series("")
+    for point in points:
+        series_data.add_data_point(point["x"], point["y"], point["r"])
+    graphic_frame = shapes.add_chart(XL_CHART_TYPE.BUBBLE, left, top, width, height, chart_data)
+    chart = graphic_frame.chart
+    _style_chart(chart, title, title_color, font_name, font_size)
+    chart.has_legend = False
+
+    plot = chart.plots[0]
+    plot.bubble_scale = bubble_scale
+    series = plot.series[0]
+    for idx, point in enumerate(points):
+        chart_point = series.points[idx]
+        _fill(chart_point.format, point.get("color"))
+        chart_point.format.line.color.rgb = RGBColor(0xFF, 0xFF, 0xFF)
+        if point.get("label"):
+            data_label = chart_point.data_label
+            data_label.has_text_frame = True
+            data_label.text_frame.text = point["label"]
+            data_label.position = XL_LABEL_POSITION.CENTER
+            data_label.font.size = Pt(max(font_size - 2, 6))
+            data_label.font.bold = True
+
+    for axis, axis_title in ((chart.category_axis, x_title), (chart.value_axis, y_title)):
+        axis.minimum_scale, axis.maximum_scale = axis_range
+        if major_unit is not None:
+            axis.major_unit = major_unit
+        if cross_at is not None:
+            axis.crosses_at = cross_at
+            axis.tick_label_position = XL_TICK_LABEL_POSITION.LOW
+            axis.format.line.color.rgb = to_rgb("#808080")
+        _set_gridlines(axis)
+        _set_axis_title(axis, axis_title, font_size)
+    return graphic_frame
@@ -0,0 +1,414 @@
+"""
+PPTX 合併器（直接操作 OPC 套件中的 part）
+
+Step 4 以前的做法是載入每個來源的 Presentation，逐一把 cSld 的子元素序列化再解析，
+並且每個關係都把整份投影片 XML 轉成字串 replace 後重新解析。這裡改為在 zip 層處理：
+- 以第一個檔案為基底：保留母片、版面配置、佈景主題等（投影片及只被投影片引用的 part 不保留）
+- 每張來源投影片只解析一次 XML（統一字型），關係 ID 保持不變，只改寫目標路徑，
+  因此投影片內容中的 r:id / r:embed 不需要任何替換
+- 投影片引用的圖片、圖表等 part 連同其下層關係一起複製並重新命名（同一來源內共用的 part 只複製一次）
+- 媒體 part 以 SHA-256 去重：不同來源中內容相同的圖片（封面、CEO 照片等）在輸出中只保存一份
+- 版面配置一律指向基底的空白版面（與舊版行為相同），備忘稿不複製
+- 輸出以 zipfile 逐一寫入，記憶體用量約等於單一 part 的大小
+"""
+import hashlib
+import posixpath
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from lxml import etree
+
+NS_P = "http://schemas.openxmlformats.org/presentationml/2006/main"
+NS_A = "http://schemas.openxmlformats.org/drawingml/2006/main"
+NS_R = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+NS_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+NS_CT = "http://schemas.openxmlformats.org/package/2006/content-types"
+
+RT_BASE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/"
+RT_OFFICE_DOCUMENT = RT_BASE + "officeDocument"
+RT_SLIDE = RT_BASE + "slide"
+RT_SLIDE_LAYOUT = RT_BASE + "slideLayout"
+RT_SLIDE_MASTER = RT_BASE + "slideMaster"
+RT_NOTES_SLIDE = RT_BASE + "notesSlide"
+
+# 已壓縮過的媒體直接以 STORED 寫入，避免重複壓縮
+STORED_EXTENSIONS = {
+    "png", "jpg", "jpeg", "gif", "tif", "tiff", "mp4", "m4v", "mov", "wmv", "avi", "mp3", "m4a", "wav", "wma",
+}
+# 參與內容去重的媒體資料夾
+MEDIA_DIR = "ppt/media/"
+# 簡報區段（p14:sectionLst）的 extLst uri，刪除投影片後必須一併移除
+SECTION_LIST_EXT_URI = "{521415D9-36F7-43E2-AB2F-B90AF26B5E84}"
+
+# (相對路徑或外部 URL, 關係類型, 目標, 是否為外部連結)
+Relationship = Tuple[str, str, str, bool]
+
+
+def _rels_name(partname: str) -> str:
+    directory, name = posixpath.split(partname)
+    return posixpath.join(directory, "_rels", f"{name}.rels")
+
+
+def _resolve(source_partname: str, target: str) -> str:
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(source_partname), target))
+
+
+def _relative(source_partname: str, target_partname: str) -> str:
+    return posixpath.relpath(target_partname, posixpath.dirname(source_partname) or ".")
+
+
+class ContentTypes:
+    """[Content_Types].xml 的 Default / Override"""
+
+    def __init__(self, xml: bytes):
+        root = etree.fromstring(xml)
+        self.defaults: Dict[str, str] = {}
+        self.overrides: Dict[str, str] = {}
+        for el in root:
+            tag = etree.QName(el).localname
+            if tag == "Default":
+                self.defaults[el.get("Extension").lower()] = el.get("ContentType")
+            elif tag == "Override":
+                self.overrides[el.get("PartName").lstrip("/")] = el.get("ContentType")
+
+    def get(self, partname: str) -> Optional[str]:
+        if partname in self.overrides:
+            return self.overrides[partname]
+        return self.defaults.get(posixpath.splitext(partname)[1].lstrip(".").lower())
+
+    def to_xml(self) -> bytes:
+        root = etree.Element(f"{{{NS_CT}}}Types", nsmap={None: NS_CT})
+        for ext, content_type in self.defaults.items():
+            etree.SubElement(root, f"{{{NS_CT}}}Default", Extension=ext, ContentType=content_type)
+        for partname, content_type in self.overrides.items():
+            etree.SubElement(root, f"{{{NS_CT}}}Override", PartName=f"/{partname}", ContentType=content_type)
+        return etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True)
+
+
+class SourcePackage:
+    """唯讀的來源 PPTX（不建立 Presentation 物件）"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.zip = zipfile.ZipFile(str(path))
+        self.names = set(self.zip.namelist())
+        self.content_types = ContentTypes(self.zip.read("[Content_Types].xml"))
+        self.presentation_partname = next(
+            target for _, rtype, target, external in self.rels("") if rtype == RT_OFFICE_DOCUMENT and not external
+        )
+
+    def close(self):
+        self.zip.close()
+
+    def read(self, partname: str) -> bytes:
+        return self.zip.read(partname)
+
+    def rels(self, partname: str) -> List[Relationship]:
+        rels_name = _rels_name(partname) if partname else "_rels/.rels"
+        if rels_name not in self.names:
+            return []
+        rels = []
+        for el in etree.fromstring(self.zip.read(rels_name)):
+            external = el.get("TargetMode") == "External"
+            target = el.get("Target")
+            rels.append((el.get("Id"), el.get("Type"), target if external else _resolve(partname, target), external))
+        return rels
+
+    def slide_partnames(self) -> List[str]:
+        """依簡報中的順序列出投影片 part"""
+        targets = {rid: target for rid, rtype, target, _ in self.rels(self.presentation_partname) if rtype == RT_SLIDE}
+        root = etree.fromstring(self.read(self.presentation_partname))
+        sld_id_lst = root.find(f"{{{NS_P}}}sldIdLst")
+        if sld_id_lst is None:
+            return []
+        return [targets[el.get(f"{{{NS_R}}}id")] for el in sld_id_lst if el.get(f"{{{NS_R}}}id") in targets]
+
+    def reachable_parts(self, skip_rtypes: Set[str]) -> Set[str]:
+        """從套件根節點出發可到達的 part（略過指定類型的關係）"""
+        seen: Set[str] = set()
+        stack = [""]
+        while stack:
+            partname = stack.pop()
+            for _, rtype, target, external in self.rels(partname):
+                if external or rtype in skip_rtypes or target in seen or target not in self.names:
+                    continue
+                seen.add(target)
+                stack.append(target)
+        return seen
+
+    def blank_layout_partname(self) -> str:
+        """與舊版相同的規則：名稱含 blank / 空白 / title only 的版面，否則第一個版面"""
+        masters = [t for _, rtype, t, ext in self.rels(self.presentation_partname) if rtype == RT_SLIDE_MASTER and not ext]
+        layouts: List[str] = []
+        for master in masters:
+            targets = {rid: t for rid, rtype, t, _ in self.rels(master) if rtype == RT_SLIDE_LAYOUT}
+            root = etree.fromstring(self.read(master))
+            id_lst = root.find(f"{{{NS_P}}}sldLayoutIdLst")
+            for el in (id_lst if id_lst is not None else []):
+                rid = el.get(f"{{{NS_R}}}id")
+                if rid in targets:
+                    layouts.append(targets[rid])
+        if not layouts:
+            raise ValueError(f"模板文件沒有可用的版面配置：{self.path.name}")
+        for layout in layouts:
+            c_sld = etree.fromstring(self.read(layout)).find(f"{{{NS_P}}}cSld")
+            name = (c_sld.get("name") or "").lower() if c_sld is not None else ""
+            if "blank" in name or "空白" in name or "title only" in name:
+                return layout
+        return layouts[0]
+
+
+class PackageWriter:
+    """逐一寫入輸出 zip，並維護 part 名稱與 content type"""
+
+    def __init__(self, output_path: Path, content_types: ContentTypes, used_names: Set[str]):
+        self.zip = zipfile.ZipFile(str(output_path), "w", zipfile.ZIP_DEFLATED)
+        self.content_types = content_types
+        self.used_names = set(used_names)
+        self._counters: Dict[Tuple[str, str, str], int] = {}
+        # 媒體內容 SHA-256 -> 輸出 part 名稱（跨所有來源共用）
+        self.media_by_hash: Dict[str, str] = {}
+        self.dedup_hits = 0
+
+    def unique_name(self, partname: str) -> str:
+        """依來源名稱產生不重複的 part 名稱（例如 ppt/media/image3.png -> ppt/media/image12.png）"""
+        directory, name = posixpath.split(partname)
+        stem, ext = posixpath.splitext(name)
+        prefix = stem.rstrip("0123456789") or stem
+        key = (directory, prefix, ext)
+        n = self._counters.get(key, 0)
+        while True:
+            n += 1
+            candidate = posixpath.join(directory, f"{prefix}{n}{ext}")
+            if candidate not in self.used_names:
+                break
+        self._counters[key] = n
+        self.used_names.add(candidate)
+        return candidate
+
+    def write(self, partname: str, data: bytes, content_type: Optional[str] = None):
+        ext = posixpath.splitext(partname)[1].lstrip(".").lower()
+        compress_type = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        self.zip.writestr(partname, data, compress_type=compress_type)
+        if content_type and self.content_types.defaults.get(ext) != content_type:
+            self.content_types.overrides[partname] = content_type
+
+    def register_media(self, partname: str, data: bytes) -> None:
+        """登記已寫入的媒體 part（基底保留的圖片也可被之後的投影片共用）"""
+        if partname.startswith(MEDIA_DIR):
+            self.media_by_hash.setdefault(hashlib.sha256(data).hexdigest(), partname)
+
+    def write_media(self, src_partname: str, data: bytes, content_type: Optional[str]) -> str:
+        """寫入媒體 part；內容相同的媒體已存在時直接返回既有的 part 名稱"""
+        digest = hashlib.sha256(data).hexdigest()
+        existing = self.media_by_hash.get(digest)
+        if existing is not None:
+            self.dedup_hits += 1
+            return existing
+        partname = self.unique_name(src_partname)
+        self.write(partname, data, content_type)
+        self.media_by_hash[digest] = partname
+        return partname
+
+    def write_rels(self, partname: str, rels: List[Relationship]):
+        root = etree.Element(f"{{{NS_REL}}}Relationships", nsmap={None: NS_REL})
+        for rid, rtype, target, external in rels:
+            el = etree.SubElement(root, f"{{{NS_REL}}}Relationship", Id=rid, Type=rtype, Target=target)
+            if external:
+                el.set("TargetMode", "External")
+        self.zip.writestr(_rels_name(partname), etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True))
+
+    def close(self):
+        self.zip.writestr("[Content_Types].xml", self.content_types.to_xml())
+        self.zip.close()
+
+
+def normalize_fonts(slide_root, target_font: str) -> None:
+    """把所有文字 run 上明確指定的拉丁字型統一為 target_font（避免字型不一致導致修復提示）"""
+    for r_pr in slide_root.iter(f"{{{NS_A}}}rPr"):
+        latin = r_pr.find(f"{{{NS_A}}}latin")
+        if latin is not None and latin.get("typeface"):
+            latin.set("typeface", target_font)
+
+
+class _SlideCopier:
+    """把一個來源檔案的投影片（及其引用的 part）複製到輸出套件"""
+
+    def __init__(self, source: SourcePackage, writer: PackageWriter, layout_partname: str,
+                 slide_map: Dict[str, str], unified_font: Optional[str]):
+        self.source = source
+        self.writer = writer
+        self.layout_partname = layout_partname
+        self.slide_map = slide_map
+        self.unified_font = unified_font
+        # 來源 part -> 輸出 part（同一來源內共用的 part 只複製一次）
+        self.copied: Dict[str, str] = {}
+
+    def _map_rels(self, src_partname: str, new_partname: str) -> List[Relationship]:
+        new_rels = []
+        for rid, rtype, target, external in self.source.rels(src_partname):
+            if external:
+                new_rels.append((rid, rtype, target, True))
+                continue
+            if rtype == RT_SLIDE_LAYOUT:
+                new_target = self.layout_partname
+            elif rtype == RT_NOTES_SLIDE:
+                continue
+            elif rtype == RT_SLIDE:
+                new_target = self.slide_map.get(target)
+                if new_target is None:
+                    continue
+            elif target not in self.source.names:
+                continue
+            else:
+                new_target = self.copy_part(target)
+            new_rels.append((rid, rtype, _relative(new_partname, new_target), False))
+        return new_rels
+
+    def copy_part(self, src_partname: str) -> str:
+        if src_partname in self.copied:
+            return self.copied[src_partname]
+        if src_partname.startswith(MEDIA_DIR) and not self.source.rels(src_partname):
+            new_partname = self.writer.write_media(
+                src_partname, self.source.read(src_partname), self.source.content_types.get(src_partname)
+            )
+            self.copied[src_partname] = new_partname
+            return new_partname
+        new_partname = self.writer.unique_name(src_partname)
+        self.copied[src_partname] = new_partname
+        new_rels = self._map_rels(src_partname, new_partname)
+        if new_rels:
+            self.writer.write_rels(new_partname, new_rels)
+        self.writer.write(new_partname, self.source.read(src_partname), self.source.content_types.get(src_partname))
+        return new_partname
+
+    def copy_slide(self, src_partname: str) -> None:
+        new_partname = self.slide_map[src_partname]
+        slide_root = etree.fromstring(self.source.read(src_partname))
+        if self.unified_font:
+            normalize_fonts(slide_root, self.unified_font)
+        self.writer.write_rels(new_partname, self._map_rels(src_partname, new_partname))
+        self.writer.write(
+            new_partname,
+            etree.tostring(slide_root, xml_declaration=True, encoding="UTF-8", standalone=True),
+            self.source.content_types.get(src_partname),
+        )
+
+
+def _rewrite_presentation(base: SourcePackage, slide_partnames: List[str], writer: PackageWriter) -> None:
+    """重寫 presentation.xml 與其關係：移除基底的投影片，加入合併後的投影片"""
+    pres_name = base.presentation_partname
+    rels = [r for r in base.rels(pres_name) if r[1] != RT_SLIDE]
+    used_ids = {rid for rid, _, _, _ in rels}
+
+    root = etree.fromstring(base.read(pres_name))
+    sld_id_lst = root.find(f"{{{NS_P}}}sldIdLst")
+    if sld_id_lst is None:
+        sld_id_lst = etree.Element(f"{{{NS_P}}}sldIdLst")
+        sld_sz = root.find(f"{{{NS_P}}}sldSz")
+        if sld_sz is not None:
+            sld_sz.addprevious(sld_id_lst)
+        else:
+            root.append(sld_id_lst)
+    for child in list(sld_id_lst):
+        sld_id_lst.remove(child)
+
+    n = 0
+    for index, slide_partname in enumerate(slide_partnames):
+        while True:
+            n += 1
+            rid = f"rId{n}"
+            if rid not in used_ids:
+                break
+        used_ids.add(rid)
+        rels.append((rid, RT_SLIDE, slide_partname, False))
+        etree.SubElement(sld_id_lst, f"{{{NS_P}}}sldId", {"id": str(256 + index), f"{{{NS_R}}}id": rid})
+
+    # 自訂放映與區段會引用已刪除的投影片 id，一併移除
+    for cust_show_lst in root.findall(f"{{{NS_P}}}custShowLst"):
+        root.remove(cust_show_lst)
+    ext_lst = root.find(f"{{{NS_P}}}extLst")
+    if ext_lst is not None:
+        for ext in list(ext_lst):
+            if ext.get("uri") == SECTION_LIST_EXT_URI:
+                ext_lst.remove(ext)
+
+    writer.write_rels(pres_name, [
+        (rid, rtype, target if external else _relative(pres_name, target), external)
+        for rid, rtype, target, external in rels
+    ])
+    writer.write(
+        pres_name,
+        etree.tostring(root, xml_declaration=True, encoding="UTF-8", standalone=True),
+        base.content_types.get(pres_name),
+    )
+
+
+def merge_pptx_packages(
+    file_paths: List[Path],
+    output_path: Path,
+    unified_font: Optional[str] = "Microsoft JhengHei",
+    on_file_done: Optional[Callable[[Path, int, Optional[Exception]], None]] = None,
+) -> int:
+    """
+    合併多個 PPTX（依 file_paths 順序），返回合併後的總頁數
+
+    Args:
+        file_paths: 來源檔案（第一個檔案同時作為母片 / 版面配置的基底）
+        output_path: 輸出檔案路徑
+        unified_font: 統一的文字字型（None 表示不處理）
+        on_file_done: 每個來源處理完後的回呼 (路徑, 頁數, 例外或 None)
+    """
+    if not file_paths:
+        raise ValueError("沒有文件可以合併")
+
+    base = SourcePackage(file_paths[0])
+    try:
+        # 基底中除了投影片（及只被投影片引用的 part）以外都保留
+        keep = base.reachable_parts(skip_rtypes={RT_SLIDE})
+        content_types = ContentTypes(base.read("[Content_Types].xml"))
+        content_types.overrides = {k: v for k, v in content_types.overrides.items() if k in keep}
+        keep_files = {name for name in base.names if name in keep or name == "_rels/.rels"}
+        keep_files |= {_rels_name(name) for name in keep if _rels_name(name) in base.names}
+        pres_files = {base.presentation_partname, _rels_name(base.presentation_partname)}
+
+        layout_partname = base.blank_layout_partname()
+
+        writer = PackageWriter(output_path, content_types, keep_files)
+        for name in sorted(keep_files - pres_files):
+            data = base.read(name)
+            writer.write(name, data)
+            writer.register_media(name, data)
+
+        merged_slides: List[str] = []
+        for file_path in file_paths:
+            source = base if Path(file_path) == Path(file_paths[0]) else None
+            count = 0
+            try:
+                source = source or SourcePackage(file_path)
+                src_slides = source.slide_partnames()
+                slide_map = {name: writer.unique_name("ppt/slides/slide1.xml") for name in src_slides}
+                copier = _SlideCopier(source, writer, layout_partname, slide_map, unified_font)
+                for src_slide in src_slides:
+                    copier.copy_slide(src_slide)
+                    merged_slides.append(slide_map[src_slide])
+                    count += 1
+                error = None
+            except Exception as e:
+                error = e
+            finally:
+                if source is not None and source is not base:
+                    source.close()
+            if on_file_done:
+                on_file_done(Path(file_path), count, error)
+
+        _rewrite_presentation(base, merged_slides, writer)
+        writer.close()
+        if writer.dedup_hits:
+            print(f"[PPTX Merger] 媒體去重：{writer.dedup_hits} 個重複的媒體 part 共用既有內容")
+        return len(merged_slides)
+    finally:
+        base.close()
@@ -0,0 +1,21 @@
+"""
+報告生成的呼叫層級參數（取代修改引擎 config 模組的全域變數）
+
+wrapper 以前把 API Key、輸出目錄寫進 config_pptx_company / config_pptx 的模組變數，
+排放數據則透過 emission_pptx.EMISSION_DATA；同一個程序中同時生成兩份報告時會互相覆蓋。
+現在每次呼叫建立一個 ReportContext，一路傳給 PPTContentEngine / PPTFullEngine，
+引擎只在欄位為 None 時才退回 config 的預設值（直接執行 main_pptx*.py 時的行為不變）。
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+@dataclass(frozen=True)
+class ReportContext:
+    api_key: Optional[str] = None                       # Claude API Key
+    output_dir: Optional[Path] = None                   # PPTX 輸出資料夾
+    company_name: Optional[str] = None                  # 公司名稱（替換 "本公司" / "our company"）
+    session_id: Optional[str] = None                    # Step 1 的 session_id（讀取同一個 session 的環境段 log）
+    emission_data: Optional[Dict[str, Any]] = None      # 排放數據（emission_pptx.build_emission_data 的輸入）
+    log_dir: Optional[Path] = None                      # Step 1 session log 資料夾（未指定時為 env_log_reader.DEFAULT_LOG_DIR）
@@ -0,0 +1,161 @@
+"""
+段落生成工作（job_queue 的 handler）
+
+Step 2（公司段）與 Step 3（治理與社會段）的生成、摘要與 session log 都在背景工作內完成，
+頁面只負責送出工作、輪詢進度，完成後從工作結果取回輸出路徑與摘要。
+
+包裝器以 ReportContext 傳遞參數、不修改全域狀態，多個工作可以同時在執行緒池中執行。
+
+一鍵完整報告（FULL_REPORT）以 dag_scheduler 依 report_pipeline.STAGE_DEPENDENCIES 平行執行 Step 1–4，
+每個階段的狀態寫入工作的 detail，頁面據此顯示各階段進度。
+"""
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from shared.config import (
+    BACKEND_LOGS, ESG_OUTPUT_ROOT, OUTPUT_C_ENVIRONMENT, OUTPUT_D_COMPANY, OUTPUT_F_GOVSOCI,
+)
+from shared.job_queue import JobQueue, get_job_queue
+from shared.session_journal import append_session_log
+
+COMPANY_SECTION = "company_section"
+GOVSOCI_SECTION = "govsoci_section"
+FULL_REPORT = "full_report"
+
+
+def _save_session_log(session_data: Dict[str, Any]) -> None:
+    """儲存用戶 session log 到後台（每次一個新的 session_id：同一秒完成的工作不會合併到同一個日誌）"""
+    from shared.report_pipeline import new_session_id
+    session_id = new_session_id()
+    log_file = append_session_log(BACKEND_LOGS, session_data, session_id=session_id)
+    print(f"  ✓ Session log 已儲存: {log_file.name}")
+
+
+def _summarize(step: str, context_data: Dict[str, Any], api_key: str) -> str:
+    from shared.utils import generate_report_summary
+    return generate_report_summary(step, context_data, api_key, False)
+
+
+def run_company_section(params: Dict[str, Any], secrets: Dict[str, Any], progress: Callable[[int, str], None]) -> Dict[str, Any]:
+    """Step 2：公司段 PPTX + 摘要 + session log"""
+    from company_engine_wrapper_zh import generate_company_section_zh
+    from shared.report_pipeline import STEP1_LOG_DIR
+
+    api_key = secrets.get("api_key", "")
+    company_name = params.get("company_name") or None
+
+    progress(10, "🔄 正在生成公司段內容...")
+    output_path, error = generate_company_section_zh(
+        api_key=api_key,
+        company_name=company_name,
+        output_dir=Path(params.get("output_dir") or OUTPUT_D_COMPANY),
+        session_id=params.get("session_id"),
+        log_dir=STEP1_LOG_DIR,  # Step 1 頁面寫入的資料夾（引擎預設的 DEFAULT_LOG_DIR 找不到該 session）
+    )
+    if error:
+        raise RuntimeError(error)
+
+    progress(85, "📝 正在生成報告摘要...")
+    summary = _summarize("Step 2", {"company_name": company_name or "本公司"}, api_key)
+
+    # 保存 session log（包含產業別和 TCFD 市場摘錄）
+    _save_session_log({
+        "step": "Step 2",
+        "company_name": company_name or "本公司",
+        "industry": params.get("industry", ""),
+        "tcfd_market_trend": params.get("tcfd_market_trend", ""),
+        "output_path": str(output_path),
+        "summary": summary,
+    })
+    return {"output_path": str(output_path), "output_filename": Path(output_path).name, "summary": summary}
+
+
+def run_govsoci_section(params: Dict[str, Any], secrets: Dict[str, Any], progress: Callable[[int, str], None]) -> Dict[str, Any]:
+    """Step 3：治理與社會段 PPTX + 摘要 + session log"""
+    from govsoci_engine_wrapper_zh import generate_govsoci_section_zh
+    from shared.report_pipeline import STEP1_LOG_DIR
+
+    api_key = secrets.get("api_key", "")
+
+    progress(10, "🔄 正在生成治理與社會段內容...")
+    output_path, error = generate_govsoci_section_zh(
+        api_key=api_key,
+        output_dir=Path(params.get("output_dir") or OUTPUT_F_GOVSOCI),
+        session_id=params.get("session_id"),
+        log_dir=STEP1_LOG_DIR,
+    )
+    if error:
+        raise RuntimeError(error)
+
+    progress(85, "📝 正在生成報告摘要...")
+    summary = _summarize("Step 3", {}, api_key)
+
+    _save_session_log({
+        "step": "Step 3",
+        "output_path": str(output_path),
+        "summary": summary,
+    })
+    return {"output_path": str(output_path), "output_filename": Path(output_path).name, "summary": summary}
+
+
+def run_full_report(params: Dict[str, Any], secrets: Dict[str, Any], progress: Callable[..., None]) -> Dict[str, Any]:
+    """一鍵完整報告：碳排放 -> TCFD 表格 + 產業別分析 -> {環境篇, 公司段, 治理與社會段} -> 合併"""
+    from shared import report_pipeline as pipeline
+    from shared.dag_scheduler import RUNNING, SUCCEEDED, run_dag
+
+    api_key = secrets.get("api_key", "")
+    session_id = params.get("session_id") or pipeline.new_session_id()
+    report_path = ESG_OUTPUT_ROOT / f"ESG完整報告_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pptx"
+    stages = pipeline.build_report_stages(
+        api_key,
+        params,
+        session_id,
+        {"environment": OUTPUT_C_ENVIRONMENT, "company": OUTPUT_D_COMPANY, "govsoci": OUTPUT_F_GOVSOCI},
+        report_path,
+        uncertainty=bool(params.get("uncertainty")),
+        log_dir=pipeline.STEP1_LOG_DIR,
+    )
+
+    def on_update(states: Dict[str, Dict[str, Any]]) -> None:
+        done = sum(1 for state in states.values() if state["status"] == SUCCEEDED)
+        running = [pipeline.STAGE_LABELS[stage] for stage, state in states.items() if state["status"] == RUNNING]
+        message = f"🔄 {'、'.join(running)}" if running else "⏳ 準備中..."
+        progress(done * 100 // len(states), message, {"session_id": session_id, "stages": states})
+
+    results = run_dag(stages, pipeline.STAGE_DEPENDENCIES, on_update=on_update)
+
+    outputs = {stage: results[stage]["path"] for stage in ("environment", "company", "govsoci", "merge")}
+    _save_session_log({
+        "step": "Step 1-4（一鍵完整報告）",
+        "company_name": params.get("company_name") or "本公司",
+        "industry": params.get("industry", ""),
+        "source_session_id": session_id,
+        "outputs": outputs,
+        "slides": results["merge"]["slides"],
+    })
+    return {
+        "session_id": session_id,
+        "output_path": outputs["merge"],
+        "output_filename": Path(outputs["merge"]).name,
+        "slides": results["merge"]["slides"],
+        "outputs": outputs,
+        "emission_data": results["emission"],
+        "company_profile": results["step1_log"],
+        "tcfd_tables": results["tcfd_tables"]["tcfd_tables"],
+        "tcfd_summary": results["tcfd_tables"]["tcfd_summary"],
+    }
+
+
+def get_report_job_queue() -> JobQueue:
+    """取得已登錄段落生成工作的 JobQueue"""
+    queue = get_job_queue()
+    queue.register(COMPANY_SECTION, run_company_section)
+    queue.register(GOVSOCI_SECTION, run_govsoci_section)
+    queue.register(FULL_REPORT, run_full_report)
+    return queue
+
+
+def submit_section_job(kind: str, api_key: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """送出段落生成工作（API Key 只傳給 handler，不寫入工作紀錄）"""
+    return get_report_job_queue().submit(kind, params or {}, secrets={"api_key": api_key})
@@ -0,0 +1,278 @@
+"""
+完整報告的各個生成階段（不依賴 Streamlit，供批次生成與背景工作共用）
+
+Step 1–4 的邏輯以前散落在各頁面的按鈕事件中，只能在瀏覽器中逐步點擊執行。
+這裡把每個階段整理成一個獨立的函數，輸入輸出都是一般的 dict / 路徑：
+
+- estimate_emissions        -> 碳排放估算（emission_calc / emission_uncertainty）
+- write_step1_log           -> Step 1 session log（產業分析與公司段 / 治理段讀取的資料來源）
+- run_industry_analysis     -> 150 字產業別分析（company1.1-3.6/industry_analysis）
+- run_tcfd_tables           -> 5 個 TCFD 表格（shared.tcfd_tables）
+- generate_environment_deck -> 環境篇 PPTX（EnvironmentPPTXEngine）
+- generate_company_deck     -> 公司段 PPTX（company_engine_wrapper_zh）
+- generate_govsoci_deck     -> 治理與社會段 PPTX（govsoci_engine_wrapper_zh）
+- merge_report              -> Step 4 合併（shared.pptx_merger）
+
+每個階段失敗時直接拋出例外，由呼叫端決定重試或略過。
+STAGE_DEPENDENCIES / build_report_stages 把這些階段組成相依圖，交給 shared.dag_scheduler 平行執行。
+"""
+import sys
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from shared.session_journal import append_session_log
+from shared.tcfd_tables import TCFD_MODEL, calculate_company_profile, generate_tcfd_tables
+
+BASE_DIR = Path(__file__).parent.parent.parent  # ESG--report/
+EMISSION_ENGINE_PATH = BASE_DIR / "emission"
+ENV_REPORT_PATH = BASE_DIR / "environment report"
+COMPANY_ENGINE_PATH = BASE_DIR / "company1.1-3.6"
+ENV_TEMPLATE_PATH = ENV_REPORT_PATH / "assets" / "templet_english.pptx"
+# Step 1 的 session log 寫入 TCFD generator/logs（industry_analysis.LOG_FILE_BASE 讀取同一個資料夾）
+# 公司段 / 治理社會段引擎預設讀取 env_log_reader.DEFAULT_LOG_DIR，需以 log_dir 參數指向這裡
+STEP1_LOG_DIR = Path(__file__).parent.parent / "logs"
+
+# Detail 模式的活動數據欄位（與 Step 1 頁面的輸入欄位相同）
+EMISSION_ACTIVITY_FIELDS = (
+    "price_per_kwh_ntd",
+    "annual_kwh",
+    "car_count",
+    "motorcycles",
+    "gasoline_liters_year",
+    "refrigerant_leak_kg",
+    "refrigerant_gwp",
+)
+
+
+def new_session_id() -> str:
+    """時間戳 + 隨機後綴（同一秒內送出多份報告時 session log 不會互相覆蓋）"""
+    return f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+
+
+def _ensure_path(path: Path) -> None:
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+def estimate_emissions(monthly_bill_ntd: float, activity: Optional[Dict[str, Any]] = None, uncertainty: bool = False) -> Dict[str, Any]:
+    """
+    碳排放估算（與 Step 1 子步驟1 相同）
+
+    Args:
+        monthly_bill_ntd: 月電費
+        activity: Detail 模式的活動數據（EMISSION_ACTIVITY_FIELDS）；沒有任何欄位時使用 Quick 模式
+        uncertainty: 是否計算 Monte Carlo 不確定性區間
+
+    Returns:
+        emission_data（scope1 / scope2 / total / gasoline / refrigerant / electricity / uncertainty / 占比）
+    """
+    _ensure_path(EMISSION_ENGINE_PATH)
+    from emission_calc import Inputs, estimate
+
+    activity = {k: v for k, v in (activity or {}).items() if k in EMISSION_ACTIVITY_FIELDS and v is not None}
+    if activity:
+        inp = Inputs(mode="detail", monthly_bill_ntd=monthly_bill_ntd or None, **activity)
+    else:
+        inp = Inputs(
+            mode="quick",
+            monthly_bill_ntd=monthly_bill_ntd or None,
+            price_per_kwh_ntd=4.4,
+            use_rule_of_thumb=True,
+        )
+    result = estimate(inp)
+
+    bands = None
+    if uncertainty:
+        from emission_uncertainty import estimate_uncertainty
+        mc = estimate_uncertainty(inp)
+        bands = {
+            "scope1": mc["Scope1_合計"],
+            "scope2": mc["Scope2_電力"],
+            "scope3": mc["Scope3_小項"],
+            "total": mc["總排放_S1S2"],
+        }
+
+    return {
+        "scope1": result['Scope1_合計'],
+        "scope2": result['Scope2_電力'],
+        "total": result['總排放_S1S2'],
+        "gasoline": result['Scope1_車輛'],
+        "refrigerant": result['Scope1_冷媒'],
+        "electricity": result['Scope2_電力'],
+        "uncertainty": bands,
+        "占比": result['占比(%)']
+    }
+
+
+def write_step1_log(session_id: str, industry: str, monthly_bill_ntd: float, emission_data: Dict[str, Any],
+                    company_name: Optional[str] = None, log_dir: Path = STEP1_LOG_DIR) -> Dict[str, Any]:
+    """
+    寫入 Step 1 session log，返回 company_profile
+
+    寫入後以引擎的 env_log_reader 讀回，確認之後的階段能以 session_id 找到這筆 log，
+    找不到時拋出 RuntimeError（否則引擎會默默改用其他 session 最新的 log）
+    """
+    company_profile = calculate_company_profile(monthly_bill_ntd, industry)
+    append_session_log(log_dir, {
+        "session_id": session_id,
+        "step": "Step 1 - 子步驟1",
+        "company_name": company_name or "本公司",
+        "industry": industry,
+        "monthly_bill": monthly_bill_ntd,
+        "monthly_bill_ntd": monthly_bill_ntd,
+        "company_profile": company_profile,
+        "emission_data": emission_data,
+        "emission_result": {"total": emission_data.get("total", 0.0)},
+    })
+
+    from shared.engine_loader import load_engine_module
+    env_log_reader = load_engine_module(COMPANY_ENGINE_PATH, "env_log_reader")
+    found = env_log_reader.load_latest_environment_log(log_dir=log_dir, session_id=session_id) or {}
+    if found.get("session_id") != session_id:
+        raise RuntimeError(f"寫入後找不到 session {session_id} 的 Step 1 log：{log_dir}")
+    return company_profile
+
+
+def run_industry_analysis(session_id: str, api_key: str) -> Dict[str, Any]:
+    """150 字產業別分析（讀取 write_step1_log 寫入的 log，結果寫入 session_{id}_industry_analysis.json）"""
+    from shared.engine_loader import load_engine_module
+    industry_analysis = load_engine_module(COMPANY_ENGINE_PATH, "industry_analysis")
+    return industry_analysis.generate_industry_analysis(session_id=session_id, api_key=api_key, model=TCFD_MODEL)
+
+
+def run_tcfd_tables(api_key: str, industry: str, company_profile: Dict[str, Any]) -> Dict[str, Any]:
+    """5 個 TCFD 表格（results / tcfd_tables / tcfd_summary）"""
+    from shared.anthropic_pool import get_anthropic_client
+    return generate_tcfd_tables(get_anthropic_client(api_key), industry, company_profile)
+
+
+def generate_environment_deck(api_key: str, industry: str, company_profile: Dict[str, Any], emission_data: Dict[str, Any],
+                              tcfd_tables: Dict[str, List[str]], output_dir: Path, test_mode: bool = False) -> Path:
+    """環境篇 PPTX（與 Step 1 子步驟3 相同），返回輸出路徑"""
+    _ensure_path(ENV_REPORT_PATH)
+    from environment_pptx import EnvironmentPPTXEngine
+
+    engine = EnvironmentPPTXEngine(
+        template_path=str(ENV_TEMPLATE_PATH) if ENV_TEMPLATE_PATH.exists() else None,
+        test_mode=test_mode,
+        api_key=api_key,
+        industry=industry,
+        company_profile=company_profile,
+        emission_data=emission_data,
+        tcfd_tables=tcfd_tables,
+    )
+    engine.generate()
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    output_path = output_dir / f"ESG環境篇_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pptx"
+    engine.save(str(output_path))
+    if not output_path.exists():
+        raise RuntimeError(f"檔案儲存失敗：{output_path}")
+    return output_path
+
+
+def generate_company_deck(api_key: str, company_name: Optional[str], output_dir: Path, session_id: Optional[str] = None,
+                          log_dir: Optional[Path] = None) -> Path:
+    """公司段 PPTX（Step 2）；log_dir 為 write_step1_log 寫入的資料夾"""
+    from company_engine_wrapper_zh import generate_company_section_zh
+    output_path, error = generate_company_section_zh(
+        api_key=api_key, company_name=company_name, output_dir=Path(output_dir), session_id=session_id, log_dir=log_dir
+    )
+    if error:
+        raise RuntimeError(error)
+    return Path(output_path)
+
+
+def generate_govsoci_deck(api_key: str, output_dir: Path, session_id: Optional[str] = None,
+                          log_dir: Optional[Path] = None) -> Path:
+    """治理與社會段 PPTX（Step 3）；log_dir 為 write_step1_log 寫入的資料夾"""
+    from govsoci_engine_wrapper_zh import generate_govsoci_section_zh
+    output_path, error = generate_govsoci_section_zh(
+        api_key=api_key, output_dir=Path(output_dir), session_id=session_id, log_dir=log_dir
+    )
+    if error:
+        raise RuntimeError(error)
+    return Path(output_path)
+
+
+def merge_report(section_paths: List[Path], output_path: Path, unified_font: Optional[str] = "Microsoft JhengHei") -> int:
+    """Step 4：依 公司段 -> 環境篇 -> 治理與社會段 的順序合併，返回總頁數"""
+    from shared.pptx_merger import merge_pptx_packages
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    return merge_pptx_packages([Path(p) for p in section_paths], output_path, unified_font=unified_font)
+
+
+# ============ 相依圖（shared.dag_scheduler） ============
+# 階段 -> 前置階段：公司段 / 治理社會段只需要 Step 1 log 與產業別分析，與 TCFD 表格、環境篇平行執行
+STAGE_DEPENDENCIES = {
+    "emission": (),
+    "step1_log": ("emission",),
+    "industry_analysis": ("step1_log",),
+    "tcfd_tables": ("step1_log",),
+    "environment": ("emission", "step1_log", "tcfd_tables"),
+    "company": ("step1_log", "industry_analysis"),
+    "govsoci": ("step1_log", "industry_analysis"),
+    "merge": ("company", "environment", "govsoci"),
+}
+
+STAGE_LABELS = {
+    "emission": "🌱 碳排放計算",
+    "step1_log": "📝 Step 1 log",
+    "industry_analysis": "👑 產業別分析",
+    "tcfd_tables": "📊 TCFD 表格",
+    "environment": "🌍 環境篇",
+    "company": "🏢 公司段",
+    "govsoci": "🏛️ 治理與社會段",
+    "merge": "📚 彙整總報告",
+}
+
+
+def build_report_stages(
+    api_key: str,
+    company: Dict[str, Any],
+    session_id: str,
+    output_dirs: Dict[str, Path],
+    report_path: Path,
+    uncertainty: bool = False,
+    log_dir: Path = STEP1_LOG_DIR,
+) -> Dict[str, Callable[[Dict[str, Any]], Any]]:
+    """
+    建立完整報告各階段的函數（供 dag_scheduler.run_dag 使用，結果皆可 JSON 序列化）
+
+    Args:
+        company: {company_name, industry, monthly_bill_ntd, activity}
+        output_dirs: {"environment": ..., "company": ..., "govsoci": ...} 各段 PPTX 的輸出資料夾
+        report_path: 合併後的完整報告路徑
+        log_dir: Step 1 session log 資料夾（公司段 / 治理社會段從同一個資料夾讀取該 session）
+    """
+    industry = company.get("industry") or "企業"
+    company_name = company.get("company_name") or None
+
+    return {
+        "emission": lambda up: estimate_emissions(company["monthly_bill_ntd"], company.get("activity"), uncertainty),
+        "step1_log": lambda up: write_step1_log(
+            session_id, industry, company["monthly_bill_ntd"], up["emission"], company_name, log_dir=log_dir
+        ),
+        "industry_analysis": lambda up: {
+            "industry_analysis": run_industry_analysis(session_id, api_key).get("industry_analysis", "")
+        },
+        "tcfd_tables": lambda up: {
+            key: value for key, value in run_tcfd_tables(api_key, industry, up["step1_log"]).items()
+            if key in ("tcfd_tables", "tcfd_summary")
+        },
+        "environment": lambda up: {"path": str(generate_environment_deck(
+            api_key, industry, up["step1_log"], up["emission"], up["tcfd_tables"]["tcfd_tables"], output_dirs["environment"]
+        ))},
+        "company": lambda up: {"path": str(generate_company_deck(
+            api_key, company_name, output_dirs["company"], session_id, log_dir=log_dir
+        ))},
+        "govsoci": lambda up: {"path": str(generate_govsoci_deck(api_key, output_dirs["govsoci"], session_id, log_dir=log_dir))},
+        "merge": lambda up: {
+            "path": str(report_path),
+            "slides": merge_report([up["company"]["path"], up["environment"]["path"], up["govsoci"]["path"]], report_path),
+        },
+    }
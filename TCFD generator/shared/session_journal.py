@@ -0,0 +1,193 @@
+"""
+Session log 日誌（append-only）
+
+以前各頁面的 save_session_log 每次更新都讀取整個 session_{id}.json、合併 dict、
+重寫整個檔案並 fsync。這裡改為：
+- session_{id}.json          -> 快照（第一次寫入時建立，壓縮時更新）
+- session_{id}.journal.jsonl -> 之後每次更新只附加一行 JSON（寫入成本只與更新大小有關）
+- session_{id}.lock          -> 檔案鎖，同一個 session 的並行 rerun 不會互相覆蓋
+
+讀取時以「快照 + 日誌尾端」依序 dict.update 合併（與舊版「新數據覆蓋舊數據」相同）。
+日誌超過 SESSION_JOURNAL_COMPACT_BYTES 時自動壓縮回快照。
+
+環境變數：
+- SESSION_JOURNAL_COMPACT_BYTES -> 觸發壓縮的日誌大小（預設 262144）
+- SESSION_JOURNAL_FSYNC=1       -> 每次附加後 fsync（預設只 flush）
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from shared.session_store import get_session_store, record_session_log
+
+COMPACT_BYTES = int(os.getenv("SESSION_JOURNAL_COMPACT_BYTES", str(256 * 1024)))
+FSYNC = os.getenv("SESSION_JOURNAL_FSYNC", "0") == "1"
+
+_thread_lock = threading.Lock()
+
+
+def journal_path(snapshot_path: Path) -> Path:
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(f"{snapshot_path.stem}.journal.jsonl")
+
+
+def _lock_path(snapshot_path: Path) -> Path:
+    snapshot_path = Path(snapshot_path)
+    return snapshot_path.with_name(f"{snapshot_path.stem}.lock")
+
+
+@contextmanager
+def _session_lock(snapshot_path: Path):
+    """跨程序的檔案鎖（Windows 使用 msvcrt，其他平台使用 fcntl）"""
+    lock_file = _lock_path(snapshot_path)
+    lock_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_file, "a+b") as f:
+        if os.name == "nt":
+            import msvcrt
+            while True:
+                try:
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            try:
+                yield
+            finally:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _read_snapshot(snapshot_path: Path) -> Dict[str, Any]:
+    if not snapshot_path.exists():
+        return {}
+    try:
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except Exception:
+        return {}
+
+
+def _apply_journal(data: Dict[str, Any], journal: Path) -> Dict[str, Any]:
+    if not journal.exists():
+        return data
+    with open(journal, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                update = json.loads(line)
+            except json.JSONDecodeError:
+                # 寫到一半的最後一行（程序中斷），忽略
+                continue
+            if isinstance(update, dict):
+                data.update(update)
+    return data
+
+
+def read_session_log(snapshot_path: Path) -> Tuple[Dict[str, Any], float]:
+    """
+    讀取合併後的 session log（快照 + 日誌尾端）
+
+    Returns:
+        (合併後的資料, 最後更新時間 mtime)
+    """
+    snapshot_path = Path(snapshot_path)
+    journal = journal_path(snapshot_path)
+    data = _apply_journal(_read_snapshot(snapshot_path), journal)
+    mtimes = [p.stat().st_mtime for p in (snapshot_path, journal) if p.exists()]
+    return data, max(mtimes) if mtimes else 0.0
+
+
+def _write_snapshot(snapshot_path: Path, data: Dict[str, Any]) -> None:
+    tmp_path = snapshot_path.with_name(f"{snapshot_path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, snapshot_path)
+
+
+def compact_session_log(snapshot_path: Path) -> Dict[str, Any]:
+    """把日誌合併回快照並清空日誌（呼叫端需持有 session 鎖）"""
+    snapshot_path = Path(snapshot_path)
+    journal = journal_path(snapshot_path)
+    data = _apply_journal(_read_snapshot(snapshot_path), journal)
+    _write_snapshot(snapshot_path, data)
+    if journal.exists():
+        journal.unlink()
+    return data
+
+
+def append_session_log(log_dir: Path, session_data: Dict[str, Any], session_id: Optional[str] = None) -> Path:
+    """
+    附加一筆 session 更新
+
+    Args:
+        log_dir: log 資料夾
+        session_data: 本次更新的欄位
+        session_id: 指定 session_id（預設使用 session_data 內的值或以目前時間產生）
+
+    Returns:
+        快照檔案路徑 session_{id}.json
+    """
+    log_dir = Path(log_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    session_id = session_id or session_data.get("session_id") or datetime.now().strftime("%Y%m%d_%H%M%S")
+    update = dict(session_data)
+    update["session_id"] = session_id
+    update["timestamp"] = datetime.now().isoformat()
+
+    snapshot_path = log_dir / f"session_{session_id}.json"
+    journal = journal_path(snapshot_path)
+
+    with _thread_lock, _session_lock(snapshot_path):
+        if not snapshot_path.exists() and not journal.exists():
+            # 新 session：直接寫出快照，讓只看 *.json 的讀取端也能看到
+            _write_snapshot(snapshot_path, update)
+            record_session_log(snapshot_path, update)
+            return snapshot_path
+
+        with open(journal, "a", encoding="utf-8") as f:
+            f.write(json.dumps(update, ensure_ascii=False) + "\n")
+            f.flush()
+            if FSYNC:
+                os.fsync(f.fileno())
+            journal_size = f.tell()
+
+        if journal_size > COMPACT_BYTES:
+            merged = compact_session_log(snapshot_path)
+            record_session_log(snapshot_path, merged)
+            print(f"[Session Journal] 已壓縮: {snapshot_path.name}")
+        else:
+            _merge_into_index(snapshot_path, update)
+
+    return snapshot_path
+
+
+def _merge_into_index(snapshot_path: Path, update: Dict[str, Any]) -> None:
+    """在 session 索引中合併本次更新（索引內沒有舊資料時才讀取快照 + 日誌）"""
+    store = get_session_store()
+    if store is None:
+        return
+    try:
+        if not store.merge(snapshot_path, update):
+            data, _ = read_session_log(snapshot_path)
+            store.record(snapshot_path, data, mtime=time.time())
+    except Exception as e:
+        print(f"[Session Journal] ⚠️ 更新索引失敗: {e}")
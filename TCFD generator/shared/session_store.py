@@ -0,0 +1,257 @@
+"""
+Session log 索引（SQLite）
+
+各頁面的 save_session_log（經由 session_journal）寫出 session 檔案時，同時把內容寫入這裡的索引；
+env_log_reader 不再逐一開啟並解析資料夾中所有 JSON，而是以 (log_dir, session_id)、
+(log_dir, is_step1, has_industry, mtime) 等索引查詢，查詢成本為 O(log n)。
+
+第一次查詢某個 log 資料夾時會一次性匯入既有的 JSON（回填）；之後只有在資料夾
+內容被外部改動（資料夾 mtime 變化）時，才會重新解析新增或變更過的檔案。
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from shared.config import BACKEND_PATH
+
+SESSION_STORE_PATH = BACKEND_PATH / "session_store.sqlite3"
+
+# (檔名, log 資料)
+LogRecord = Tuple[str, Dict[str, Any]]
+
+
+def _is_step1(data: Dict[str, Any]) -> bool:
+    return "step 1" in str(data.get("step", "")).lower()
+
+
+def _has_industry(data: Dict[str, Any]) -> bool:
+    industry = data.get("industry")
+    return bool(industry and str(industry).strip())
+
+
+class SessionStore:
+    """以 SQLite 索引 session log，供 env_log_reader 查詢"""
+
+    def __init__(self, path: Path = SESSION_STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS session_logs (
+                    log_dir TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    session_id TEXT,
+                    step TEXT,
+                    is_step1 INTEGER NOT NULL,
+                    has_industry INTEGER NOT NULL,
+                    timestamp TEXT,
+                    mtime REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (log_dir, name)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_logs_session ON session_logs(log_dir, session_id, mtime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_logs_step ON session_logs(log_dir, is_step1, has_industry, mtime)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_session_logs_mtime ON session_logs(log_dir, mtime)")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS indexed_dirs (
+                    log_dir TEXT PRIMARY KEY,
+                    dir_mtime REAL NOT NULL
+                )
+                """
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        """開啟連線：區塊結束時提交（例外時回滾）並關閉（sqlite3 的 with 只負責交易，不會關閉連線）"""
+        conn = sqlite3.connect(str(self.path), timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _dir_key(log_dir: Path) -> str:
+        return str(Path(log_dir).resolve())
+
+    # ------------------------------------------------------------------
+    # 寫入
+    # ------------------------------------------------------------------
+    def record(self, log_file: Path, data: Dict[str, Any], mtime: Optional[float] = None) -> None:
+        """寫入（或覆寫）一筆 log；由 save_session_log 在寫出 JSON 後呼叫"""
+        log_file = Path(log_file)
+        dir_key = self._dir_key(log_file.parent)
+        if mtime is None:
+            try:
+                mtime = log_file.stat().st_mtime
+            except OSError:
+                mtime = time.time()
+        with self._connect() as conn:
+            self._upsert(conn, dir_key, log_file.name, data, mtime)
+            self._touch_dir(conn, log_file.parent, dir_key)
+
+    def merge(self, log_file: Path, update: Dict[str, Any]) -> bool:
+        """
+        把一筆增量更新合併進既有的索引資料（session 日誌附加時使用）
+
+        Returns:
+            索引內沒有這個檔案時返回 False（呼叫端需改用 record 寫入完整資料）
+        """
+        log_file = Path(log_file)
+        dir_key = self._dir_key(log_file.parent)
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT data FROM session_logs WHERE log_dir = ? AND name = ?",
+                (dir_key, log_file.name),
+            ).fetchone()
+            if row is None:
+                return False
+            data = json.loads(row[0])
+            data.update(update)
+            self._upsert(conn, dir_key, log_file.name, data, time.time())
+            self._touch_dir(conn, log_file.parent, dir_key)
+        return True
+
+    @staticmethod
+    def _touch_dir(conn: sqlite3.Connection, log_dir: Path, dir_key: str) -> None:
+        """自己寫入造成的資料夾變動不需要觸發重新掃描"""
+        try:
+            conn.execute(
+                "UPDATE indexed_dirs SET dir_mtime = ? WHERE log_dir = ?",
+                (log_dir.stat().st_mtime, dir_key),
+            )
+        except OSError:
+            pass
+
+    @staticmethod
+    def _upsert(conn: sqlite3.Connection, dir_key: str, name: str, data: Dict[str, Any], mtime: float) -> None:
+        conn.execute(
+            "INSERT OR REPLACE INTO session_logs "
+            "(log_dir, name, session_id, step, is_step1, has_industry, timestamp, mtime, data) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                dir_key,
+                name,
+                str(data.get("session_id", "") or ""),
+                str(data.get("step", "") or ""),
+                int(_is_step1(data)),
+                int(_has_industry(data)),
+                str(data.get("timestamp", "") or ""),
+                mtime,
+                json.dumps(data, ensure_ascii=False),
+            ),
+        )
+
+    def ensure_indexed(self, log_dir: Path) -> None:
+        """
+        確保 log_dir 已匯入索引；只有資料夾在索引之外被改動時才解析新增/變更的檔案
+        """
+        log_dir = Path(log_dir)
+        dir_key = self._dir_key(log_dir)
+        try:
+            dir_mtime = log_dir.stat().st_mtime
+        except OSError:
+            return
+
+        # session_journal 也會寫入索引，延後匯入避免循環
+        from shared.session_journal import journal_path, read_session_log
+
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT dir_mtime FROM indexed_dirs WHERE log_dir = ?", (dir_key,)).fetchone()
+            if row is not None and row[0] == dir_mtime:
+                return
+
+            known = dict(conn.execute("SELECT name, mtime FROM session_logs WHERE log_dir = ?", (dir_key,)).fetchall())
+            present = set()
+            for log_file in log_dir.glob("*.json"):
+                present.add(log_file.name)
+                try:
+                    journal = journal_path(log_file)
+                    file_mtime = max(p.stat().st_mtime for p in (log_file, journal) if p.exists())
+                    if known.get(log_file.name, 0) >= file_mtime:
+                        continue
+                    # 快照 + 日誌尾端合併後的內容
+                    data, _ = read_session_log(log_file)
+                    if data:
+                        self._upsert(conn, dir_key, log_file.name, data, file_mtime)
+                except Exception:
+                    continue
+            for name in set(known) - present:
+                conn.execute("DELETE FROM session_logs WHERE log_dir = ? AND name = ?", (dir_key, name))
+            conn.execute("INSERT OR REPLACE INTO indexed_dirs (log_dir, dir_mtime) VALUES (?, ?)", (dir_key, dir_mtime))
+            print(f"[Session Store] 已更新索引: {log_dir}")
+
+    # ------------------------------------------------------------------
+    # 查詢
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _rows_to_records(rows) -> List[LogRecord]:
+        return [(name, json.loads(data)) for name, data in rows]
+
+    def latest(self, log_dir: Path, step1_with_industry: bool = False) -> Optional[LogRecord]:
+        """最新的一筆 log；step1_with_industry=True 時只找有產業別的 Step 1 log"""
+        sql = "SELECT name, data FROM session_logs WHERE log_dir = ?"
+        if step1_with_industry:
+            sql += " AND is_step1 = 1 AND has_industry = 1"
+        sql += " ORDER BY mtime DESC LIMIT 1"
+        with self._connect() as conn:
+            records = self._rows_to_records(conn.execute(sql, (self._dir_key(log_dir),)).fetchall())
+        return records[0] if records else None
+
+    def session_logs(self, log_dir: Path, session_id: str) -> List[LogRecord]:
+        """同一個 session_id 的所有 log（依時間由舊到新）"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, data FROM session_logs WHERE log_dir = ? AND session_id = ? ORDER BY mtime ASC",
+                (self._dir_key(log_dir), session_id),
+            ).fetchall()
+        return self._rows_to_records(rows)
+
+    def fallback_logs(self, log_dir: Path) -> List[LogRecord]:
+        """補齊缺漏資料用：Step 1 的 log 優先，其次依時間排序"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT name, data FROM session_logs WHERE log_dir = ? ORDER BY is_step1 DESC, mtime ASC",
+                (self._dir_key(log_dir),),
+            ).fetchall()
+        return self._rows_to_records(rows)
+
+
+_store_instance: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> Optional[SessionStore]:
+    """取得行程共用的 SessionStore；初始化失敗時返回 None（呼叫端改用掃描資料夾）"""
+    global _store_instance
+    if _store_instance is None:
+        with _store_lock:
+            if _store_instance is None:
+                try:
+                    _store_instance = SessionStore(Path(os.getenv("SESSION_STORE_PATH", str(SESSION_STORE_PATH))))
+                except Exception as e:
+                    print(f"[Session Store] ⚠️ 初始化失敗: {e}")
+                    return None
+    return _store_instance
+
+
+def record_session_log(log_file: Path, data: Dict[str, Any]) -> None:
+    """save_session_log 的寫入通道（失敗時只警告，不影響 JSON 檔案本身）"""
+    store = get_session_store()
+    if store is None:
+        return
+    try:
+        store.record(log_file, data)
+    except Exception as e:
+        print(f"[Session Store] ⚠️ 寫入索引失敗: {e}")
@@ -0,0 +1,147 @@
+"""
+預先生成（Step 1 輸入穩定後先在背景呼叫 LLM）
+
+產業與月電費輸入後，公司規模、碳排放估算與 TCFD / 產業別分析的 prompt 就已經確定，
+但以前要等使用者按下按鈕才開始呼叫 LLM。這裡在輸入停止變動一段時間後（debounce）
+先把工作送進背景執行緒池，按下按鈕時若輸入沒有改變就直接取用（已完成的立即返回，
+進行中的接著等待），輸入改變時取消尚未開始的工作、丟棄已開始的結果。
+
+- 每個 (owner, 名稱) 同時只保留一組預先生成的工作；owner 通常是 Streamlit session
+- key 為決定 prompt 的所有輸入（含 API Key 的雜湊），key 相同才會被取用
+- 這個模組不呼叫任何 st.* 函數，計時器與工作都在背景執行緒執行
+
+環境變數：
+- SPECULATIVE_PREGEN             -> Step 1 頁面「預先生成」選項的預設值（預設 0，會多花 API 用量）
+- SPECULATION_DEBOUNCE_SECONDS   -> 輸入停止變動多久後開始（預設 2）
+- SPECULATION_TTL_SECONDS        -> 沒有被取用的工作保留秒數（預設 900）
+- SPECULATION_WORKERS            -> 背景執行緒數（預設 8）
+"""
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+DEBOUNCE_SECONDS = float(os.getenv("SPECULATION_DEBOUNCE_SECONDS", "2"))
+TTL_SECONDS = float(os.getenv("SPECULATION_TTL_SECONDS", "900"))
+WORKERS = int(os.getenv("SPECULATION_WORKERS", "8"))
+
+Submitter = Callable[[ThreadPoolExecutor], List[Future]]
+
+
+def speculation_enabled_by_default() -> bool:
+    return os.getenv("SPECULATIVE_PREGEN", "0") == "1"
+
+
+def key_fingerprint(api_key: str) -> str:
+    """API Key 的雜湊（放進 key 比對用，不保留原文）"""
+    return hashlib.sha256((api_key or "").strip().encode("utf-8")).hexdigest()[:16]
+
+
+class _Speculation:
+    def __init__(self, key: Hashable, submit: Submitter):
+        self.key = key
+        self.submit = submit
+        self.timer: Optional[threading.Timer] = None
+        self.futures: Optional[List[Future]] = None   # None 表示還在 debounce
+        self.created_at = time.time()
+
+    def cancel(self) -> None:
+        if self.timer is not None:
+            self.timer.cancel()
+        for future in self.futures or ():
+            future.cancel()  # 已開始的 LLM 呼叫無法中斷，結果直接丟棄
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_speculations: Dict[Tuple[str, str], _Speculation] = {}
+_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="speculation")
+    return _executor
+
+
+def _start(slot: Tuple[str, str], speculation: _Speculation) -> None:
+    with _lock:
+        if _speculations.get(slot) is not speculation:
+            return  # debounce 期間輸入已改變
+        speculation.futures = speculation.submit(_get_executor())
+    print(f"[Speculation] 開始預先生成: {slot[1]}")
+
+
+def _purge_expired() -> None:
+    now = time.time()
+    for slot, speculation in list(_speculations.items()):
+        if now - speculation.created_at > TTL_SECONDS:
+            speculation.cancel()
+            del _speculations[slot]
+
+
+def speculate(owner: str, name: str, key: Hashable, submit: Submitter, debounce: float = DEBOUNCE_SECONDS) -> None:
+    """
+    登錄預先生成：key 與目前的相同時不做任何事，否則取消舊的並在 debounce 秒後送出
+
+    Args:
+        owner: 擁有者（例如 Streamlit session 的 id）
+        name: 工作名稱（例如 "tcfd_tables"）
+        key: 決定結果的所有輸入（可雜湊）
+        submit: submit(executor) -> [Future]，在背景執行緒中呼叫
+    """
+    slot = (owner, name)
+    with _lock:
+        _purge_expired()
+        current = _speculations.get(slot)
+        if current is not None and current.key == key:
+            return
+        if current is not None:
+            current.cancel()
+            print(f"[Speculation] 輸入已改變，捨棄: {name}")
+        speculation = _Speculation(key, submit)
+        speculation.timer = threading.Timer(debounce, _start, args=(slot, speculation))
+        speculation.timer.daemon = True
+        _speculations[slot] = speculation
+    speculation.timer.start()
+
+
+def claim(owner: str, name: str, key: Hashable) -> Optional[List[Future]]:
+    """
+    取用預先生成的結果（取用後即移除）
+
+    Returns:
+        key 相同且已送出時返回 [Future]；否則返回 None（key 不同時一併捨棄）
+    """
+    slot = (owner, name)
+    with _lock:
+        speculation = _speculations.pop(slot, None)
+    if speculation is None:
+        return None
+    if speculation.key != key or speculation.futures is None:
+        speculation.cancel()
+        return None
+    futures = speculation.futures
+    if any(future.cancelled() for future in futures):
+        return None
+    print(f"[Speculation] ⚡ 取用預先生成的結果: {name}")
+    return futures
+
+
+def discard(owner: str, name: Optional[str] = None) -> None:
+    """捨棄 owner 的預先生成（name 為 None 時全部捨棄）"""
+    with _lock:
+        for slot in [slot for slot in _speculations if slot[0] == owner and (name is None or slot[1] == name)]:
+            _speculations.pop(slot).cancel()
+
+
+def progress(owner: str, name: str, key: Hashable) -> Optional[Tuple[int, int]]:
+    """(已完成, 總數)；尚未開始（debounce 中）時為 (0, 0)，沒有對應的預先生成時返回 None"""
+    with _lock:
+        speculation = _speculations.get((owner, name))
+    if speculation is None or speculation.key != key:
+        return None
+    futures = speculation.futures or []
+    return sum(1 for future in futures if future.done()), len(futures)
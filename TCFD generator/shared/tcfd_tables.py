@@ -0,0 +1,221 @@
+"""
+TCFD 表格與公司規模（Step 1 頁面與批次 / 排程共用，不依賴 Streamlit）
+
+以前 5 個表格的 prompt、模型設定與 calculate_company_profile 都寫在 Step 1 頁面裡，
+只能在 Streamlit 中使用。移到這裡後，頁面、命令列批次生成都呼叫同一份邏輯，
+表格 PPTX 的輸出函數依 TABLES 的 "file" 從 TCFD_Table 以 component_registry 載入（不修改 sys.path）。
+"""
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from shared.component_registry import get_component_attr
+
+TCFD_TABLE_DIR = Path(__file__).parent.parent / "TCFD_Table"
+
+
+def calculate_company_profile(monthly_bill_ntd, industry_name):
+    """根據月電費估算公司規模和節能投資預算"""
+    annual_revenue_ntd = monthly_bill_ntd * 360
+    annual_revenue_wan = annual_revenue_ntd / 10000
+    
+    if annual_revenue_ntd > 100_000_000:
+        size = "中大型"
+    elif annual_revenue_ntd > 50_000_000:
+        size = "中型"
+    else:
+        size = "中小型"
+    
+    budget_ntd = annual_revenue_ntd * 0.02
+    budget_wan = budget_ntd / 10000
+    
+    revenue_display = f"{annual_revenue_wan:.0f}萬元 ({annual_revenue_ntd:,.0f})"
+    
+    return {
+        "monthly_bill_ntd": monthly_bill_ntd,
+        "annual_revenue_ntd": annual_revenue_ntd,
+        "annual_revenue_wan": annual_revenue_wan,
+        "revenue_display": revenue_display,
+        "revenue_for_prompt": f"{annual_revenue_wan:.0f}萬元",
+        "size": size,
+        "budget_ntd": budget_ntd,
+        "budget_wan": budget_wan,
+        "budget_display": f"{budget_wan:.1f}萬元",
+        "budget_for_prompt": f"{budget_wan:.1f}萬元"
+    }
+
+
+# TCFD 表格使用的模型與格式異常時的重試次數
+TCFD_MODEL = "claude-sonnet-4-20250514"
+TCFD_PARSE_RETRIES = 1
+
+
+def generate_tcfd_table(client, table, prompt_params, industry):
+    """
+    生成單一 TCFD 表格：LLM 生成 → 解析（格式異常時單獨重試）
+    會在背景執行緒中執行，因此不呼叫任何 st.* 函數，由主執行緒負責顯示
+    PPTX 檔案不在這裡輸出：環境篇直接使用 lines 繪製，下載檔案由 export_tcfd_files 按需產生
+    
+    Returns:
+        dict: llm_output, lines, failed_outputs（格式異常的原始回應）
+    """
+    prompt = table["prompt"].format(**prompt_params)
+    failed_outputs = []
+    for attempt in range(TCFD_PARSE_RETRIES + 1):
+        response = client.messages.create(
+            model=TCFD_MODEL,
+            max_tokens=1024,
+            messages=[{"role": "user", "content": prompt}]
+        )
+        llm_output = response.content[0].text.strip()
+        lines = [line.strip() for line in llm_output.split('\n') if line.strip() and '|||' in line]
+        if lines:
+            break
+        failed_outputs.append(llm_output)
+    
+    return {
+        "llm_output": llm_output,
+        "lines": lines,
+        "failed_outputs": failed_outputs
+    }
+
+
+# 專家角色
+EXPERT_ROLE = "你是 ESG 的 GRI 和 TCFD 專家。"
+
+# 5 個表格設定
+TABLES = [
+    {
+        "name": "01 轉型風險",
+        "file": "tcfd_01_transformation.py",
+        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 轉型風險分析，用繁體中文回答。
+本公司年營收約 {revenue}，請以此規模為基準。
+建議短期節能投資以營收的 2% 為基準（約 {budget}）。
+金額請以萬元為單位，避免使用億元或億美元。
+請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
+輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
+風險描述|||財務影響|||因應措施
+第1行：政策與法規風險
+第2行：綠色產品與科技風險
+只輸出 2 行，不要其他文字。"""
+    },
+    {
+        "name": "02 市場風險",
+        "file": "tcfd_02_market.py",
+        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 市場風險分析，聚焦 2026 年以後趨勢，用繁體中文回答。
+本公司年營收約 {revenue}，請以此規模為基準。
+建議短期節能投資以營收的 2% 為基準（約 {budget}）。
+金額請以萬元為單位，避免使用億元或億美元。
+請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
+輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
+風險描述|||財務影響|||因應措施
+第1行：消費者偏好變化風險
+第2行：市場需求變化風險
+只輸出 2 行，不要其他文字。"""
+    },
+    {
+        "name": "03 實體風險",
+        "file": "tcfd_03_physical.py",
+        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 實體風險分析，用繁體中文回答。
+本公司年營收約 {revenue}，請以此規模為基準。
+建議短期節能投資以營收的 2% 為基準（約 {budget}）。
+金額請以萬元為單位，避免使用億元或億美元。
+請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
+輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
+風險描述|||財務影響|||因應措施
+第1行：極端氣候事件風險
+第2行：長期氣候變遷風險
+只輸出 2 行，不要其他文字。"""
+    },
+    {
+        "name": "04 溫升風險",
+        "file": "tcfd_04_temperature.py",
+        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 溫升情境風險分析，用繁體中文回答。
+本公司年營收約 {revenue}，請以此規模為基準。
+建議短期節能投資以營收的 2% 為基準（約 {budget}）。
+金額請以萬元為單位，避免使用億元或億美元。
+請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
+輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
+風險描述|||財務影響|||因應措施
+第1行：升溫1.5°C情境風險
+第2行：升溫2°C以上情境風險
+只輸出 2 行，不要其他文字。"""
+    },
+    {
+        "name": "05 資源效率",
+        "file": "tcfd_05_resource.py",
+        "prompt": EXPERT_ROLE + """針對「{industry}」進行 TCFD 資源效率機會分析，用繁體中文回答。
+本公司年營收約 {revenue}，請以此規模為基準。
+建議短期節能投資以營收的 2% 為基準（約 {budget}）。
+金額請以萬元為單位，避免使用億元或億美元。
+請詳細分析，每個重點 80~120 字，包含具體數據、比例、時程。
+輸出 2 行，每行用 ||| 分隔三欄，每欄 3 點用分號(;)隔開：
+機會描述|||潛在效益|||行動方案
+第1行：能源效率提升機會
+第2行：資源循環利用機會
+只輸出 2 行，不要其他文字。"""
+    },
+]
+
+
+def build_prompt_params(industry: str, company_profile: Dict[str, Any]) -> Dict[str, str]:
+    """TABLES prompt 的格式化參數"""
+    return {
+        "industry": industry,
+        "revenue": company_profile["revenue_for_prompt"],
+        "budget": company_profile["budget_for_prompt"]
+    }
+
+
+def update_tcfd_summary(tcfd_summary: Dict[str, str], idx: int, table_result: Dict[str, Any]) -> None:
+    """擷取 TCFD 摘要（01 轉型風險 -> 法規政策、02 市場風險 -> 市場趨勢），供後續 LLM 使用"""
+    lines = table_result["lines"]
+    if not lines:
+        return
+    first_cell = lines[0].split("|||")[0].strip()[:200]
+    if idx == 0:  # 01 轉型風險
+        tcfd_summary["transformation_policy"] = first_cell
+        tcfd_summary["transformation_raw"] = table_result["llm_output"]
+    elif idx == 1:  # 02 市場風險
+        tcfd_summary["market_trend"] = first_cell
+        tcfd_summary["market_raw"] = table_result["llm_output"]
+
+
+def generate_tcfd_tables(client, industry: str, company_profile: Dict[str, Any], max_workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    同時生成 5 個 TCFD 表格（不含 UI 進度，供批次 / 背景工作使用）
+
+    Returns:
+        dict: results（依表格順序的 {name, idx, key, industry, lines}）、
+              tcfd_tables（{"01": lines, ...}）、tcfd_summary
+    """
+    prompt_params = build_prompt_params(industry, company_profile)
+    with ThreadPoolExecutor(max_workers=max_workers or len(TABLES), thread_name_prefix="tcfd-table") as executor:
+        futures = [executor.submit(generate_tcfd_table, client, table, prompt_params, industry) for table in TABLES]
+        table_results = [future.result() for future in futures]
+
+    results: List[Dict[str, Any]] = []
+    tcfd_summary: Dict[str, str] = {}
+    for idx, (table, table_result) in enumerate(zip(TABLES, table_results)):
+        if not table_result["lines"]:
+            raise ValueError(f"{table['name']} LLM 回傳格式異常（重試 {TCFD_PARSE_RETRIES} 次後仍無法解析）")
+        update_tcfd_summary(tcfd_summary, idx, table_result)
+        results.append({
+            "name": table["name"],
+            "idx": idx,
+            "key": f"{idx + 1:02d}",
+            "industry": industry,
+            "lines": table_result["lines"]
+        })
+
+    return {
+        "results": results,
+        "tcfd_tables": {r["key"]: r["lines"] for r in results},
+        "tcfd_summary": tcfd_summary,
+    }
+
+
+def create_tcfd_file(table: Dict[str, Any], lines: List[str], industry: str, output_dir: Path) -> Path:
+    """輸出單一 TCFD 表格 PPTX（TCFD_Table/<file> 的 create_table）"""
+    create_table = get_component_attr(TCFD_TABLE_DIR / table["file"], "create_table")
+    return Path(create_table(lines, industry, output_dir=output_dir))
@@ -0,0 +1,91 @@
+"""
+種子模板快取（所有 PPT 引擎共用）
+
+各引擎以前每次建構都 Presentation(SEED_TEMPLATE_PATH) 從磁碟載入模板，再新增 / 刪除投影片
+（公司段補足到 17 頁、治理段新增空白頁並清除 placeholder、環境篇以 drop_rel 刪除所有模板頁）。
+這裡改為每個程序、每個模板只做一次：
+- 載入模板並執行引擎提供的 prepare(prs)（產生正確頁數、清除 placeholder 的骨架）
+- 把骨架序列化成 bytes 保存在記憶體
+- 之後每次只需要從 BytesIO 重新開啟，得到互不影響的複本
+
+快取 key 為 (模板絕對路徑, mtime, variant)；模板檔案被修改後會自動重新建立骨架。
+
+環境變數：
+- TEMPLATE_CACHE=0 -> 停用（每次都從磁碟載入並執行 prepare）
+"""
+import copy
+import io
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pptx import Presentation
+
+# (絕對路徑, mtime, variant) -> (骨架 bytes, prepare 返回的 metadata)
+_skeletons: Dict[Tuple[str, float, str], Tuple[bytes, Dict[str, Any]]] = {}
+_locks: Dict[Tuple[str, float, str], threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def template_cache_enabled() -> bool:
+    return os.getenv("TEMPLATE_CACHE", "1") != "0"
+
+
+def layout_ref(prs, layout) -> Tuple[int, int]:
+    """版面配置在簡報中的位置 (母片索引, 版面索引)，用來在複本中找回同一個版面"""
+    for master_idx, master in enumerate(prs.slide_masters):
+        for layout_idx, candidate in enumerate(master.slide_layouts):
+            if candidate.part is layout.part:
+                return master_idx, layout_idx
+    raise ValueError("版面配置不屬於這份簡報")
+
+
+def resolve_layout(prs, ref: Tuple[int, int]):
+    master_idx, layout_idx = ref
+    return prs.slide_masters[master_idx].slide_layouts[layout_idx]
+
+
+def _key_lock(key) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def load_template(
+    template_path,
+    prepare: Optional[Callable[[Any], Optional[Dict[str, Any]]]] = None,
+    variant: str = "",
+):
+    """
+    取得模板骨架的獨立複本
+
+    Args:
+        template_path: 模板檔案路徑
+        prepare: 對剛載入的模板做一次性的正規化（新增 / 刪除投影片、清除 placeholder 等），
+                 可返回 metadata dict（例如版面位置），快取命中時原樣返回
+        variant: 區分同一模板的不同 prepare 結果（例如總頁數）
+
+    Returns:
+        (Presentation 複本, metadata dict)
+    """
+    path = Path(template_path).resolve()
+    if not template_cache_enabled():
+        prs = Presentation(str(path))
+        return prs, (prepare(prs) if prepare else None) or {}
+
+    key = (str(path), path.stat().st_mtime, variant)
+    cached = _skeletons.get(key)
+    if cached is None:
+        with _key_lock(key):
+            cached = _skeletons.get(key)
+            if cached is None:
+                prs = Presentation(str(path))
+                meta = (prepare(prs) if prepare else None) or {}
+                buffer = io.BytesIO()
+                prs.save(buffer)
+                cached = (buffer.getvalue(), meta)
+                _skeletons[key] = cached
+                print(f"[Template Cache] 已建立模板骨架: {path.name} ({len(prs.slides)} 頁, {len(cached[0]) // 1024} KB)")
+
+    skeleton, meta = cached
+    return Presentation(io.BytesIO(skeleton)), copy.deepcopy(meta)
@@ -3,6 +3,8 @@ import streamlit as st
 import anthropic
 from pathlib import Path
 from shared.config import ESG_OUTPUT_ROOT
+from shared.llm_cache import cached_completion
+from shared.anthropic_pool import get_anthropic_client
 
 def switch_page(page_path: str):
     """
@@ -30,6 +32,7 @@ def clear_all_data():
         # 輸出相關
         "step1_output_filename", "step2_output_filename", "step3_output_filename",
         "tcfd_output_folder", "emission_output_folder",
+        "full_report_output_path", "full_report_slides", "full_report_detail",
         # 其他可能的狀態變數
         "current_step", "report_generated", "output_path",
         "emission_calculated", "tcfd_generated", "company_report_generated",
@@ -79,6 +82,7 @@ def render_sidebar_navigation():
         ("📋 Step 2: 重大議題與公司段報告", "pages/4_📋_重大議題段報告.py"),
         ("🏛️ Step 3: 治理與社會段報告", "pages/5_🏛️_治理與社會報告.py"),
         ("📚 Step 4: 彙整總報告", "pages/6_📚_彙整總報告.py"),
+        ("🚀 一鍵生成完整報告", "pages/7_🚀_一鍵完整報告.py"),
     ]
     
     # 使用按鈕替代 page_link，避免依賴 pages 系統
@@ -236,7 +240,7 @@ def generate_report_summary(step: str, context_data: dict, api_key: str, test_mo
         return "❌ API Key 未設置，無法生成摘要"
     
     try:
-        client = anthropic.Anthropic(api_key=api_key.strip())
+        client = get_anthropic_client(api_key)
         
         # 根據步驟構建不同的prompt
         if step == "Step 1":
@@ -358,17 +362,8 @@ def generate_report_summary(step: str, context_data: dict, api_key: str, test_mo
         else:
             return "摘要生成中..."
         
-        # 調用Claude API
-        response = client.messages.create(
-            model="claude-sonnet-4-20250514",
-            max_tokens=300,
-            messages=[{
-                "role": "user",
-                "content": prompt
-            }]
-        )
-        
-        summary = response.content[0].text.strip()
+        # 調用Claude API（先查共用 LLM 快取）
+        summary = cached_completion(client, "claude-sonnet-4-20250514", prompt, max_tokens=300).strip()
         
         # 清理 Markdown 格式（移除標題符號，避免顯示為大標題）
         import re
@@ -1,232 +1,264 @@
 """
 訂閱管理器：管理用戶配額和使用統計
+
+以 SQLite（WAL）儲存，每個用戶一列（user_id 為主鍵）：
+- record_request 以單一 UPSERT 原子遞增，多個 Streamlit session 同時使用也不會遺失計數
+- 每日 / 每月配額重置在 SQL 中延遲處理（依 last_reset 判斷），不需要排程
+- 查詢只讀取單一用戶的索引列，與用戶總數無關
+
+舊版的 JSON 資料庫（db_path 為 .json）會在第一次啟動時自動匯入。
 """
 import json
+import sqlite3
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, Optional, Tuple
 
+DEFAULT_SETTINGS = {
+    "max_requests_per_day": 100,
+    "max_requests_per_month": 2000,
+    "free_plan_daily": 10,
+    "free_plan_monthly": 100
+}
+
+USER_COLUMNS = ("plan", "start_date", "requests_today", "requests_month", "last_reset", "last_request_date")
+
+
 class SubscriptionManager:
     """管理用戶訂閱配額和使用統計"""
-    
+
     def __init__(self, db_path: Path):
         """
         初始化訂閱管理器
-        
+
         Args:
-            db_path: 訂閱資料庫文件路徑
+            db_path: 訂閱資料庫文件路徑（.json 會改用同名的 .sqlite3，並匯入既有資料）
         """
-        self.db_path = db_path
+        db_path = Path(db_path)
+        self.legacy_json_path = db_path if db_path.suffix == ".json" else None
+        self.db_path = db_path.with_suffix(".sqlite3") if self.legacy_json_path else db_path
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._load_db()
-    
-    def _load_db(self):
-        """載入訂閱資料庫"""
-        if self.db_path.exists():
-            try:
-                with open(self.db_path, 'r', encoding='utf-8') as f:
-                    self.db = json.load(f)
-            except Exception as e:
-                print(f"[WARN] 無法載入訂閱資料庫: {e}，使用預設值")
-                self._init_db()
-        else:
-            self._init_db()
-    
+        self._local = threading.local()
+        self._init_db()
+
+    def _connect(self) -> sqlite3.Connection:
+        """每個執行緒一個長期連線（autocommit，交易以 BEGIN IMMEDIATE 明確控制）"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self.db_path), timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
     def _init_db(self):
         """初始化資料庫"""
-        self.db = {
-            "users": {},  # {user_id: {plan, start_date, requests_today, requests_month, last_reset, last_request_date}}
-            "settings": {
-                "max_requests_per_day": 100,
-                "max_requests_per_month": 2000,
-                "free_plan_daily": 10,
-                "free_plan_monthly": 100
-            }
-        }
-        self._save_db()
-    
-    def _save_db(self):
-        """保存訂閱資料庫"""
+        conn = self._connect()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                user_id TEXT PRIMARY KEY,
+                plan TEXT NOT NULL DEFAULT 'free',
+                start_date TEXT NOT NULL,
+                requests_today INTEGER NOT NULL DEFAULT 0,
+                requests_month INTEGER NOT NULL DEFAULT 0,
+                last_reset TEXT NOT NULL,
+                last_request_date TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        conn.executemany(
+            "INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)",
+            list(DEFAULT_SETTINGS.items())
+        )
+        self._migrate_legacy_json(conn)
+        self.settings = {row["key"]: row["value"] for row in conn.execute("SELECT key, value FROM settings")}
+
+    def _migrate_legacy_json(self, conn: sqlite3.Connection):
+        """匯入舊版 JSON 資料庫（只在 SQLite 尚無用戶時執行一次）"""
+        if not self.legacy_json_path or not self.legacy_json_path.exists():
+            return
+        if conn.execute("SELECT 1 FROM users LIMIT 1").fetchone():
+            return
         try:
-            with open(self.db_path, 'w', encoding='utf-8') as f:
-                json.dump(self.db, f, ensure_ascii=False, indent=2)
+            with open(self.legacy_json_path, 'r', encoding='utf-8') as f:
+                legacy = json.load(f)
         except Exception as e:
-            print(f"[ERROR] 無法保存訂閱資料庫: {e}")
-    
+            print(f"[WARN] 無法載入舊版訂閱資料庫: {e}")
+            return
+
+        today = datetime.now().date().isoformat()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, value in legacy.get("settings", {}).items():
+                conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", (key, int(value)))
+            for user_id, user in legacy.get("users", {}).items():
+                conn.execute(
+                    "INSERT OR IGNORE INTO users (user_id, plan, start_date, requests_today, requests_month, "
+                    "last_reset, last_request_date) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        user_id,
+                        user.get("plan", "free"),
+                        user.get("start_date", today),
+                        int(user.get("requests_today", 0)),
+                        int(user.get("requests_month", 0)),
+                        user.get("last_reset", today),
+                        user.get("last_request_date", today),
+                    )
+                )
+            conn.execute("COMMIT")
+            print(f"[INFO] 已匯入舊版訂閱資料庫: {len(legacy.get('users', {}))} 位用戶")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
     def get_user_id(self, session_id: str, subscription_code: Optional[str] = None) -> str:
         """
         獲取或創建用戶 ID
-        
+
         Args:
             session_id: Streamlit session ID
             subscription_code: 用戶輸入的訂閱碼（可選）
-        
+
         Returns:
             用戶 ID
         """
         # 優先使用訂閱碼
         if subscription_code and subscription_code.strip():
             return f"sub_{subscription_code.strip()}"
-        
+
         # 否則使用 session ID
         return f"session_{session_id}"
-    
+
+    def _get_limits(self, plan: str) -> Tuple[int, int]:
+        """根據方案獲取配額限制 (每日, 每月)"""
+        if plan == "free":
+            return self.settings["free_plan_daily"], self.settings["free_plan_monthly"]
+        return self.settings["max_requests_per_day"], self.settings["max_requests_per_month"]
+
+    def _get_usage(self, user_id: str) -> Optional[sqlite3.Row]:
+        """
+        讀取用戶目前的用量（延遲重置：last_reset 不是今天 / 本月時視為 0，不需要寫入）
+        """
+        today = datetime.now().date().isoformat()
+        return self._connect().execute(
+            """
+            SELECT plan,
+                   CASE WHEN last_reset = :today THEN requests_today ELSE 0 END AS requests_today,
+                   CASE WHEN substr(last_reset, 1, 7) = substr(:today, 1, 7) THEN requests_month ELSE 0 END AS requests_month
+            FROM users WHERE user_id = :user_id
+            """,
+            {"today": today, "user_id": user_id}
+        ).fetchone()
+
     def check_quota(self, user_id: str) -> Tuple[bool, str]:
         """
         檢查用戶配額
-        
+
         Args:
             user_id: 用戶 ID
-        
+
         Returns:
             (是否可以繼續, 訊息)
         """
-        today = datetime.now().date().isoformat()
-        
+        usage = self._get_usage(user_id)
+
         # 新用戶，創建記錄
-        if user_id not in self.db["users"]:
-            self.db["users"][user_id] = {
-                "plan": "free",
-                "start_date": today,
-                "requests_today": 0,
-                "requests_month": 0,
-                "last_reset": today,
-                "last_request_date": today
-            }
-            self._save_db()
-        
-        user = self.db["users"][user_id]
-        
-        # 檢查是否需要重置每日配額
-        if user["last_reset"] != today:
-            user["requests_today"] = 0
-            user["last_reset"] = today
-            self._save_db()
-        
-        # 檢查是否需要重置每月配額（每月 1 號重置）
-        current_date = datetime.now().date()
-        last_reset_date = datetime.fromisoformat(user["last_reset"]).date()
-        if current_date.month != last_reset_date.month or current_date.year != last_reset_date.year:
-            user["requests_month"] = 0
-            user["last_reset"] = today
-            self._save_db()
-        
-        # 根據方案獲取配額限制
-        if user["plan"] == "free":
-            max_daily = self.db["settings"]["free_plan_daily"]
-            max_monthly = self.db["settings"]["free_plan_monthly"]
-        else:
-            max_daily = self.db["settings"]["max_requests_per_day"]
-            max_monthly = self.db["settings"]["max_requests_per_month"]
-        
+        if usage is None:
+            today = datetime.now().date().isoformat()
+            self._connect().execute(
+                "INSERT OR IGNORE INTO users (user_id, plan, start_date, requests_today, requests_month, "
+                "last_reset, last_request_date) VALUES (?, 'free', ?, 0, 0, ?, ?)",
+                (user_id, today, today, today)
+            )
+            usage = self._get_usage(user_id)
+
+        max_daily, max_monthly = self._get_limits(usage["plan"])
+
         # 檢查每日配額
-        if user["requests_today"] >= max_daily:
+        if usage["requests_today"] >= max_daily:
             return False, f"今日配額已用完（{max_daily} 次）。如需增加配額，請聯繫管理員升級訂閱。"
-        
+
         # 檢查每月配額
-        if user["requests_month"] >= max_monthly:
+        if usage["requests_month"] >= max_monthly:
             return False, f"本月配額已用完（{max_monthly} 次）。如需增加配額，請聯繫管理員升級訂閱。"
-        
+
         return True, "OK"
-    
+
     def record_request(self, user_id: str):
         """
-        記錄一次請求
-        
+        記錄一次請求（單一 UPSERT，原子遞增並在需要時重置每日 / 每月計數）
+
         Args:
             user_id: 用戶 ID
         """
         today = datetime.now().date().isoformat()
-        
-        if user_id not in self.db["users"]:
-            self.db["users"][user_id] = {
-                "plan": "free",
-                "start_date": today,
-                "requests_today": 0,
-                "requests_month": 0,
-                "last_reset": today,
-                "last_request_date": today
-            }
-        
-        user = self.db["users"][user_id]
-        
-        # 重置每日配額（如果需要）
-        if user["last_reset"] != today:
-            user["requests_today"] = 0
-            user["last_reset"] = today
-        
-        # 重置每月配額（如果需要）
-        current_date = datetime.now().date()
-        last_reset_date = datetime.fromisoformat(user["last_reset"]).date()
-        if current_date.month != last_reset_date.month or current_date.year != last_reset_date.year:
-            user["requests_month"] = 0
-            user["last_reset"] = today
-        
-        user["requests_today"] += 1
-        user["requests_month"] += 1
-        user["last_request_date"] = today
-        self._save_db()
-    
+        self._connect().execute(
+            """
+            INSERT INTO users (user_id, plan, start_date, requests_today, requests_month, last_reset, last_request_date)
+            VALUES (:user_id, 'free', :today, 1, 1, :today, :today)
+            ON CONFLICT(user_id) DO UPDATE SET
+                requests_today = CASE WHEN last_reset = :today THEN requests_today + 1 ELSE 1 END,
+                requests_month = CASE WHEN substr(last_reset, 1, 7) = substr(:today, 1, 7)
+                                      THEN requests_month + 1 ELSE 1 END,
+                last_reset = :today,
+                last_request_date = :today
+            """,
+            {"user_id": user_id, "today": today}
+        )
+
     def get_usage_stats(self, user_id: str) -> Dict:
         """
         獲取用戶使用統計
-        
+
         Args:
             user_id: 用戶 ID
-        
+
         Returns:
             使用統計字典
         """
-        if user_id not in self.db["users"]:
+        usage = self._get_usage(user_id)
+        if usage is None:
+            max_daily, max_monthly = self._get_limits("free")
             return {
                 "plan": "free",
                 "requests_today": 0,
                 "requests_month": 0,
-                "max_daily": self.db["settings"]["free_plan_daily"],
-                "max_monthly": self.db["settings"]["free_plan_monthly"]
+                "max_daily": max_daily,
+                "max_monthly": max_monthly
             }
-        
-        user = self.db["users"][user_id]
-        
-        # 根據方案獲取配額限制
-        if user["plan"] == "free":
-            max_daily = self.db["settings"]["free_plan_daily"]
-            max_monthly = self.db["settings"]["free_plan_monthly"]
-        else:
-            max_daily = self.db["settings"]["max_requests_per_day"]
-            max_monthly = self.db["settings"]["max_requests_per_month"]
-        
+
+        max_daily, max_monthly = self._get_limits(usage["plan"])
         return {
-            "plan": user["plan"],
-            "requests_today": user["requests_today"],
-            "requests_month": user["requests_month"],
+            "plan": usage["plan"],
+            "requests_today": usage["requests_today"],
+            "requests_month": usage["requests_month"],
             "max_daily": max_daily,
             "max_monthly": max_monthly
         }
-    
+
     def upgrade_plan(self, user_id: str, plan: str = "premium"):
         """
         升級用戶方案（管理員功能）
-        
+
         Args:
             user_id: 用戶 ID
             plan: 方案名稱
         """
-        if user_id not in self.db["users"]:
-            self.db["users"][user_id] = {
-                "plan": plan,
-                "start_date": datetime.now().date().isoformat(),
-                "requests_today": 0,
-                "requests_month": 0,
-                "last_reset": datetime.now().date().isoformat(),
-                "last_request_date": datetime.now().date().isoformat()
-            }
-        else:
-            self.db["users"][user_id]["plan"] = plan
-        
-        self._save_db()
-    
+        today = datetime.now().date().isoformat()
+        self._connect().execute(
+            """
+            INSERT INTO users (user_id, plan, start_date, requests_today, requests_month, last_reset, last_request_date)
+            VALUES (:user_id, :plan, :today, 0, 0, :today, :today)
+            ON CONFLICT(user_id) DO UPDATE SET plan = :plan
+            """,
+            {"user_id": user_id, "plan": plan, "today": today}
+        )
+
     def get_all_users(self) -> Dict:
         """獲取所有用戶統計（管理員功能）"""
-        return self.db["users"]
-
+        rows = self._connect().execute(f"SELECT user_id, {', '.join(USER_COLUMNS)} FROM users ORDER BY user_id")
+        return {row["user_id"]: {col: row[col] for col in USER_COLUMNS} for row in rows}
@@ -4,12 +4,16 @@ Creates a radar chart image using matplotlib and inserts it into Word."""
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
 import numpy as np
 from io import BytesIO
 import os
 
+try:
+    from shared.chart_cache import cached_chart
+except ImportError:  # component run standalone (outside the engines): render without caching
+    def cached_chart(data, figsize=None, dpi=None):
+        return lambda render: render
+
 # Data from the HTML Chart.js configuration
 RADAR_DATA = {
     "labels": ['Climate Action', 'Ethics & Compliance', 'Human Capital', 'Data Security', 'Product Safety'],
@@ -30,8 +34,10 @@ RADAR_DATA = {
 }
 
 
+@cached_chart(lambda: RADAR_DATA, figsize=(8, 8), dpi=150)
 def create_radar_chart_image():
     """Create radar chart using matplotlib and return as image bytes"""
+    import matplotlib.pyplot as plt
     # Number of variables
     categories = RADAR_DATA["labels"]
     N = len(categories)
@@ -113,8 +119,10 @@ def create_table():
     return doc
 
 
+@cached_chart(lambda: RADAR_DATA, figsize=(5, 5), dpi=120)
 def create_radar_chart_for_cell():
     """Create radar chart image for insertion into a cell (smaller size)"""
+    import matplotlib.pyplot as plt
     # Number of variables
     categories = RADAR_DATA["labels"]
     N = len(categories)
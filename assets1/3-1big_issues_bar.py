@@ -1,12 +1,27 @@
-"""Strategic material issues bar chart for Word reports.
-Creates a horizontal bar chart using matplotlib and inserts it into Word."""
+"""Strategic material issues bar chart for Word reports and PPT slides.
+Creates a horizontal bar chart using matplotlib and inserts it into Word;
+BigIssuesBarChartComponent adds the same data to a slide as a native PPTX chart."""
 
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import matplotlib.pyplot as plt
 import numpy as np
 from io import BytesIO
+from pptx.util import Cm
+
+try:
+    from shared.chart_cache import cached_chart
+except ImportError:  # component run standalone (outside the engines): render without caching
+    def cached_chart(data, figsize=None, dpi=None):
+        return lambda render: render
+
+try:
+    from shared.native_charts import add_bar_chart, native_charts_enabled
+except ImportError:  # component run standalone: only the matplotlib backend is available
+    add_bar_chart = None
+
+    def native_charts_enabled():
+        return False
 
 # Data from the HTML Chart.js configuration
 BAR_DATA = {
@@ -21,8 +36,10 @@ BAR_DATA = {
 }
 
 
+@cached_chart(lambda: BAR_DATA, figsize=(10, 6), dpi=150)
 def create_bar_chart_image():
     """Create horizontal bar chart using matplotlib and return as image bytes"""
+    import matplotlib.pyplot as plt
     # Initialize the figure
     fig, ax = plt.subplots(figsize=(10, 6))
     
@@ -111,8 +128,10 @@ def create_table():
     return doc
 
 
+@cached_chart(lambda: BAR_DATA, figsize=(6, 4.5), dpi=120)
 def create_bar_chart_for_cell():
     """Create bar chart image for insertion into a cell (smaller size)"""
+    import matplotlib.pyplot as plt
     # Initialize the figure (smaller for cell)
     fig, ax = plt.subplots(figsize=(6, 4.5))
     
@@ -168,6 +187,42 @@ def create_bar_chart_for_cell():
     return img_buffer
 
 
+class BigIssuesBarChartComponent:
+    """PPT component (company page 3.1): native bar chart from BAR_DATA, matplotlib PNG as fallback."""
+
+    def __init__(self, prs, font_name: str = "Calibri"):
+        self.prs = prs
+        self.font_name = font_name
+
+    def add_to_slide(
+        self,
+        slide,
+        left_cm: float = 18.0,
+        top_cm: float = 3.0,
+        width_cm: float = 13.5,
+        height_cm: float = 10.0,
+    ):
+        left, top, width, height = Cm(left_cm), Cm(top_cm), Cm(width_cm), Cm(height_cm)
+        if native_charts_enabled():
+            try:
+                return add_bar_chart(
+                    slide.shapes, left, top, width, height,
+                    categories=BAR_DATA["issues"],
+                    values=BAR_DATA["scores"],
+                    colors=BAR_DATA["colors"],
+                    title="Strategic Material Issues Ranking",
+                    title_color="#48CAE4",
+                    axis_title="Score",
+                    value_range=(0, 100),
+                    major_unit=50,
+                    font_name=self.font_name,
+                    font_size=8,
+                )
+            except Exception as e:
+                print(f"  [WARN] Native bar chart failed, falling back to matplotlib: {e}")
+        return slide.shapes.add_picture(create_bar_chart_for_cell(), left, top, width=width)
+
+
 if __name__ == "__main__":
     try:
         # Test: save as standalone document
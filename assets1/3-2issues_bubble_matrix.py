@@ -1,12 +1,27 @@
-"""ESG Materiality Assessment Matrix (Bubble Plot) for Word reports.
-Creates a bubble matrix chart using matplotlib and inserts it into Word."""
+"""ESG Materiality Assessment Matrix (Bubble Plot) for Word reports and PPT slides.
+Creates a bubble matrix chart using matplotlib and inserts it into Word;
+MaterialityBubbleChartComponent adds the same data to a slide as a native PPTX chart."""
 
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import matplotlib.pyplot as plt
 import numpy as np
 from io import BytesIO
+from pptx.util import Cm
+
+try:
+    from shared.chart_cache import cached_chart
+except ImportError:  # component run standalone (outside the engines): render without caching
+    def cached_chart(data, figsize=None, dpi=None):
+        return lambda render: render
+
+try:
+    from shared.native_charts import add_bubble_chart, native_charts_enabled
+except ImportError:  # component run standalone: only the matplotlib backend is available
+    add_bubble_chart = None
+
+    def native_charts_enabled():
+        return False
 
 # Data from the HTML Chart.js configuration
 # Format: {label, x: Financial Impact (0-100), y: Stakeholder Importance (0-100), r: Bubble Size (Issue Urgency), color}
@@ -38,8 +53,10 @@ def hex_to_rgb(hex_color):
     return rgb
 
 
+@cached_chart(lambda: BUBBLE_DATA, figsize=(6, 4.8), dpi=150)
 def create_bubble_matrix_image():
     """Create bubble matrix chart using matplotlib and return as image bytes"""
+    import matplotlib.pyplot as plt
     # Initialize the figure (reduced by 40%: 10*0.6=6, 8*0.6=4.8)
     fig, ax = plt.subplots(figsize=(6, 4.8))
     
@@ -153,8 +170,10 @@ def create_table():
     return doc
 
 
+@cached_chart(lambda: BUBBLE_DATA, figsize=(6, 6), dpi=120)
 def create_bubble_matrix_for_cell():
     """Create bubble matrix image for insertion into a cell (smaller size)"""
+    import matplotlib.pyplot as plt
     # Initialize the figure (smaller for cell)
     fig, ax = plt.subplots(figsize=(6, 6))
     
@@ -234,6 +253,48 @@ def create_bubble_matrix_for_cell():
     return img_buffer
 
 
+def short_label(label):
+    """First two words of an issue label (bubble labels stay readable at small sizes)"""
+    words = label.split()
+    return ' '.join(words[:2]) if len(words) > 2 else label
+
+
+class MaterialityBubbleChartComponent:
+    """PPT component (company page 3.2): native bubble chart from BUBBLE_DATA, matplotlib PNG as fallback."""
+
+    def __init__(self, prs, font_name: str = "Calibri"):
+        self.prs = prs
+        self.font_name = font_name
+
+    def add_to_slide(
+        self,
+        slide,
+        left_cm: float = 18.0,
+        top_cm: float = 3.0,
+        width_cm: float = 13.5,
+        height_cm: float = 10.8,
+    ):
+        left, top, width, height = Cm(left_cm), Cm(top_cm), Cm(width_cm), Cm(height_cm)
+        if native_charts_enabled():
+            try:
+                return add_bubble_chart(
+                    slide.shapes, left, top, width, height,
+                    points=[dict(item, label=short_label(item['label'])) for item in BUBBLE_DATA],
+                    title="ESG Materiality Assessment Matrix",
+                    title_color="#0077B6",
+                    x_title="Financial Impact (Low → High)",
+                    y_title="Stakeholder Importance (Low → High)",
+                    major_unit=50,
+                    cross_at=50,  # axes at 50/50 act as the quadrant dividers
+                    bubble_scale=60,
+                    font_name=self.font_name,
+                    font_size=8,
+                )
+            except Exception as e:
+                print(f"  [WARN] Native bubble chart failed, falling back to matplotlib: {e}")
+        return slide.shapes.add_picture(create_bubble_matrix_image(), left, top, width=width)
+
+
 if __name__ == "__main__":
     import time
     try:
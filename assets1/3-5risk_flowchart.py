@@ -4,10 +4,14 @@ Creates a flowchart using matplotlib and inserts it into Word."""
 from docx import Document
 from docx.shared import Pt, RGBColor, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
-import matplotlib.pyplot as plt
-from matplotlib.patches import FancyArrowPatch, Rectangle
 from io import BytesIO
 
+try:
+    from shared.chart_cache import cached_chart
+except ImportError:  # component run standalone (outside the engines): render without caching
+    def cached_chart(data, figsize=None, dpi=None):
+        return lambda render: render
+
 # Flowchart data
 BOXES = [
     (-0.35, 0.78, 0.4, 0.12, '#009999', "Supervisory Board\n• Request to investigate risk topics\n• Bi-annual risk review"),
@@ -34,11 +38,15 @@ def hex_to_rgb(hex_color):
 
 
 def add_arrow(ax, start, end, color="#1f4e79", lw=4):
+    from matplotlib.patches import FancyArrowPatch
     arrow = FancyArrowPatch(posA=start, posB=end, arrowstyle="-|>", color=color, linewidth=lw, mutation_scale=24, connectionstyle="arc3,rad=0.08")
     ax.add_patch(arrow)
 
 
+@cached_chart(lambda: (BOXES, ARROWS), figsize=(11.0, 6.8), dpi=300)
 def create_flowchart_image():
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Rectangle
     # Use a generous canvas, but we'll trim all margins strictly when saving
     fig, ax = plt.subplots(figsize=(11.0, 6.8))
     # Title inside plot area to avoid top white margin
@@ -54,6 +54,8 @@ PPT_CONFIG = {
     "font_family": "Microsoft JhengHei",
     "font_size": 12,
     "watermark_text": "Sustainability Report",
+    # 預取 LLM 文字時同時進行的呼叫上限（避免觸發 API rate limit）
+    "prefetch_concurrency": 6,
 }
 
 # Common text snippets
@@ -317,11 +319,21 @@ SLIDE_CONFIGS = {
         "paragraphs": 2,
         "text_font_size": 12,
         "paragraph_spacing_pt": 0,
-        "image_path": os.path.join(ASSETS3_COMPANY_PATH, "preview_big_issues_bar_chart.png"),
-        "image_width_cm": 13.5,
-        "image_align": "right",
-        "image_top_cm": 3.0,
-        "image_left_cm": 18.0,
+        # 原生 PPTX 圖表（CHART_BACKEND=matplotlib 時改插入 matplotlib 圖片）
+        "right_component": {
+            "file": os.path.join(ASSETS3_COMPANY_PATH, "3-1big_issues_bar.py"),
+            "class": "BigIssuesBarChartComponent",
+            "method": "add_to_slide",
+            "init_kwargs": {
+                "font_name": "Calibri",
+            },
+            "method_kwargs": {
+                "left_cm": 18.0,
+                "top_cm": 3.0,
+                "width_cm": 13.5,
+                "height_cm": 10.0,
+            },
+        },
     },
     13: {
         "title": "3.2 重大性摘要",
@@ -331,11 +343,21 @@ SLIDE_CONFIGS = {
         "paragraphs": 2,
         "text_font_size": 12,
         "paragraph_spacing_pt": 0,
-        "image_path": os.path.join(ASSETS3_COMPANY_PATH, "preview_bubble_matrix.png"),
-        "image_width_cm": 13.5,
-        "image_align": "right",
-        "image_top_cm": 3.0,
-        "image_left_cm": 18.0,
+        # 原生 PPTX 圖表（CHART_BACKEND=matplotlib 時改插入 matplotlib 圖片）
+        "right_component": {
+            "file": os.path.join(ASSETS3_COMPANY_PATH, "3-2issues_bubble_matrix.py"),
+            "class": "MaterialityBubbleChartComponent",
+            "method": "add_to_slide",
+            "init_kwargs": {
+                "font_name": "Calibri",
+            },
+            "method_kwargs": {
+                "left_cm": 18.0,
+                "top_cm": 3.0,
+                "width_cm": 13.5,
+                "height_cm": 10.8,
+            },
+        },
     },
     14: {
         "title": "3.3 回應永續目標的產品與服務",
@@ -1,19 +1,40 @@
 """Extended content engine for PPT generation (includes company intro pages)."""
-import anthropic
 import re
 import json
 import os
+import sys
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from datetime import datetime
 
-from config_pptx_company import (
-    ANTHROPIC_API_KEY,
-    CLAUDE_MODEL,
-    CLAUDE_MODEL_FALLBACKS,
-    LLM_WORD_COUNT,
-)
-from env_log_reader import load_latest_environment_log, get_prompt_context
+if __package__:
+    # 由 shared.engine_loader 以套件載入（wrapper）
+    from .config_pptx_company import (
+        ANTHROPIC_API_KEY,
+        CLAUDE_MODEL,
+        CLAUDE_MODEL_FALLBACKS,
+        LLM_WORD_COUNT,
+    )
+    from .env_log_reader import load_latest_environment_log, get_prompt_context
+else:
+    # 直接執行（main_pptx_company.py）
+    from config_pptx_company import (
+        ANTHROPIC_API_KEY,
+        CLAUDE_MODEL,
+        CLAUDE_MODEL_FALLBACKS,
+        LLM_WORD_COUNT,
+    )
+    from env_log_reader import load_latest_environment_log, get_prompt_context
+
+# 共享模組（LLM 快取等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+from shared.llm_cache import cached_completion
+from shared.anthropic_pool import get_anthropic_client
+from shared.model_resolver import resolve_model
+from shared.industry_analysis_cache import get_industry_analysis, set_industry_analysis
+from shared.report_context import ReportContext
 
 LLM_WORD_COUNT = 280
 # 中文約 1.5 字 = 1 英文單字，所以 280 英文單字約等於 420 中文字
@@ -28,10 +49,13 @@ META_PREFIXES = (
 
 
 class PPTContentEngine:
-    def __init__(self):
-        if not ANTHROPIC_API_KEY:
+    def __init__(self, context: Optional[ReportContext] = None):
+        # API Key / session_id 由呼叫端的 context 傳入；未指定時使用 config 的預設值
+        self.context = context or ReportContext()
+        self.api_key = self.context.api_key or ANTHROPIC_API_KEY
+        if not self.api_key:
             raise RuntimeError("ANTHROPIC_API_KEY is not configured.")
-        self.client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY)
+        self.client = get_anthropic_client(self.api_key)
         self.model = self._resolve_model()
         
         # 產業別：優先讀取，獨立管線，確保不被覆蓋
@@ -40,7 +64,9 @@ class PPTContentEngine:
         
         # 載入環境段 log 資料（其他資料）
         self.env_log_data = self._load_environment_log()
-        self.env_context = get_prompt_context(self.env_log_data)
+        self.env_context = get_prompt_context(
+            self.env_log_data, log_dir=self.context.log_dir, session_id=self.context.session_id
+        )
         
         # 確保產業別不被覆蓋：如果 env_context 沒有，就用我們讀取的
         if not self.env_context.get("industry", "") and self.industry:
@@ -58,7 +84,20 @@ class PPTContentEngine:
         """
         產業 Express 通道：直接讀取最新的 Step 1 文件中的產業別
         不經過任何複雜流程，就這一個目的
+
+        context 指定 session_id 時只讀取該 session 的 log，避免同時生成多份報告時
+        讀到別的 session 最新寫入的產業別；沒有 session 時才掃描最新的檔案
         """
+        session_id = self.context.session_id
+        if session_id:
+            data = load_latest_environment_log(log_dir=self.context.log_dir, session_id=session_id) or {}
+            ind = data.get("industry", "") if data.get("session_id") == session_id else ""
+            if ind and str(ind).strip():
+                print(f"[產業 Express] 從 session {session_id} 讀取: {ind}")
+                return str(ind).strip()
+            print(f"[產業 Express] 找不到 session {session_id} 的產業別")
+            return ""
+
         log_dir = Path(r"C:\Users\User\Desktop\ESG_Output\_Backend\user_logs")
         if not log_dir.exists():
             return ""
@@ -83,18 +122,32 @@ class PPTContentEngine:
         Express 通道：直接從 +1 步驟生成的 150 字分析文件讀取
         使用與 generate_report_summary() 相同的路徑，確保一致性
         只讀取 150 字分析，不抽取產業別
+        
+        結果依 session 快取，只有 save_industry_analysis_to_log 寫入新檔案時才重新讀取
         """
-        import json
-        from pathlib import Path
+        session_id = self.env_context.get("session_id", "") if self.env_context else ""
+        cached = get_industry_analysis(session_id)
+        if cached is not None:
+            return cached
+        
+        industry_analysis, from_latest = self._scan_industry_analysis_logs(session_id)
+        set_industry_analysis(session_id, industry_analysis, from_latest=from_latest)
+        return industry_analysis
+    
+    def _scan_industry_analysis_logs(self, session_id: str) -> Tuple[str, bool]:
+        """
+        掃描 log 資料夾讀取 150 字分析
         
-        # 方法1：使用與 generate_report_summary() 相同的路徑（UI 摘要成功使用的路徑）
-        log_dir = Path(r"C:\Users\User\Desktop\ESG_Output\_Backend\user_logs")
+        Returns:
+            (分析文字, 是否來自「最新的分析檔」而非該 session 專屬的檔案)
+        """
+        # 方法1：context 指定的 log 資料夾，否則使用與 generate_report_summary() 相同的路徑（UI 摘要成功使用的路徑）
+        log_dir = Path(self.context.log_dir or r"C:\Users\User\Desktop\ESG_Output\_Backend\user_logs")
         print(f"[Express _read_industry_analysis_express] 方法1: 使用 UI 摘要路徑: {log_dir}")
         print(f"[Express] log_dir.exists(): {log_dir.exists()}")
         
         if log_dir.exists():
             # 嘗試從 session_id 讀取
-            session_id = self.env_context.get("session_id", "") if self.env_context else ""
             if session_id:
                 log_file = log_dir / f"session_{session_id}_industry_analysis.json"
                 print(f"[Express] 嘗試讀取 session_id 文件: {log_file}")
@@ -105,7 +158,7 @@ class PPTContentEngine:
                         industry_analysis = data.get("industry_analysis", "").strip()
                         if industry_analysis and len(industry_analysis) > 50:
                             print(f"[Express] ✅ 方法1成功: 從 {log_file.name} 讀取 {len(industry_analysis)}字")
-                            return industry_analysis
+                            return industry_analysis, False
                     except Exception as e:
                         print(f"[Express] 方法1讀取 session_id 文件失敗: {e}")
             
@@ -123,7 +176,7 @@ class PPTContentEngine:
                     industry_analysis = data.get("industry_analysis", "").strip()
                     if industry_analysis and len(industry_analysis) > 50:
                         print(f"[Express] ✅ 方法1成功: 從最新文件 {log_file.name} 讀取 {len(industry_analysis)}字")
-                        return industry_analysis
+                        return industry_analysis, True
                 except Exception as e:
                     print(f"[Express] 方法1讀取最新文件失敗: {e}")
         
@@ -135,6 +188,19 @@ class PPTContentEngine:
         print(f"[Express] log_dir2.exists(): {log_dir2.exists()}")
         
         if log_dir2.exists():
+            # 先讀取該 session 的分析檔（industry_analysis.save_industry_analysis_to_log 寫入這裡）
+            log_file = log_dir2 / f"session_{session_id}_industry_analysis.json"
+            if session_id and log_file.exists():
+                try:
+                    with open(log_file, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                    industry_analysis = data.get("industry_analysis", "").strip()
+                    if industry_analysis and len(industry_analysis) > 50:
+                        print(f"[Express] ✅ 方法2成功: 從 {log_file.name} 讀取 {len(industry_analysis)}字")
+                        return industry_analysis, False
+                except Exception as e:
+                    print(f"[Express] 方法2讀取 session_id 文件失敗: {e}")
+            
             industry_analysis_files = sorted(
                 log_dir2.glob("session_*_industry_analysis.json"),
                 key=lambda f: f.stat().st_mtime,
@@ -148,12 +214,12 @@ class PPTContentEngine:
                     industry_analysis = data.get("industry_analysis", "").strip()
                     if industry_analysis and len(industry_analysis) > 50:
                         print(f"[Express] ✅ 方法2成功: 從 {log_file.name} 讀取 {len(industry_analysis)}字")
-                        return industry_analysis
+                        return industry_analysis, True
                 except Exception as e:
                     print(f"[Express] 方法2讀取失敗: {e}")
         
         print(f"[Express] ❌ 所有方法都失敗，無法讀取 150 字分析")
-        return ""
+        return "", True
     
     def _build_industry_first_prompt(self, base_prompt: str, industry: str) -> str:
         """
@@ -177,15 +243,8 @@ class PPTContentEngine:
             if fallback not in candidates:
                 candidates.append(fallback)
 
-        try:
-            available = [m.id for m in self.client.models.list().data]
-        except Exception:
-            available = []
-
-        for candidate in candidates:
-            if candidate in available:
-                return candidate
-        return candidates[0] if candidates else "claude-3-haiku-20240307"
+        # 可用模型清單依 API key 快取（記憶體 + 磁碟），過期時背景刷新，不阻塞引擎建構
+        return resolve_model(self.client, self.api_key, candidates, default="claude-3-haiku-20240307")
 
     def _format_expert_intro(self, company_name: str, industry: str) -> str:
         """
@@ -259,17 +318,7 @@ class PPTContentEngine:
         if "產業" in prompt or industry_analysis:
             print(f"[OK] _call: prompt 包含產業別或已硬插入 150 字摘要")
         
-        response = self.client.messages.create(
-            model=self.model,
-            max_tokens=word_count * 5,
-            messages=[
-                {
-                    "role": "user",
-                    "content": content,
-                }
-            ],
-        )
-        text = response.content[0].text if response.content else ""
+        text = cached_completion(self.client, self.model, content, max_tokens=word_count * 5)
         return self._clean(text, is_chinese=is_chinese)
 
     @staticmethod
@@ -314,12 +363,13 @@ class PPTContentEngine:
 
     def _load_environment_log(self) -> Optional[Dict[str, Any]]:
         """
-        載入最新的環境段 log 資料
+        載入環境段 log 資料（context 指定 session_id 時讀取該 session，否則讀取最新的；
+        context 指定 log_dir 時讀取該資料夾）
         
         Returns:
             Log 資料 dict，如果找不到則返回 None
         """
-        return load_latest_environment_log()
+        return load_latest_environment_log(log_dir=self.context.log_dir, session_id=self.context.session_id)
 
     # --- Governance section generators (unchanged) ---
     def generate_governance_overview(self) -> str:
@@ -5,10 +5,22 @@ Reads standardized environment log files and provides data for LLM prompts.
 import json
 import os
 import re
+import sys
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple
 from datetime import datetime
 
+# 共享模組（session log 索引等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+try:
+    from shared.session_store import get_session_store
+    from shared.session_journal import read_session_log
+except ImportError:
+    get_session_store = None
+    read_session_log = None
+
 
 # ============ Log 標準格式 ============
 # 標準 log 檔案格式（JSON）：
@@ -30,17 +42,18 @@ from datetime import datetime
 DEFAULT_LOG_DIR = Path(r"C:\Users\User\Desktop\ESG_Output\_Backend\user_logs")
 
 
-def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+def load_latest_environment_log(log_dir: Optional[Path] = None, session_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     讀取最新的環境段 log 檔案並合併同一個 session 的資料
     此函數會：
-    1. 找到最新的 log 檔案
+    1. 找到最新的 log 檔案（指定 session_id 時為該 session 最新的檔案）
     2. 從該檔案中提取 session_id
     3. 找到所有相同 session_id 的 log 檔案
     4. 合併所有檔案的資料（特別是從 Step 1 獲取產業別）
     
     Args:
         log_dir: Log 資料夾路徑（預設使用 DEFAULT_LOG_DIR）
+        session_id: 指定讀取的 session（同時生成多份報告時避免讀到別人的最新 log）
     
     Returns:
         解析後的 log 資料 dict，如果找不到則返回 None
@@ -54,42 +67,48 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
         print(f"[WARN] Log directory not found: {log_dir}")
         return None
     
-    # 尋找所有 JSON 檔案
-    json_files = list(log_dir.glob("*.json"))
+    store = get_session_store() if get_session_store else None
+    if store is not None:
+        # 以索引查詢（O(log n)），不再逐一解析資料夾中的所有 JSON
+        store.ensure_indexed(log_dir)
+        latest = store.latest(log_dir, step1_with_industry=True)
+        if latest:
+            print(f"[INFO] 使用最新的 Step 1 文件: {latest[0]}")
+        else:
+            latest = store.latest(log_dir)
+        session_records = lambda sid: store.session_logs(log_dir, sid)
+        fallback_records = lambda: store.fallback_logs(log_dir)
+    else:
+        # 索引不可用時退回掃描資料夾
+        records = _scan_log_dir(log_dir)
+        step1_records = [r for r in records if "step 1" in str(r[1].get("step", "")).lower() and r[1].get("industry")]
+        if step1_records:
+            latest = max(step1_records, key=lambda r: r[2])[:2]
+            print(f"[INFO] 使用最新的 Step 1 文件: {latest[0]}")
+        else:
+            latest = max(records, key=lambda r: r[2])[:2] if records else None
+        session_records = lambda sid: [r[:2] for r in sorted(records, key=lambda r: r[2]) if r[1].get("session_id") == sid]
+        fallback_records = lambda: [
+            r[:2] for r in sorted(records, key=lambda r: (0 if "step 1" in str(r[1].get("step", "")).lower() else 1, r[2]))
+        ]
+    
+    if session_id:
+        # 指定 session：使用該 session 最新的一筆（優先有產業別的 Step 1 log）
+        requested = session_records(session_id)
+        if requested:
+            step1_requested = [r for r in requested if "step 1" in str(r[1].get("step", "")).lower() and r[1].get("industry")]
+            latest = (step1_requested or requested)[-1]
+            print(f"[INFO] 使用 session {session_id} 的文件: {latest[0]}")
+        else:
+            print(f"[WARN] 找不到 session {session_id} 的 log，改用最新的 log")
     
-    if not json_files:
+    if latest is None:
         print(f"[WARN] No log files found in: {log_dir}")
         return None
     
-    # 直接找最新的 Step 1 文件（產業別一定在 Step 1）
-    latest_step1_file = None
-    latest_step1_time = 0
-    for log_file in json_files:
-        try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            step = str(data.get("step", "")).lower()
-            if "step 1" in step and data.get("industry"):
-                file_time = log_file.stat().st_mtime
-                if file_time > latest_step1_time:
-                    latest_step1_time = file_time
-                    latest_step1_file = log_file
-        except:
-            continue
-    
-    # 如果找到 Step 1 文件，就用它；否則用最新的文件
-    if latest_step1_file:
-        latest_file = latest_step1_file
-        print(f"[INFO] 使用最新的 Step 1 文件: {latest_file.name}")
-    else:
-        # 按修改時間排序，取最新的
-        latest_file = max(json_files, key=lambda f: f.stat().st_mtime)
+    latest_name, latest_data = latest
     
     try:
-        # 先讀取最新的檔案
-        with open(latest_file, "r", encoding="utf-8") as f:
-            latest_data = json.load(f)
-        
         # 從最新檔案中提取 session_id
         session_id = latest_data.get("session_id", "")
         
@@ -98,52 +117,47 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
         
         if session_id:
             # 找到所有相同 session_id 的檔案
-            session_files = [f for f in json_files if f != latest_file]
-            
-            for session_file in session_files:
+            for session_name, session_data in session_records(session_id):
+                if session_name == latest_name:
+                    continue
                 try:
-                    with open(session_file, "r", encoding="utf-8") as f:
-                        session_data = json.load(f)
+                    # 合併資料：優先從 Step 1 檔案中獲取產業別和 company_profile
+                    # 必須檢查值是否為非空
+                    if "industry" in session_data:
+                        industry_value = session_data["industry"]
+                        if industry_value and str(industry_value).strip():
+                            if not merged_data.get("industry") or not str(merged_data.get("industry", "")).strip():
+                                merged_data["industry"] = str(industry_value).strip()
+                                print(f"[INFO] Merged industry '{merged_data['industry']}' from: {session_name}")
+                    
+                    if "company_profile" in session_data:
+                        if "company_profile" not in merged_data:
+                            merged_data["company_profile"] = {}
+                        # 合併 company_profile，保留現有值除非缺失
+                        for key, value in session_data["company_profile"].items():
+                            if key not in merged_data["company_profile"]:
+                                merged_data["company_profile"][key] = value
                     
-                    # 檢查此檔案是否屬於同一個 session
-                    if session_data.get("session_id") == session_id:
-                        # 合併資料：優先從 Step 1 檔案中獲取產業別和 company_profile
-                        # 必須檢查值是否為非空
-                        if "industry" in session_data:
-                            industry_value = session_data["industry"]
-                            if industry_value and str(industry_value).strip():
-                                if not merged_data.get("industry") or not str(merged_data.get("industry", "")).strip():
-                                    merged_data["industry"] = str(industry_value).strip()
-                                    print(f"[INFO] Merged industry '{merged_data['industry']}' from: {session_file.name}")
-                        
-                        if "company_profile" in session_data:
-                            if "company_profile" not in merged_data:
-                                merged_data["company_profile"] = {}
-                            # 合併 company_profile，保留現有值除非缺失
-                            for key, value in session_data["company_profile"].items():
-                                if key not in merged_data["company_profile"]:
-                                    merged_data["company_profile"][key] = value
-                        
-                        # 合併 emission_data（如果可用）
-                        if "emission_data" in session_data:
-                            if "emission_data" not in merged_data:
-                                merged_data["emission_data"] = {}
-                            for key, value in session_data["emission_data"].items():
-                                if key not in merged_data["emission_data"]:
-                                    merged_data["emission_data"][key] = value
-                        
-                        # 合併 tcfd_summary（如果可用）
-                        if "tcfd_summary" in session_data:
-                            if "tcfd_summary" not in merged_data:
-                                merged_data["tcfd_summary"] = {}
-                            for key, value in session_data["tcfd_summary"].items():
-                                if key not in merged_data["tcfd_summary"]:
-                                    merged_data["tcfd_summary"][key] = value
-                        
-                        print(f"[INFO] Merged data from: {session_file.name}")
+                    # 合併 emission_data（如果可用）
+                    if "emission_data" in session_data:
+                        if "emission_data" not in merged_data:
+                            merged_data["emission_data"] = {}
+                        for key, value in session_data["emission_data"].items():
+                            if key not in merged_data["emission_data"]:
+                                merged_data["emission_data"][key] = value
+                    
+                    # 合併 tcfd_summary（如果可用）
+                    if "tcfd_summary" in session_data:
+                        if "tcfd_summary" not in merged_data:
+                            merged_data["tcfd_summary"] = {}
+                        for key, value in session_data["tcfd_summary"].items():
+                            if key not in merged_data["tcfd_summary"]:
+                                merged_data["tcfd_summary"][key] = value
+                    
+                    print(f"[INFO] Merged data from: {session_name}")
                 
                 except Exception as e:
-                    # 跳過無法讀取的檔案
+                    # 跳過格式不正確的檔案
                     continue
         
         # 如果仍然缺少關鍵資料，嘗試從最近的包含完整資料的檔案中尋找
@@ -154,37 +168,19 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
         missing_tcfd = "tcfd_summary" not in merged_data or not merged_data.get("tcfd_summary")
         
         if missing_industry or missing_company_profile or missing_emission or missing_tcfd:
-            # 優先搜尋 Step 1 的文件（產業別通常在 Step 1 中記錄）
-            # 先按 step 排序（Step 1 優先），然後按修改時間排序
-            def sort_key(f):
-                try:
-                    with open(f, "r", encoding="utf-8") as file:
-                        data = json.load(file)
-                        step = str(data.get("step", "")).lower()
-                        # Step 1 優先，然後按時間排序
-                        if "step 1" in step:
-                            return (0, f.stat().st_mtime)
-                        else:
-                            return (1, f.stat().st_mtime)
-                except:
-                    return (2, f.stat().st_mtime)
-            
             # 搜尋最近的檔案（Step 1 優先，然後按修改時間排序）
-            for log_file in sorted(json_files, key=sort_key):
-                if log_file == latest_file:
+            for log_name, file_data in fallback_records():
+                if log_name == latest_name:
                     continue  # 跳過我們已經讀取的檔案
                 
                 try:
-                    with open(log_file, "r", encoding="utf-8") as f:
-                        file_data = json.load(f)
-                    
                     # 合併產業別（如果缺失）- 必須檢查值是否為非空
                     if missing_industry and "industry" in file_data:
                         industry_value = file_data["industry"]
                         # 檢查產業別是否為非空（不是空字串、None 或只包含空白）
                         if industry_value and str(industry_value).strip():
                             merged_data["industry"] = str(industry_value).strip()
-                            print(f"[INFO] Found industry '{merged_data['industry']}' from: {log_file.name} (step: {file_data.get('step', 'unknown')})")
+                            print(f"[INFO] Found industry '{merged_data['industry']}' from: {log_name} (step: {file_data.get('step', 'unknown')})")
                             missing_industry = False
                     
                     # 合併 company_profile（如果缺失）
@@ -195,7 +191,7 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
                             if key not in merged_data["company_profile"]:
                                 merged_data["company_profile"][key] = value
                         if merged_data["company_profile"]:
-                            print(f"[INFO] Found company_profile from: {log_file.name}")
+                            print(f"[INFO] Found company_profile from: {log_name}")
                             missing_company_profile = False
                     
                     # 合併 emission_data（如果缺失）
@@ -206,7 +202,7 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
                             if key not in merged_data["emission_data"]:
                                 merged_data["emission_data"][key] = value
                         if merged_data["emission_data"]:
-                            print(f"[INFO] Found emission_data from: {log_file.name}")
+                            print(f"[INFO] Found emission_data from: {log_name}")
                             missing_emission = False
                     
                     # 合併 tcfd_summary（如果缺失）
@@ -217,7 +213,7 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
                             if key not in merged_data["tcfd_summary"]:
                                 merged_data["tcfd_summary"][key] = value
                         if merged_data["tcfd_summary"]:
-                            print(f"[INFO] Found tcfd_summary from: {log_file.name}")
+                            print(f"[INFO] Found tcfd_summary from: {log_name}")
                             missing_tcfd = False
                     
                     # 如果我們找到了所有缺失的資料，停止搜尋
@@ -230,7 +226,7 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
         # 轉換為標準格式
         standardized = _standardize_log_data(merged_data)
         
-        print(f"[OK] Loaded environment log: {latest_file.name}")
+        print(f"[OK] Loaded environment log: {latest_name}")
         if session_id:
             print(f"[INFO] Session ID: {session_id}")
         if standardized.get("industry"):
@@ -239,10 +235,29 @@ def load_latest_environment_log(log_dir: Optional[Path] = None) -> Optional[Dict
         return standardized
     
     except Exception as e:
-        print(f"[ERROR] Failed to load log file {latest_file}: {e}")
+        print(f"[ERROR] Failed to load log file {latest_name}: {e}")
         return None
 
 
+def _scan_log_dir(log_dir: Path) -> List[Tuple[str, Dict[str, Any], float]]:
+    """解析資料夾中所有 JSON log（session 索引不可用時的後備）"""
+    records = []
+    for log_file in log_dir.glob("*.json"):
+        try:
+            if read_session_log:
+                # 快照 + session 日誌尾端
+                data, mtime = read_session_log(log_file)
+            else:
+                with open(log_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                mtime = log_file.stat().st_mtime
+            if isinstance(data, dict) and data:
+                records.append((log_file.name, data, mtime))
+        except Exception:
+            continue
+    return records
+
+
 def _standardize_log_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
     """
     將原始 log 資料轉換為標準格式
@@ -332,18 +347,21 @@ def _standardize_log_data(raw_data: Dict[str, Any]) -> Dict[str, Any]:
     return standardized
 
 
-def get_prompt_context(log_data: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
+def get_prompt_context(log_data: Optional[Dict[str, Any]] = None, log_dir: Optional[Path] = None,
+                       session_id: Optional[str] = None) -> Dict[str, str]:
     """
     從 log 資料中提取用於 LLM prompt 的上下文
     
     Args:
-        log_data: Log 資料（如果為 None，則自動讀取最新的）
+        log_data: Log 資料（如果為 None，則以 log_dir / session_id 讀取最新的）
+        log_dir: 同 load_latest_environment_log（呼叫端的 ReportContext.log_dir）
+        session_id: 同 load_latest_environment_log（呼叫端的 ReportContext.session_id）
     
     Returns:
         包含 prompt 上下文的 dict
     """
     if log_data is None:
-        log_data = load_latest_environment_log()
+        log_data = load_latest_environment_log(log_dir=log_dir, session_id=session_id)
     
     if log_data is None:
         return {
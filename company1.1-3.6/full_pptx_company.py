@@ -1,5 +1,4 @@
 """Company PPT engine supporting layouts A, B, and C."""
-from pptx import Presentation
 from pptx.util import Pt, Inches
 from pptx.dml.color import RGBColor
 from pptx.enum.shapes import MSO_SHAPE_TYPE
@@ -7,13 +6,33 @@ from pptx.enum.dml import MSO_LINE_DASH_STYLE
 from pptx.enum.text import PP_ALIGN
 from typing import List, Dict, Any, Optional, Tuple
 import re
-import importlib.util
 import os
 from pathlib import Path
 import sys
-
-from config_pptx_company import PPT_CONFIG, SLIDE_CONFIGS, SEED_TEMPLATE_PATH, OUTPUT_PATH
-from content_pptx_company import PPTContentEngine
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+if __package__:
+    # 由 shared.engine_loader 以套件載入（wrapper）
+    from .config_pptx_company import PPT_CONFIG, SLIDE_CONFIGS, SEED_TEMPLATE_PATH, OUTPUT_PATH
+    from .content_pptx_company import PPTContentEngine
+else:
+    # 直接執行（main_pptx_company.py）
+    from config_pptx_company import PPT_CONFIG, SLIDE_CONFIGS, SEED_TEMPLATE_PATH, OUTPUT_PATH
+    from content_pptx_company import PPTContentEngine
+
+# 共享模組（元件註冊表、媒體去重、模板快取等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+from shared.component_registry import (
+    component_files_from_configs,
+    get_component_attr,
+    warm_up_components,
+    warmup_enabled,
+)
+from shared.media_dedup import add_picture
+from shared.template_cache import load_template
+from shared.report_context import ReportContext
 
 # 移除 auto_repair_pptx 調用（修正引擎沒有用，不需要調度）
 # auto_repair_pptx = None
@@ -26,18 +45,19 @@ def cm(value: float) -> float:
 
 
 class PPTFullEngine:
-    def __init__(self, content_engine: PPTContentEngine, company_name: str = None):
+    def __init__(self, content_engine: PPTContentEngine, company_name: str = None, context: Optional[ReportContext] = None):
         if not os.path.exists(SEED_TEMPLATE_PATH):
             raise FileNotFoundError(f"Seed template missing: {SEED_TEMPLATE_PATH}")
-        self.prs = Presentation(SEED_TEMPLATE_PATH)
         self.content_engine = content_engine
         self.slide_configs = SLIDE_CONFIGS
-        self.output_path = Path(OUTPUT_PATH)
-        self.output_path.mkdir(exist_ok=True)
+        # 輸出目錄 / 公司名稱由 context 傳入（未指定時使用 config 的 OUTPUT_PATH）
+        context = context or content_engine.context
+        self.output_path = Path(context.output_dir or OUTPUT_PATH)
+        self.output_path.mkdir(parents=True, exist_ok=True)
         # 統一使用 Microsoft JhengHei 作為預設字型（含中英文），
         # 由 PowerPoint 負責英文 fallback 到 Calibri，避免使用怪字體。
         self.font_family = PPT_CONFIG.get("font_family", "Microsoft JhengHei")
-        self.company_name = company_name  # 公司名稱，用於替換
+        self.company_name = company_name or context.company_name  # 公司名稱，用於替換
 
         # 偵錯用開關：
         # - DISABLE_IMAGES=1  -> 不插入任何圖片（add_picture 不執行）
@@ -47,34 +67,50 @@ class PPTFullEngine:
         # - DISABLE_FLOWS=1 -> 關閉流程圖類 component（例如 RiskFlowchartComponent）
         self.disable_flows = os.getenv("DISABLE_FLOWS", "0") == "1"
 
+        # 預取的 LLM 文字：key 為 (slide_index, prefix)，由 _prefetch_slide_texts 填入
+        self.prefetch_concurrency = PPT_CONFIG.get("prefetch_concurrency", 6)
+        self._prefetched_texts: Dict[Tuple[int, str], str] = {}
+        self._current_slide_index: Optional[int] = None
+
         # 預先建立所有投影片（重用模板前5頁作為前5張內容頁，其餘以 add_slide 補足到 17 張）
+        # 模板骨架每個程序只建立一次，之後從記憶體複製
         self.total_slides = PPT_CONFIG.get("total_slides", 17)
-        existing_slides = len(self.prs.slides)  # 模板原有頁數（預期為 5）
         needed_slides = self.total_slides
-
-        self._slides_by_index = {}
-        layouts = self.prs.slide_layouts
-        # 優先使用第一個版面（在 minimal 測試中確認過是安全的）
-        base_layout = layouts[0]
-
-        # 先將現有模板頁面映射為前幾張內容頁（例如 1~5）
-        for idx in range(1, min(existing_slides, needed_slides) + 1):
-            self._slides_by_index[idx] = self.prs.slides[idx - 1]
-
-        # 如有需要，再以 add_slide 補足到 total_slides
-        for idx in range(existing_slides + 1, needed_slides + 1):
-            new_slide = self.prs.slides.add_slide(base_layout)
-            self._slides_by_index[idx] = new_slide
+        self.prs, template_meta = load_template(
+            SEED_TEMPLATE_PATH,
+            lambda prs: self._prepare_template(prs, needed_slides),
+            variant=f"slides={needed_slides}",
+        )
+        existing_slides = template_meta["existing_slides"]
+        self._slides_by_index = {
+            idx: self.prs.slides[idx - 1] for idx in range(1, min(len(self.prs.slides), needed_slides) + 1)
+        }
 
         print(
             f"[INFO] 預先建立 {needed_slides} 張投影片完成（重用模板原有 {existing_slides} 頁，最終總頁數 {len(self.prs.slides)}）"
         )
 
+        # COMPONENT_WARMUP=1 -> 預先載入 SLIDE_CONFIGS 中的所有元件模組
+        if warmup_enabled() and not self.disable_components:
+            warm_up_components(component_files_from_configs(self.slide_configs))
+
+    def _prepare_template(self, prs, needed_slides: int) -> Dict[str, Any]:
+        """模板骨架：以 add_slide 補足到 needed_slides 頁（只在模板快取未命中時執行）"""
+        existing_slides = len(prs.slides)  # 模板原有頁數（預期為 5）
+        # 優先使用第一個版面（在 minimal 測試中確認過是安全的）
+        base_layout = prs.slide_layouts[0]
+        for _ in range(existing_slides + 1, needed_slides + 1):
+            prs.slides.add_slide(base_layout)
+        return {"existing_slides": existing_slides}
+
     def generate(self, company_name: str = None):
         """生成 PPT，可選的公司名稱用於替換 CEO message 中的 'our company'"""
         if company_name:
             self.company_name = company_name
-        for idx in range(1, self.total_slides + 1):
+        slide_indices = list(range(1, self.total_slides + 1))
+        # 先並行取得所有頁面的 LLM 文字，再依頁序渲染（總耗時約等於最慢的一次呼叫）
+        self._prefetch_slide_texts(slide_indices)
+        for idx in slide_indices:
             self._generate_slide(idx)
 
         # 基礎檔名
@@ -109,6 +145,7 @@ class PPTFullEngine:
         return str(output)
 
     def generate_subset(self, slide_indices: List[int], output_filename: Optional[str] = None):
+        self._prefetch_slide_texts(slide_indices)
         for idx in slide_indices:
             self._generate_slide(idx)
         filename = output_filename or PPT_CONFIG.get("output_filename", "ESG_PPT_company_experimental.pptx")
@@ -120,6 +157,7 @@ class PPTFullEngine:
     def _generate_slide(self, slide_index: int):
         cfg = self.slide_configs[slide_index]
         slide = self._ensure_slide(slide_index)
+        self._current_slide_index = slide_index
         print(f"[Slide {slide_index}] {cfg.get('title','Untitled')}")
         # 不再清空整張投影片的 XML 結構，只是在預先建立好的空白頁上填內容
         self._apply_title(slide, cfg)
@@ -206,7 +244,8 @@ class PPTFullEngine:
                 top_cm = background_cfg.get("top_cm", 3.0)
                 width_cm_val = background_cfg.get("width_cm")
                 height_cm_val = background_cfg.get("height_cm")
-                pic = slide.shapes.add_picture(
+                pic = add_picture(
+                    slide.shapes,
                     str(path),
                     Inches(cm(left_cm_val)),
                     Inches(cm(top_cm)),
@@ -245,7 +284,8 @@ class PPTFullEngine:
             else:
                 picture_kwargs["width"] = Inches(cm(14.0))
 
-            pic = slide.shapes.add_picture(
+            pic = add_picture(
+                slide.shapes,
                 str(image_path),
                 Inches(cm(left_cm_val)),
                 Inches(cm(top_cm)),
@@ -334,7 +374,7 @@ class PPTFullEngine:
             for path in paths:
                 if not Path(path).exists() or self.disable_images:
                     continue
-                pic = slide.shapes.add_picture(str(path), Inches(cm(area_left)), Inches(cm(current_top)), width=Inches(cm(width_cm_val)))
+                pic = add_picture(slide.shapes, str(path), Inches(cm(area_left)), Inches(cm(current_top)), width=Inches(cm(width_cm_val)))
                 pic.left = Inches(cm(area_right)) - pic.width
                 pictures.append(pic)
                 current_top += pic.height * CM_TO_INCH + gap_cm
@@ -368,7 +408,8 @@ class PPTFullEngine:
                     if not Path(path).exists():
                         continue
                     width_cm_current = widths_override[idx] if idx < len(widths_override) else width_cm_val
-                    pic = slide.shapes.add_picture(
+                    pic = add_picture(
+                        slide.shapes,
                         str(path),
                         Inches(cm(area_left)),
                         Inches(cm(area_top)),
@@ -399,7 +440,8 @@ class PPTFullEngine:
                 if not Path(right_path).exists():
                     return
                 right_width_cm = widths_override[len(paths) - 1] if len(widths_override) >= len(paths) else width_cm_val
-                right_pic = slide.shapes.add_picture(
+                right_pic = add_picture(
+                    slide.shapes,
                     str(right_path),
                     Inches(cm(area_left)),
                     Inches(cm(area_top)),
@@ -476,7 +518,8 @@ class PPTFullEngine:
                 if not Path(path).exists():
                     continue
                 width_cm_current = widths_override[idx] if idx < len(widths_override) else width_cm_val
-                pic = slide.shapes.add_picture(
+                pic = add_picture(
+                    slide.shapes,
                     str(path),
                     Inches(cm(area_left)),
                     Inches(cm(area_top)),
@@ -532,7 +575,7 @@ class PPTFullEngine:
             left_cm_val = media_cfg.get("area_left_cm", area_left)
             image_path = paths[0]
             if Path(image_path).exists():
-                slide.shapes.add_picture(str(image_path), Inches(cm(left_cm_val)), Inches(cm(top_cm)), width=Inches(cm(width_cm_val)))
+                add_picture(slide.shapes, str(image_path), Inches(cm(left_cm_val)), Inches(cm(top_cm)), width=Inches(cm(width_cm_val)))
 
     def _layout_c(self, slide, cfg):
         top_text = cfg.get("top_text") or self._get_slide_text(cfg)
@@ -578,7 +621,8 @@ class PPTFullEngine:
             width_cm = media_cfg.get("width_cm", 14.0)
             left_cm_val = media_cfg.get("left_cm", 2.5)
             if image_path and Path(image_path).exists():
-                slide.shapes.add_picture(
+                add_picture(
+                    slide.shapes,
                     str(image_path),
                     Inches(cm(left_cm_val)),
                     Inches(cm(top_offset_cm)),
@@ -605,17 +649,71 @@ class PPTFullEngine:
             if cfg.get("bottom_alert_text"):
                 self._apply_alert(bottom_box, cfg["bottom_alert_text"])
 
+    # ------------------------------------------------------------------
+    # Prefetch（並行取得 LLM 文字）
+    # ------------------------------------------------------------------
+    def _slide_text_requests(self, cfg: Dict[str, Any]) -> List[Tuple[str, str]]:
+        """列出渲染此頁時會呼叫的 (prefix, content_method)，條件需與各 layout 一致"""
+        layout = cfg.get("layout")
+        prefixes = []
+        if layout in ("A", "B") and cfg.get("paragraphs", 2):
+            prefixes.append("main")
+        elif layout == "C" and not cfg.get("top_text"):
+            prefixes.append("main")
+        if layout == "A" and cfg.get("right_paragraphs", 0):
+            prefixes.append("right")
+
+        requests = []
+        for prefix in prefixes:
+            method_name = cfg.get("content_method" if prefix == "main" else f"{prefix}_content_method")
+            if method_name and hasattr(self.content_engine, method_name):
+                requests.append((prefix, method_name))
+        return requests
+
+    def _prefetch_slide_texts(self, slide_indices: List[int]):
+        """
+        以有上限的執行緒池同時呼叫所有頁面的 content_method，結果存入 self._prefetched_texts。
+        失敗的項目不寫入，渲染時會回到原本的同步呼叫。
+        """
+        jobs = []
+        for idx in slide_indices:
+            cfg = self.slide_configs.get(idx, {})
+            for prefix, method_name in self._slide_text_requests(cfg):
+                if (idx, prefix) not in self._prefetched_texts:
+                    jobs.append((idx, prefix, method_name))
+        if not jobs:
+            return
+
+        max_workers = max(1, min(int(self.prefetch_concurrency or 1), len(jobs)))
+        print(f"[INFO] 預取 {len(jobs)} 段 LLM 文字（並行上限 {max_workers}）")
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="slide-prefetch") as pool:
+            futures = {
+                pool.submit(getattr(self.content_engine, method_name)): (idx, prefix, method_name)
+                for idx, prefix, method_name in jobs
+            }
+            for future in as_completed(futures):
+                idx, prefix, method_name = futures[future]
+                try:
+                    self._prefetched_texts[(idx, prefix)] = future.result()
+                    print(f"  [OK] 預取完成: Slide {idx} {prefix} ({method_name})")
+                except Exception as e:
+                    print(f"  [WARN] 預取失敗，渲染時改為同步呼叫: Slide {idx} {prefix} ({method_name}): {e}")
+
     # Helpers (same as base engine)
     def _get_slide_text(self, cfg: Dict[str, Any], prefix: str = "main") -> str:
         if prefix in ("main", "left"):
             method_key = "content_method"
             fallback_key = "fallback_text"
+            cache_key = (self._current_slide_index, "main")
         else:
             method_key = f"{prefix}_content_method"
             fallback_key = f"{prefix}_fallback_text"
+            cache_key = (self._current_slide_index, prefix)
 
         method_name = cfg.get(method_key)
-        if method_name and hasattr(self.content_engine, method_name):
+        if method_name and cache_key in self._prefetched_texts:
+            text = self._prefetched_texts.pop(cache_key)
+        elif method_name and hasattr(self.content_engine, method_name):
             text = getattr(self.content_engine, method_name)()
         else:
             text = cfg.get(fallback_key, "")
@@ -748,10 +846,8 @@ class PPTFullEngine:
             print(f"  [INFO] Flow component skipped due to DISABLE_FLOWS=1: {class_name}")
             return
 
-        spec = importlib.util.spec_from_file_location("ppt_component", file_path)
-        module = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(module)  # type: ignore
-        component_class = getattr(module, class_name)
+        # 元件模組每個程序只載入一次（依路徑與 mtime 快取）
+        component_class = get_component_attr(file_path, class_name)
         instance = component_class(self.prs, **media_cfg.get("init_kwargs", {}))
         method = getattr(instance, method_name)
         method(slide, **media_cfg.get("method_kwargs", {}))
@@ -2,8 +2,8 @@
 產業別分析生成器
 在 Step 1 用戶按「生成 TCFD」時，第一個 LLM 調用生成產業別分析
 """
-import anthropic
 import json
+import sys
 from pathlib import Path
 from typing import Dict, Any, Optional
 from datetime import datetime
@@ -18,6 +18,14 @@ _base_dir = _current_file.parent.parent  # ESG--report/
 # 統一使用 TCFD generator/logs（與 save_session_log 一致）
 LOG_FILE_BASE = _base_dir / "TCFD generator" / "logs"
 
+# 共享模組（Anthropic client 共用池）位於 TCFD generator/shared
+if str(_base_dir / "TCFD generator") not in sys.path:
+    sys.path.append(str(_base_dir / "TCFD generator"))
+from shared.anthropic_pool import get_anthropic_client
+from shared.session_store import record_session_log
+from shared.industry_analysis_cache import invalidate_industry_analysis
+from shared.session_journal import journal_path, read_session_log
+
 
 def generate_industry_analysis(session_id: str, api_key: str = None, model: str = None) -> Dict[str, Any]:
     """
@@ -35,22 +43,44 @@ def generate_industry_analysis(session_id: str, api_key: str = None, model: str
     if not final_api_key:
         raise RuntimeError("API key is not configured.")
     
-    client = anthropic.Anthropic(api_key=final_api_key)
-    # 優先使用傳入的 model，否則使用與 TCFD 表格相同的模型
-    final_model = model if model else "claude-sonnet-4-20250514"
-    
-    # 相對路徑讀取 log（兼容所有環境）
+    # 相對路徑讀取 log（兼容所有環境）；快照之後的寫入在日誌檔中，需合併後讀取
     log_file = LOG_FILE_BASE / f"session_{session_id}.json"
-    if not log_file.exists():
+    if not log_file.exists() and not journal_path(log_file).exists():
         raise FileNotFoundError(f"找不到 log 文件: {log_file}")
-    with open(log_file, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    data = read_session_log(log_file)[0]
     
     # 直接讀取（寫死路徑，不抽象）
     industry = data["industry"]
     monthly_electricity_bill_ntd = data["monthly_bill_ntd"]
     emission_total_tco2e = data.get("emission_data", {}).get("total")
     
+    result = analyze_industry(
+        industry, monthly_electricity_bill_ntd, emission_total_tco2e,
+        api_key=final_api_key, model=model, session_id=session_id
+    )
+    
+    # 寫入 log
+    save_industry_analysis_to_log(result)
+    
+    return result
+
+
+def analyze_industry(
+    industry: str,
+    monthly_electricity_bill_ntd: float,
+    emission_total_tco2e: Optional[float],
+    api_key: str,
+    model: str = None,
+    session_id: str = None,
+) -> Dict[str, Any]:
+    """
+    只呼叫 LLM 生成產業別分析，不讀寫 log
+    Step 1 頁面在輸入穩定後預先生成時使用；按下按鈕後再補上 session_id 以 save_industry_analysis_to_log 寫入
+    """
+    client = get_anthropic_client(api_key)
+    # 優先使用傳入的 model，否則使用與 TCFD 表格相同的模型
+    final_model = model if model else "claude-sonnet-4-20250514"
+    
     # 構建 prompt（寫死，不抽象）
     emission_text = f"\n年碳排放總額：{emission_total_tco2e:.2f} tCO₂e" if emission_total_tco2e else ""
     emission_item = f"\n6. 【必須包含】年碳排放總額：{emission_total_tco2e:.2f} tCO₂e（必須在分析中明確提及此具體數據）" if emission_total_tco2e else ""
@@ -109,9 +139,6 @@ def generate_industry_analysis(session_id: str, api_key: str = None, model: str
     if emission_total_tco2e and emission_total_tco2e > 0:
         result["emission_total_tco2e"] = emission_total_tco2e
     
-    # 寫入 log
-    save_industry_analysis_to_log(result)
-    
     return result
 
 
@@ -136,6 +163,9 @@ def save_industry_analysis_to_log(data: Dict[str, Any]) -> None:
             json.dump(data, f, ensure_ascii=False, indent=2)
             f.flush()
             os.fsync(f.fileno())
+        record_session_log(log_file, data)
+        # 公司段引擎依 session 快取 150 字分析，新檔案寫入後讓快取失效
+        invalidate_industry_analysis(session_id)
         print(f"[save_industry_analysis_to_log] ✅ 成功寫入: {log_file}")
         print(f"[save_industry_analysis_to_log] 文件大小: {log_file.stat().st_size} bytes")
     except Exception as e:
@@ -9,20 +9,27 @@ Author: 翻滾索徑有限公司 Rolling Paths Co.
 Version: 1.0
 """
 
-from dataclasses import dataclass
-from typing import Optional, Literal
+from dataclasses import dataclass, fields
+from typing import Optional, Literal, Dict, Any
+
+import numpy as np
+
+from emission_factors import DEFAULT_CAR_KM_PER_L, DEFAULT_CAR_KM_PER_YEAR, FactorSet
 
 # === 預設係數 ===
 EF_GRID = 0.474    # Taipower kg CO2/kWh
 EF_GASOLINE = 2.3  # kg CO2/L
 EF_DIESEL = 2.6
-DEFAULT_CAR_KM_PER_YEAR = 15000
-DEFAULT_CAR_KM_PER_L = 10
 CAR_T_CO2E_PER_YEAR = (DEFAULT_CAR_KM_PER_YEAR / DEFAULT_CAR_KM_PER_L) * EF_GASOLINE / 1000  # ~3.45
-BIKE_EQ = 0.5
 EF_WATER_T_PER_M3 = 0.0004
 EF_WASTE_T_PER_TON = 0.33
 
+# 預設係數組（與上方常數相同）；其他年度 / 地區 / 版本的係數見 emission_factors.resolve_factors
+DEFAULT_FACTORS = FactorSet(
+    grid=EF_GRID, gasoline=EF_GASOLINE, diesel=EF_DIESEL,
+    water=EF_WATER_T_PER_M3, waste=EF_WASTE_T_PER_TON,
+)
+
 
 @dataclass
 class Inputs:
@@ -42,33 +49,35 @@ class Inputs:
     use_rule_of_thumb: bool = False
 
 
-def compute_scope2(annual_kwh, monthly_bill, price_per_kwh):
+def compute_scope2(annual_kwh, monthly_bill, price_per_kwh, ef_grid=EF_GRID):
     if annual_kwh:
-        return annual_kwh * EF_GRID / 1000
+        return annual_kwh * ef_grid / 1000
     if monthly_bill:
         annual_kwh = (monthly_bill / price_per_kwh) * 12
-        return annual_kwh * EF_GRID / 1000
+        return annual_kwh * ef_grid / 1000
     return 0.0
 
 
-def compute_scope1_vehicle(car, mc, gas_liters, diesel_liters):
+def compute_scope1_vehicle(car, mc, gas_liters, diesel_liters, factors: FactorSet = DEFAULT_FACTORS):
     if gas_liters or diesel_liters:
-        return (gas_liters or 0) * EF_GASOLINE / 1000 + (diesel_liters or 0) * EF_DIESEL / 1000
-    car_equiv = car + mc * BIKE_EQ
-    return car_equiv * CAR_T_CO2E_PER_YEAR
+        return (gas_liters or 0) * factors.gasoline / 1000 + (diesel_liters or 0) * factors.diesel / 1000
+    car_equiv = car + mc * factors.bike_eq
+    return car_equiv * factors.car_t_co2e_per_year
 
 
 def compute_scope1_refrigerant(leak_kg, gwp):
     return leak_kg * gwp / 1000
 
 
-def compute_minor_scope3(water, waste):
-    return water * EF_WATER_T_PER_M3 + waste * EF_WASTE_T_PER_TON
+def compute_minor_scope3(water, waste, factors: FactorSet = DEFAULT_FACTORS):
+    return water * factors.water + waste * factors.waste
 
 
-def estimate(inputs: Inputs):
-    s2 = compute_scope2(inputs.annual_kwh, inputs.monthly_bill_ntd, inputs.price_per_kwh_ntd)
-    s1v = compute_scope1_vehicle(inputs.car_count, inputs.motorcycles, inputs.gasoline_liters_year, inputs.diesel_liters_year)
+def estimate(inputs: Inputs, factors: Optional[FactorSet] = None):
+    """factors: 排放係數組（省略時使用預設係數；例如 resolve_factors(region="TW", year=2022)）"""
+    factors = factors or DEFAULT_FACTORS
+    s2 = compute_scope2(inputs.annual_kwh, inputs.monthly_bill_ntd, inputs.price_per_kwh_ntd, factors.grid)
+    s1v = compute_scope1_vehicle(inputs.car_count, inputs.motorcycles, inputs.gasoline_liters_year, inputs.diesel_liters_year, factors)
     s1r = compute_scope1_refrigerant(inputs.refrigerant_leak_kg, inputs.refrigerant_gwp)
     s1 = s1v + s1r
     total = s1 + s2
@@ -82,7 +91,7 @@ def estimate(inputs: Inputs):
     share_s2 = s2 / total * 100 if total else 0
     share_s1v = s1v / total * 100 if total else 0
     share_s1r = s1r / total * 100 if total else 0
-    s3_minor = compute_minor_scope3(inputs.water_m3_year, inputs.waste_ton_year) if inputs.include_scope3 else 0
+    s3_minor = compute_minor_scope3(inputs.water_m3_year, inputs.waste_ton_year, factors) if inputs.include_scope3 else 0
 
     total_with_s3 = total + s3_minor
     
@@ -96,3 +105,148 @@ def estimate(inputs: Inputs):
         "總排放_含S3": round(total_with_s3, 2),
         "占比(%)": {"電力": round(share_s2, 1), "車輛": round(share_s1v, 1), "冷媒": round(share_s1r, 1)},
     }
+
+
+# === 批次估算（多據點 / 多期帳單） ===
+# 數值欄位；Optional 欄位的空值（None / NaN）等同 None，其他欄位的空值使用 Inputs 預設值
+_NUMERIC_FIELDS = [f.name for f in fields(Inputs) if f.name not in ("mode", "include_scope3", "use_rule_of_thumb")]
+_FLAG_FIELDS = ("include_scope3", "use_rule_of_thumb")
+_SHARE_KEYS = ("電力", "車輛", "冷媒")
+
+
+def _column(table, name, n):
+    """取出欄位為 float64 陣列；缺少的欄位以 Inputs 預設值（None -> NaN）填滿"""
+    default = getattr(Inputs, name)
+    fill = np.nan if default is None else float(default)
+    if name not in table:
+        return np.full(n, fill)
+    values = np.asarray(table[name], dtype=np.float64)
+    if default is not None:
+        values = np.where(np.isnan(values), fill, values)
+    return values
+
+
+def _flag(table, name, n):
+    if name not in table:
+        return np.full(n, bool(getattr(Inputs, name)))
+    values = np.asarray(table[name])
+    if values.dtype == bool:
+        return values
+    if values.dtype.kind in "iuf":
+        return _truthy(values.astype(np.float64))
+    return np.array([bool(v) and v == v for v in values.tolist()], dtype=bool)  # None / NaN -> False
+
+
+def _truthy(values):
+    """對應 estimate() 中 `if x:` 的判斷（None / NaN / 0 為 False）"""
+    return ~np.isnan(values) & (values != 0)
+
+
+def _round(values, ndigits):
+    """
+    與內建 round() 逐筆相同的四捨五入
+    np.round 是先乘 10**ndigits 再取整，剛好落在 .5 附近的值可能與 round() 不同，這些少數值改用 round()
+    """
+    result = np.round(values, ndigits)
+    scaled = values * 10.0 ** ndigits
+    near_half = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < 1e-6
+    if near_half.any():
+        result[near_half] = [round(v, ndigits) for v in values[near_half].tolist()]
+    return result
+
+
+def _table_size(table) -> int:
+    if hasattr(table, "columns"):
+        return len(table)
+    columns = list(table)
+    return len(table[columns[0]]) if columns else 0
+
+
+def estimate_arrays(table, factors: Optional[FactorSet] = None) -> Dict[str, Any]:
+    """
+    estimate_batch 的計算核心：返回未四捨五入的 float64 陣列（供不確定性分析等後續計算使用）
+
+    參數與 estimate_batch 相同；返回 {key: 陣列}，"占比(%)" 為 {"電力": 陣列, ...}
+    """
+    n = _table_size(table)
+    col = {name: _column(table, name, n) for name in _NUMERIC_FIELDS}
+    flag = {name: _flag(table, name, n) for name in _FLAG_FIELDS}
+    factors = factors or DEFAULT_FACTORS
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Scope 2：優先使用年度度數，否則由月電費換算
+        annual_kwh = col["annual_kwh"]
+        monthly_bill = col["monthly_bill_ntd"]
+        s2 = np.where(
+            _truthy(annual_kwh),
+            annual_kwh * factors.grid / 1000,
+            np.where(_truthy(monthly_bill), (monthly_bill / col["price_per_kwh_ntd"]) * 12 * factors.grid / 1000, 0.0),
+        )
+
+        # Scope 1 車輛：有油量用油量，否則以車輛數估算
+        gas = np.where(_truthy(col["gasoline_liters_year"]), col["gasoline_liters_year"], 0.0)
+        diesel = np.where(_truthy(col["diesel_liters_year"]), col["diesel_liters_year"], 0.0)
+        s1v = np.where(
+            (gas != 0) | (diesel != 0),
+            gas * factors.gasoline / 1000 + diesel * factors.diesel / 1000,
+            (col["car_count"] + col["motorcycles"] * factors.bike_eq) * factors.car_t_co2e_per_year,
+        )
+        s1r = col["refrigerant_leak_kg"] * col["refrigerant_gwp"] / 1000
+        s1 = s1v + s1r
+        total = s1 + s2
+
+        rule = flag["use_rule_of_thumb"] & (s2 > 0)
+        total = np.where(rule, s2 * 1.1, total)
+        s1 = np.where(rule, total - s2, s1)
+        s1v = np.where(rule, s1 * 0.9, s1v)
+        s1r = np.where(rule, s1 * 0.1, s1r)
+
+        has_total = total != 0
+        share_s2 = np.where(has_total, s2 / total * 100, 0.0)
+        share_s1v = np.where(has_total, s1v / total * 100, 0.0)
+        share_s1r = np.where(has_total, s1r / total * 100, 0.0)
+        s3_minor = np.where(
+            flag["include_scope3"],
+            col["water_m3_year"] * factors.water + col["waste_ton_year"] * factors.waste,
+            0.0,
+        )
+        total_with_s3 = total + s3_minor
+
+    return {
+        "Scope2_電力": s2,
+        "Scope1_車輛": s1v,
+        "Scope1_冷媒": s1r,
+        "Scope1_合計": s1,
+        "總排放_S1S2": total,
+        "Scope3_小項": s3_minor,
+        "總排放_含S3": total_with_s3,
+        "占比(%)": dict(zip(_SHARE_KEYS, (share_s2, share_s1v, share_s1r))),
+    }
+
+
+def estimate_batch(table, factors: Optional[FactorSet] = None):
+    """
+    批次估算：對每一列執行與 estimate() 相同的計算（NumPy 向量化）
+
+    Args:
+        table: pandas DataFrame 或 {欄位: 陣列} dict，欄位名稱與 Inputs 相同（缺少的欄位使用預設值）
+        factors: 排放係數組；多年度 / 多地區的資料可傳入逐列對應的係數，例如
+                 resolve_factors(region=df["region"], year=df["year"])（一次向量化查表）
+
+    Returns:
+        與 estimate() 相同的 key；DataFrame 輸入返回 DataFrame（占比欄位展開為 "占比(%)_電力" 等），
+        dict 輸入返回 {key: 陣列}，"占比(%)" 為 {"電力": 陣列, ...}
+    """
+    is_frame = hasattr(table, "columns")
+    raw = estimate_arrays(table, factors)
+    result: Dict[str, Any] = {key: _round(values, 2) for key, values in raw.items() if key != "占比(%)"}
+    result["占比(%)"] = {key: _round(values, 1) for key, values in raw["占比(%)"].items()}
+    if not is_frame:
+        return result
+
+    import pandas as pd
+    shares = result.pop("占比(%)")
+    frame = pd.DataFrame(result, index=table.index)
+    for key, values in shares.items():
+        frame[f"占比(%)_{key}"] = values
+    return frame
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emission Factor Registry
+------------------------
+排放係數以 (係數, 地區, 年度, 來源版本) 為 key 保存在 emission_factors.csv，
+每個程序只載入一次並轉成排序好的 NumPy 陣列：
+- resolve(region, year, version) 傳入純量 -> FactorSet（float 欄位，結果快取）
+- 傳入陣列（例如多年度、多地區的據點表）-> FactorSet（ndarray 欄位），以 searchsorted 一次查完
+
+某個係數在該年度沒有資料時，使用該年度以前最近一年的值（早於第一筆資料時使用第一筆），
+例如燃料係數只登錄一次即可套用到之後每一年。
+
+環境變數：
+- EMISSION_FACTOR_TABLE -> 係數表路徑（預設為本資料夾的 emission_factors.csv）
+"""
+
+import csv
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+import numpy as np
+
+FACTORS = ("grid", "gasoline", "diesel", "water", "waste")
+DEFAULT_REGION = "TW"
+DEFAULT_VERSION = "v1"
+DEFAULT_TABLE_PATH = Path(__file__).resolve().parent / "emission_factors.csv"
+
+# 複合 key = 群組 (係數, 地區, 版本) * YEAR_SPAN + 年度
+YEAR_SPAN = 10000
+
+# 以車輛數推估 Scope 1 時的假設（不在係數表中，不確定性分析會對它們抽樣）
+DEFAULT_CAR_KM_PER_YEAR = 15000
+DEFAULT_CAR_KM_PER_L = 10
+BIKE_EQ = 0.5  # 一台機車約等於半台汽車
+
+Number = Union[float, np.ndarray]
+
+
+@dataclass(frozen=True, eq=False)
+class FactorSet:
+    """
+    一組排放係數（estimate / estimate_batch 的 factors 參數）
+    欄位為 float 時套用到所有資料列；為 ndarray 時與資料列逐筆對應
+    """
+    grid: Number        # kg CO2e/kWh
+    gasoline: Number    # kg CO2/L
+    diesel: Number      # kg CO2/L
+    water: Number       # t CO2e/m3
+    waste: Number       # t CO2e/t
+    region: Optional[str] = None
+    year: Optional[int] = None
+    version: Optional[str] = None
+    car_km_per_year: Number = DEFAULT_CAR_KM_PER_YEAR
+    car_km_per_l: Number = DEFAULT_CAR_KM_PER_L
+    bike_eq: Number = BIKE_EQ
+
+    @property
+    def car_t_co2e_per_year(self) -> Number:
+        """每台汽車年排放（依汽油係數推算，與 CAR_T_CO2E_PER_YEAR 相同公式）"""
+        return (self.car_km_per_year / self.car_km_per_l) * self.gasoline / 1000
+
+
+class FactorRegistry:
+    """排放係數表（排序好的陣列 + 代碼索引）"""
+
+    def __init__(self, rows):
+        self.regions: Dict[str, int] = {}
+        self.versions: Dict[str, int] = {}
+        factor_codes = {name: idx for idx, name in enumerate(FACTORS)}
+
+        parsed = []
+        for row in rows:
+            factor = row["factor"].strip()
+            if factor not in factor_codes:
+                raise ValueError(f"未知的排放係數: {factor}")
+            region = self.regions.setdefault(row["region"].strip(), len(self.regions))
+            version = self.versions.setdefault(row["version"].strip(), len(self.versions))
+            parsed.append((factor_codes[factor], region, version, int(row["year"]), float(row["value"])))
+
+        groups = np.array([self._group(f, r, v) for f, r, v, _, _ in parsed], dtype=np.int64)
+        years = np.array([p[3] for p in parsed], dtype=np.int64)
+        keys = groups * YEAR_SPAN + years
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.values = np.array([p[4] for p in parsed], dtype=np.float64)[order]
+        self.latest_year = int(years.max()) if len(years) else None
+        if len(self.keys) and (np.diff(self.keys) == 0).any():
+            raise ValueError("排放係數表中有重複的 (係數, 地區, 年度, 版本)")
+
+        self._sets: Dict[Tuple[str, int, str], FactorSet] = {}
+
+    @classmethod
+    def from_csv(cls, path) -> "FactorRegistry":
+        with open(path, newline="", encoding="utf-8") as f:
+            return cls(list(csv.DictReader(f)))
+
+    def _group(self, factor: int, region: int, version: int):
+        return (factor * len(self.regions) + region) * len(self.versions) + version
+
+    def _codes(self, mapping: Dict[str, int], values, label: str) -> np.ndarray:
+        """名稱 -> 代碼（每個不同的名稱只查一次字典）"""
+        values = np.asarray(values)
+        if values.ndim == 0:
+            names, inverse = np.array([str(values)]), np.zeros(1, dtype=np.int64)
+        else:
+            names, inverse = np.unique(values.astype(str), return_inverse=True)
+        missing = [name for name in names.tolist() if name not in mapping]
+        if missing:
+            raise KeyError(f"排放係數表中沒有這些{label}: {missing}")
+        codes = np.array([mapping[name] for name in names.tolist()], dtype=np.int64)[inverse.ravel()]
+        return codes.reshape(values.shape)
+
+    def _lookup_codes(self, factor: str, region_codes: np.ndarray, version_codes: np.ndarray,
+                      years: np.ndarray) -> np.ndarray:
+        groups = self._group(FACTORS.index(factor), region_codes, version_codes)
+
+        # 該年度以前最近的一筆
+        pos = np.searchsorted(self.keys, groups * YEAR_SPAN + years, side="right") - 1
+        found = (pos >= 0) & (self.keys[np.maximum(pos, 0)] // YEAR_SPAN == groups)
+        if not found.all():
+            # 早於第一筆資料 -> 使用該群組的第一筆
+            first = np.searchsorted(self.keys, groups * YEAR_SPAN, side="left")
+            first_ok = (first < len(self.keys)) & (self.keys[np.minimum(first, len(self.keys) - 1)] // YEAR_SPAN == groups)
+            if not (found | first_ok).all():
+                raise KeyError(f"排放係數表中沒有 {factor} 的資料（地區 / 版本組合不存在）")
+            pos = np.where(found, pos, first)
+        return self.values[pos]
+
+    def lookup_many(self, region, year, version=DEFAULT_VERSION) -> Dict[str, np.ndarray]:
+        """
+        向量化查詢所有係數
+
+        Args:
+            region / year / version: 純量或陣列（會互相 broadcast；地區與版本名稱只轉換一次代碼）
+
+        Returns:
+            {係數: float64 陣列}
+        """
+        region_codes = self._codes(self.regions, region, "地區")
+        version_codes = self._codes(self.versions, version, "版本")
+        years = np.asarray(year).astype(np.int64)
+        region_codes, version_codes, years = np.broadcast_arrays(region_codes, version_codes, years)
+        return {name: self._lookup_codes(name, region_codes, version_codes, years) for name in FACTORS}
+
+    def lookup(self, factor: str, region, year, version=DEFAULT_VERSION) -> np.ndarray:
+        """向量化查詢單一係數（參數同 lookup_many）"""
+        region_codes = self._codes(self.regions, region, "地區")
+        version_codes = self._codes(self.versions, version, "版本")
+        years = np.asarray(year).astype(np.int64)
+        return self._lookup_codes(factor, *np.broadcast_arrays(region_codes, version_codes, years))
+
+    def resolve(self, region=DEFAULT_REGION, year=None, version=DEFAULT_VERSION) -> FactorSet:
+        """
+        取得一組排放係數
+
+        純量參數返回 float 欄位的 FactorSet（快取）；任一參數為陣列時返回逐列對應的 ndarray 欄位
+        year 省略時使用表中最新年度
+        """
+        if year is None:
+            year = self.latest_year
+        if np.ndim(region) == 0 and np.ndim(year) == 0 and np.ndim(version) == 0:
+            key = (str(region), int(year), str(version))
+            factor_set = self._sets.get(key)
+            if factor_set is None:
+                values = {name: float(value) for name, value in self.lookup_many(*key).items()}
+                factor_set = FactorSet(**values, region=key[0], year=key[1], version=key[2])
+                self._sets[key] = factor_set
+            return factor_set
+        return FactorSet(**self.lookup_many(region, year, version))
+
+
+_registry: Optional[FactorRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_factor_registry() -> FactorRegistry:
+    """取得排放係數表（每個程序只載入一次）"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                path = Path(os.getenv("EMISSION_FACTOR_TABLE", str(DEFAULT_TABLE_PATH)))
+                _registry = FactorRegistry.from_csv(path)
+                print(f"[Emission Factors] 已載入排放係數表: {path.name} ({len(_registry.keys)} 筆)")
+    return _registry
+
+
+def resolve_factors(region=DEFAULT_REGION, year=None, version=DEFAULT_VERSION) -> FactorSet:
+    """get_factor_registry().resolve(...) 的捷徑"""
+    return get_factor_registry().resolve(region, year, version)
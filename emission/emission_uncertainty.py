@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Emission Uncertainty (Monte Carlo)
+----------------------------------
+estimate() 只給點估計；確信機構需要區間。這裡對主要的假設抽樣（每度電價、電力係數、
+每車年里程、油耗、機車當量、冷媒逸散量），以 NumPy 一次計算整批 draws（estimate_arrays），
+回報每個範疇的 P5 / P50 / P95。
+
+- 所有分佈都以「相對於點估計的倍數」表示，P50 會落在 estimate() 的結果附近
+- 同一個 seed 得到相同的結果（報告可重現）
+- use_rule_of_thumb 時 Scope 1 = Scope 2 × 0.1，區間完全來自 Scope 2 的抽樣
+"""
+
+from dataclasses import replace
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from emission_calc import DEFAULT_FACTORS, Inputs, estimate_arrays
+from emission_factors import FactorSet
+
+DEFAULT_DRAWS = 100_000
+DEFAULT_SEED = 20240101
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+# 欄位 -> (分佈, 參數...)；倍數分佈：
+# - ("normal", sd)             -> 1 + sd·N(0,1)（截斷於 0）
+# - ("lognormal", sigma)       -> 平均為 1 的對數常態
+# - ("triangular", low, high)  -> 三角分佈，眾數為 1
+# - ("uniform", low, high)
+UNCERTAINTY_SPEC: Dict[str, Tuple] = {
+    # Inputs 欄位
+    "price_per_kwh_ntd": ("normal", 0.08),       # 時間電價 / 契約容量造成的平均電價差異
+    "refrigerant_leak_kg": ("lognormal", 0.5),    # 逸散量多為估算
+    # FactorSet 欄位
+    "grid": ("normal", 0.03),
+    "car_km_per_year": ("triangular", 0.6, 1.4),
+    "car_km_per_l": ("triangular", 0.8, 1.25),
+    "bike_eq": ("uniform", 0.6, 1.4),
+}
+
+REPORT_KEYS = ("Scope2_電力", "Scope1_車輛", "Scope1_冷媒", "Scope1_合計", "總排放_S1S2", "Scope3_小項", "總排放_含S3")
+
+
+def _multipliers(rng: np.random.Generator, dist: Tuple, draws: int) -> np.ndarray:
+    kind, *params = dist
+    if kind == "normal":
+        return np.maximum(1.0 + params[0] * rng.standard_normal(draws), 0.0)
+    if kind == "lognormal":
+        sigma = params[0]
+        return np.exp(sigma * rng.standard_normal(draws) - sigma ** 2 / 2)
+    if kind == "triangular":
+        return rng.triangular(params[0], 1.0, params[1], draws)
+    if kind == "uniform":
+        return rng.uniform(params[0], params[1], draws)
+    raise ValueError(f"未知的分佈: {kind}")
+
+
+def estimate_uncertainty(
+    inputs: Inputs,
+    factors: Optional[FactorSet] = None,
+    draws: int = DEFAULT_DRAWS,
+    seed: int = DEFAULT_SEED,
+    spec: Optional[Dict[str, Tuple]] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+) -> Dict[str, Any]:
+    """
+    Monte Carlo 不確定性區間
+
+    Args:
+        inputs / factors: 與 estimate() 相同
+        draws: 抽樣次數（一次向量化計算）
+        seed: 亂數種子
+        spec: 覆寫 UNCERTAINTY_SPEC（欄位 -> 分佈）
+
+    Returns:
+        {"Scope2_電力": {"p5": ..., "p50": ..., "p95": ...}, ..., "draws": N, "seed": seed}
+    """
+    spec = UNCERTAINTY_SPEC if spec is None else spec
+    factors = factors or DEFAULT_FACTORS
+    rng = np.random.default_rng(seed)
+
+    table = {name: np.full(draws, np.nan if value is None else float(value))
+             for name, value in vars(inputs).items() if name != "mode"}
+    table["include_scope3"] = np.full(draws, bool(inputs.include_scope3))
+    table["use_rule_of_thumb"] = np.full(draws, bool(inputs.use_rule_of_thumb))
+
+    factor_values = {}
+    # 依 spec 的順序抽樣（固定順序 -> 同一 seed 可重現）
+    for name, dist in spec.items():
+        multiplier = _multipliers(rng, dist, draws)
+        if name in table:
+            table[name] = table[name] * multiplier
+        elif hasattr(factors, name):
+            factor_values[name] = getattr(factors, name) * multiplier
+        else:
+            raise KeyError(f"不確定性設定中的未知欄位: {name}")
+
+    raw = estimate_arrays(table, replace(factors, **factor_values))
+
+    result: Dict[str, Any] = {}
+    for key in REPORT_KEYS:
+        bands = np.percentile(raw[key], percentiles)
+        result[key] = {f"p{p:g}": round(float(v), 2) for p, v in zip(percentiles, bands)}
+    result["draws"] = draws
+    result["seed"] = seed
+    return result
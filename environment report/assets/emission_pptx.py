@@ -2,7 +2,7 @@
 Emission 引擎 - PPTX 版本
 輸出：
 1. 排放表格 PPTX
-2. Pie Chart 圖片
+2. Pie Chart 圖片（環境篇投影片上預設改用原生 PPTX 圓餅圖，見 add_emission_pie_chart）
 """
 from pptx import Presentation
 from pptx.util import Inches, Pt
@@ -11,9 +11,21 @@ from pptx.enum.text import PP_ALIGN, MSO_ANCHOR
 from pptx.oxml.xmlchemy import OxmlElement
 from pptx.oxml.ns import qn
 from pathlib import Path
-import matplotlib.pyplot as plt
-import matplotlib
-matplotlib.use('Agg')  # 使用非互動式後端
+from io import BytesIO
+
+try:
+    from shared.chart_cache import cached_chart
+except ImportError:  # 單獨執行（沒有 TCFD generator/shared）時不使用快取
+    def cached_chart(data, figsize=None, dpi=None):
+        return lambda render: render
+
+try:
+    from shared.native_charts import add_pie_chart, native_charts_enabled
+except ImportError:  # 單獨執行時只能使用 matplotlib 圓餅圖
+    add_pie_chart = None
+
+    def native_charts_enabled():
+        return False
 
 # 輸出目錄
 OUTPUT_DIR = Path(__file__).parent.parent / "output"
@@ -40,46 +52,70 @@ DEFAULT_EMISSION_DATA = {
     "total": 153.45
 }
 
-# 動態數據（可由外部設定）
+# 動態數據（單獨執行時由 set_emission_data 設定；引擎改為每次呼叫傳入 emission_data，不共用這個全域變數）
 EMISSION_DATA = DEFAULT_EMISSION_DATA.copy()
 
+
+def build_emission_data(data):
+    """
+    Emission Engine 的結果 -> 表格 / 圓餅圖使用的排放數據（不修改全域狀態）
+    
+    data 為空時返回預設排放數據
+    """
+    if not data:
+        return DEFAULT_EMISSION_DATA.copy()
+    # 取得細項數據（優先使用 gasoline/refrigerant，否則用 scope1 均分）
+    s1_total = data.get("scope1", 0)
+    s1_gasoline = data.get("gasoline", s1_total * 0.5)
+    s1_refrigerant = data.get("refrigerant", s1_total * 0.5)
+    
+    s2_total = data.get("scope2", 0)
+    s2_electricity = data.get("electricity", s2_total)
+    
+    total = data.get("total", s1_total + s2_total)
+    
+    emission_data = {
+        "data_year": data.get("data_year", "2024"),
+        "unit": "tCO₂e",
+        "scope1": {
+            "gasoline": s1_gasoline,
+            "refrigerant": s1_refrigerant,
+            "subtotal": s1_total
+        },
+        "scope2": {
+            "electricity": s2_electricity,
+            "subtotal": s2_total
+        },
+        "scope3": {
+            "goods_services": 0.00,
+            "transportation": 0.00,
+            "subtotal": data.get("scope3", 0)
+        },
+        "total": total,
+        # Monte Carlo 不確定性區間（選用）：{"scope1" | "scope2" | "scope3" | "total": {"p5", "p50", "p95"}}
+        "uncertainty": data.get("uncertainty"),
+    }
+    print(f"  ✓ 已載入動態排放數據：")
+    print(f"    範疇一: {s1_total:.2f} t (汽油 {s1_gasoline:.2f}, 冷媒 {s1_refrigerant:.2f})")
+    print(f"    範疇二: {s2_total:.2f} t")
+    print(f"    總排放: {total:.2f} tCO₂e")
+    return emission_data
+
+
 def set_emission_data(data):
-    """設定動態排放數據（從 Emission Engine 傳入）"""
+    """設定模組預設的動態排放數據（單獨執行用；引擎請把 build_emission_data 的結果傳給各函數）"""
     global EMISSION_DATA
     if data:
-        # 取得細項數據（優先使用 gasoline/refrigerant，否則用 scope1 均分）
-        s1_total = data.get("scope1", 0)
-        s1_gasoline = data.get("gasoline", s1_total * 0.5)
-        s1_refrigerant = data.get("refrigerant", s1_total * 0.5)
-        
-        s2_total = data.get("scope2", 0)
-        s2_electricity = data.get("electricity", s2_total)
-        
-        total = data.get("total", s1_total + s2_total)
-        
-        EMISSION_DATA = {
-            "data_year": data.get("data_year", "2024"),
-            "unit": "tCO₂e",
-            "scope1": {
-                "gasoline": s1_gasoline,
-                "refrigerant": s1_refrigerant,
-                "subtotal": s1_total
-            },
-            "scope2": {
-                "electricity": s2_electricity,
-                "subtotal": s2_total
-            },
-            "scope3": {
-                "goods_services": 0.00,
-                "transportation": 0.00,
-                "subtotal": data.get("scope3", 0)
-            },
-            "total": total
-        }
-        print(f"  ✓ 已載入動態排放數據：")
-        print(f"    範疇一: {s1_total:.2f} t (汽油 {s1_gasoline:.2f}, 冷媒 {s1_refrigerant:.2f})")
-        print(f"    範疇二: {s2_total:.2f} t")
-        print(f"    總排放: {total:.2f} tCO₂e")
+        EMISSION_DATA = build_emission_data(data)
+
+
+def band_note(key, emission_data=None):
+    """表格備註欄的不確定性區間（沒有 Monte Carlo 結果時為空字串）"""
+    band = ((emission_data or EMISSION_DATA).get("uncertainty") or {}).get(key)
+    if not band:
+        return ""
+    # \v -> 儲存格內換行（同一段落，沿用該段落的字型設定）
+    return f"P5–P95\v{band['p5']:.2f}–{band['p95']:.2f}"
 
 
 def set_cell_fill(cell, hex_color):
@@ -93,8 +129,9 @@ def set_cell_fill(cell, hex_color):
     tcPr.append(solidFill)
 
 
-def create_emission_table_pptx(output_path=None):
-    """建立排放表格 PPTX（A4 橫向）"""
+def create_emission_table_pptx(output_path=None, emission_data=None):
+    """建立排放表格 PPTX（A4 橫向；emission_data 省略時使用模組的 EMISSION_DATA）"""
+    emission_data = emission_data or EMISSION_DATA
     prs = Presentation()
     # A4 橫向: 297mm x 210mm = 11.69" x 8.27"
     prs.slide_width = Inches(11.69)
@@ -116,7 +153,7 @@ def create_emission_table_pptx(output_path=None):
     subtitle_box = slide.shapes.add_textbox(Inches(0.3), Inches(0.8), Inches(12), Inches(0.4))
     tf2 = subtitle_box.text_frame
     p2 = tf2.paragraphs[0]
-    p2.text = f"資料年度: {EMISSION_DATA['data_year']} | 單位: {EMISSION_DATA['unit']}"
+    p2.text = f"資料年度: {emission_data['data_year']} | 單位: {emission_data['unit']}"
     p2.font.size = Pt(14)
     p2.font.name = 'Microsoft JhengHei'
     p2.alignment = PP_ALIGN.CENTER
@@ -147,13 +184,13 @@ def create_emission_table_pptx(output_path=None):
         cell.vertical_anchor = MSO_ANCHOR.MIDDLE
     
     # 資料列（使用動態數據）
-    s1_gas = EMISSION_DATA["scope1"]["gasoline"]
-    s1_ref = EMISSION_DATA["scope1"]["refrigerant"]
-    s1_sub = EMISSION_DATA["scope1"]["subtotal"]
-    s2_elec = EMISSION_DATA["scope2"]["electricity"]
-    s2_sub = EMISSION_DATA["scope2"]["subtotal"]
-    s3_sub = EMISSION_DATA["scope3"]["subtotal"]
-    total = EMISSION_DATA["total"]
+    s1_gas = emission_data["scope1"]["gasoline"]
+    s1_ref = emission_data["scope1"]["refrigerant"]
+    s1_sub = emission_data["scope1"]["subtotal"]
+    s2_elec = emission_data["scope2"]["electricity"]
+    s2_sub = emission_data["scope2"]["subtotal"]
+    s3_sub = emission_data["scope3"]["subtotal"]
+    total = emission_data["total"]
     
     # 計算占比
     s2_percent = (s2_sub / total * 100) if total > 0 else 0
@@ -161,13 +198,13 @@ def create_emission_table_pptx(output_path=None):
     data_rows = [
         ["範疇一", "汽油（公務車）", f"{s1_gas:.2f}", "估算"],
         ["", "冷媒（R-410A）", f"{s1_ref:.2f}", "維護估算"],
-        ["小計", "", f"{s1_sub:.2f}", ""],
+        ["小計", "", f"{s1_sub:.2f}", band_note("scope1", emission_data)],
         ["範疇二", "外購電力", f"{s2_elec:.2f}", f"佔總排放{s2_percent:.1f}%"],
-        ["小計", "", f"{s2_sub:.2f}", ""],
+        ["小計", "", f"{s2_sub:.2f}", band_note("scope2", emission_data)],
         ["範疇三", "採購商品與服務", "0.00", "暫未納入"],
         ["", "運輸配送", "0.00", "暫未納入"],
-        ["小計", "", f"{s3_sub:.2f}", ""],
-        ["合計", "", f"{total:.2f}", "100%"],
+        ["小計", "", f"{s3_sub:.2f}", band_note("scope3", emission_data)],
+        ["合計", "", f"{total:.2f}", "\v".join(filter(None, ["100%", band_note("total", emission_data)]))],
     ]
     
     for row_idx, row_data in enumerate(data_rows, start=1):
@@ -196,15 +233,33 @@ def create_emission_table_pptx(output_path=None):
     return output_path
 
 
-def create_emission_pie_chart(output_path=None):
-    """建立排放圓餅圖"""
+def create_emission_pie_chart(output_path=None, emission_data=None):
+    """建立排放圓餅圖（排放數據相同時直接使用快取的 PNG）"""
+    emission_data = emission_data or EMISSION_DATA
+    if output_path is None:
+        output_path = OUTPUT_DIR / "emission_pie_chart.png"
+    
+    Path(output_path).write_bytes(_render_emission_pie_chart(emission_data).getvalue())
+    
+    print(f"✓ 圓餅圖已儲存: {output_path}")
+    
+    return output_path
+
+
+@cached_chart(lambda emission_data: emission_data, figsize=(8, 6), dpi=300)
+def _render_emission_pie_chart(emission_data):
+    """以 matplotlib 繪製排放圓餅圖，返回 PNG 的 BytesIO（第一次畫圖時才載入 matplotlib）"""
+    import matplotlib
+    matplotlib.use('Agg')  # 使用非互動式後端
+    import matplotlib.pyplot as plt
+    
     # 設定中文字體
     plt.rcParams['font.sans-serif'] = ['Microsoft JhengHei', 'SimHei', 'Arial']
     plt.rcParams['axes.unicode_minus'] = False
     
-    scope1 = EMISSION_DATA["scope1"]["subtotal"]
-    scope2 = EMISSION_DATA["scope2"]["subtotal"]
-    scope3 = EMISSION_DATA["scope3"]["subtotal"]
+    scope1 = emission_data["scope1"]["subtotal"]
+    scope2 = emission_data["scope2"]["subtotal"]
+    scope3 = emission_data["scope3"]["subtotal"]
     
     labels = ["範疇一\n(直接排放)", "範疇二\n(外購電力)", "範疇三\n(其他間接)"]
     sizes = [scope1, scope2, scope3]
@@ -236,19 +291,45 @@ def create_emission_pie_chart(output_path=None):
     
     plt.tight_layout()
     
-    if output_path is None:
-        output_path = OUTPUT_DIR / "emission_pie_chart.png"
-    
-    plt.savefig(str(output_path), bbox_inches="tight", dpi=300, facecolor='white')
+    img_buffer = BytesIO()
+    plt.savefig(img_buffer, format="png", bbox_inches="tight", dpi=300, facecolor='white')
+    img_buffer.seek(0)
     plt.close()
     
-    print(f"✓ 圓餅圖已儲存: {output_path}")
-    
-    return output_path
+    return img_buffer
+
+
+def add_emission_pie_chart(slide, left, top, width, height, emission_data=None):
+    """
+    在投影片上建立排放圓餅圖
+    
+    預設為原生 PPTX 圖表（可在 PowerPoint 中編輯，只增加數 KB）；
+    CHART_BACKEND=matplotlib 或原生圖表建立失敗時，插入 matplotlib 繪製的（快取）PNG。
+    """
+    emission_data = emission_data or EMISSION_DATA
+    if native_charts_enabled():
+        try:
+            return add_pie_chart(
+                slide.shapes, left, top, width, height,
+                categories=["範疇一 (直接排放)", "範疇二 (外購電力)", "範疇三 (其他間接)"],
+                values=[
+                    emission_data["scope1"]["subtotal"],
+                    emission_data["scope2"]["subtotal"],
+                    emission_data["scope3"]["subtotal"],
+                ],
+                colors=["#6BA292", "#007A3D", "#C1C1C1"],
+                title="溫室氣體排放佔比 (tCO₂e)",
+                explode={1: 5},  # 突顯範疇二
+                number_format='0.00" t"',
+            )
+        except Exception as e:
+            print(f"  ⚠ 原生圓餅圖建立失敗，改用 matplotlib: {e}")
+    return slide.shapes.add_picture(_render_emission_pie_chart(emission_data), left, top, width, height)
 
 
-def create_emission_table_on_slide_right(slide):
+def create_emission_table_on_slide_right(slide, emission_data=None):
     """在投影片右半邊建立排放表格（縮減50%寬度，靠右對齊）"""
+    emission_data = emission_data or EMISSION_DATA
     # A4 橫向寬度
     slide_w = 11.69
     
@@ -284,13 +365,13 @@ def create_emission_table_on_slide_right(slide):
         cell.vertical_anchor = MSO_ANCHOR.MIDDLE
     
     # 資料列（使用動態數據）
-    s1_gas = EMISSION_DATA["scope1"]["gasoline"]
-    s1_ref = EMISSION_DATA["scope1"]["refrigerant"]
-    s1_sub = EMISSION_DATA["scope1"]["subtotal"]
-    s2_elec = EMISSION_DATA["scope2"]["electricity"]
-    s2_sub = EMISSION_DATA["scope2"]["subtotal"]
-    s3_sub = EMISSION_DATA["scope3"]["subtotal"]
-    total = EMISSION_DATA["total"]
+    s1_gas = emission_data["scope1"]["gasoline"]
+    s1_ref = emission_data["scope1"]["refrigerant"]
+    s1_sub = emission_data["scope1"]["subtotal"]
+    s2_elec = emission_data["scope2"]["electricity"]
+    s2_sub = emission_data["scope2"]["subtotal"]
+    s3_sub = emission_data["scope3"]["subtotal"]
+    total = emission_data["total"]
     
     # 計算占比
     s2_percent = (s2_sub / total * 100) if total > 0 else 0
@@ -298,13 +379,13 @@ def create_emission_table_on_slide_right(slide):
     data_rows = [
         ["範疇一", "汽油（公務車）", f"{s1_gas:.2f}", "估算"],
         ["", "冷媒（R-410A）", f"{s1_ref:.2f}", "維護估算"],
-        ["小計", "", f"{s1_sub:.2f}", ""],
+        ["小計", "", f"{s1_sub:.2f}", band_note("scope1", emission_data)],
         ["範疇二", "外購電力", f"{s2_elec:.2f}", f"佔總排放{s2_percent:.1f}%"],
-        ["小計", "", f"{s2_sub:.2f}", ""],
+        ["小計", "", f"{s2_sub:.2f}", band_note("scope2", emission_data)],
         ["範疇三", "採購商品與服務", "0.00", "暫未納入"],
         ["", "運輸配送", "0.00", "暫未納入"],
-        ["小計", "", f"{s3_sub:.2f}", ""],
-        ["合計", "", f"{total:.2f}", "100%"],
+        ["小計", "", f"{s3_sub:.2f}", band_note("scope3", emission_data)],
+        ["合計", "", f"{total:.2f}", "\v".join(filter(None, ["100%", band_note("total", emission_data)]))],
     ]
     
     for row_idx, row_data in enumerate(data_rows, start=1):
@@ -326,11 +407,11 @@ def create_emission_table_on_slide_right(slide):
     print("  ✓ 排放表格已插入（右半邊，縮減50%）")
 
 
-def generate_all():
+def generate_all(emission_data=None):
     """生成所有排放相關檔案"""
     print("\n[生成排放引擎輸出]")
-    table_path = create_emission_table_pptx()
-    chart_path = create_emission_pie_chart()
+    table_path = create_emission_table_pptx(emission_data=emission_data)
+    chart_path = create_emission_pie_chart(emission_data=emission_data)
     
     return {
         "table_pptx": table_path,
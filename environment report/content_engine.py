@@ -1,10 +1,18 @@
 """
 ESG 報告生成器 - 內容生成引擎（環境篇專用）
 """
-import anthropic
 import re
+import sys
+from pathlib import Path
 from config import ANTHROPIC_API_KEY, CLAUDE_MODEL
 
+# 共享模組（LLM 快取等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+from shared.llm_cache import cached_completion
+from shared.anthropic_pool import get_anthropic_client
+
 
 class ContentEngine:
     """使用 Claude 生成環境篇報告內容"""
@@ -18,7 +26,7 @@ class ContentEngine:
         
         if not test_mode and actual_api_key:
             try:
-                self.client = anthropic.Anthropic(api_key=actual_api_key)
+                self.client = get_anthropic_client(actual_api_key)
                 print(f"  ✓ ContentEngine 已初始化（API Key: {actual_api_key[:10]}...）")
             except Exception as e:
                 print(f"  ✗ ContentEngine 初始化失敗：{e}")
@@ -98,16 +106,8 @@ class ContentEngine:
             return error_msg
         
         try:
-            message = self.client.messages.create(
-                model=CLAUDE_MODEL,
-                max_tokens=max_tokens,
-                messages=[{
-                    "role": "user",
-                    "content": prompt
-                }]
-            )
+            raw_text = cached_completion(self.client, CLAUDE_MODEL, prompt, max_tokens=max_tokens)
             # ✅ 在返回前清理輸出
-            raw_text = message.content[0].text
             cleaned_text = self._clean_llm_output(raw_text)
             return cleaned_text
         except Exception as e:
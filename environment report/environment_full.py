@@ -7,11 +7,22 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.shared import OxmlElement, qn
 from pathlib import Path
 import os
-import importlib.util
+import sys
 
-from config import ENVIRONMENT_CONFIG, ENVIRONMENT_IMAGE_MAPPING, TCFD_TABLES, ASSETS_PATH
+from config import ENVIRONMENT_CONFIG, ENVIRONMENT_IMAGE_MAPPING, TCFD_TABLES, ASSETS_PATH, PAGE_CONFIGS
 from content_engine import ContentEngine
 
+# 共享模組（元件註冊表等）位於 TCFD generator/shared
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+from shared.component_registry import (
+    component_files_from_configs,
+    load_component_module,
+    warm_up_components,
+    warmup_enabled,
+)
+
 
 class EnvironmentFullEngine:
     """環境篇完整報告生成引擎"""
@@ -24,6 +35,10 @@ class EnvironmentFullEngine:
         # 設定樣式
         self._setup_styles()
 
+        # COMPONENT_WARMUP=1 -> 預先載入 PAGE_CONFIGS 中的所有表格模組（含 TCFD 表格）
+        if warmup_enabled():
+            warm_up_components(component_files_from_configs(PAGE_CONFIGS, base_dir=ASSETS_PATH))
+
     def _setup_styles(self):
         """設定文件樣式 - A4橫向，左右50%版面"""
         # 設定頁面為橫向
@@ -301,11 +316,8 @@ class EnvironmentFullEngine:
     def _add_table_to_cell(self, cell, table_file):
         """在儲存格中新增動態生成的表格（用於emission_table等簡單表格）"""
         try:
-            # 動態載入 Python 表格檔案
-            spec = importlib.util.spec_from_file_location("table_module", 
-                                                        os.path.join(ASSETS_PATH, table_file))
-            table_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(table_module)
+            # 載入 Python 表格檔案（每個程序只載入一次，依路徑與 mtime 快取）
+            table_module = load_component_module(os.path.join(ASSETS_PATH, table_file))
 
             # 先嘗試使用 create_*_in_cell 函數（用於在cell中直接生成表格）
             if hasattr(table_module, 'create_emission_table_in_cell'):
@@ -324,11 +336,8 @@ class EnvironmentFullEngine:
     def _add_external_table(self, table_file, function_name, is_first_page=False, scale_factor=0.90):
         """呼叫外部表格生成函數（用於TCFD等複雜表格）"""
         try:
-            # 動態載入 Python 表格檔案
-            spec = importlib.util.spec_from_file_location("table_module", 
-                                                        os.path.join(ASSETS_PATH, table_file))
-            table_module = importlib.util.module_from_spec(spec)
-            spec.loader.exec_module(table_module)
+            # 載入 Python 表格檔案（每個程序只載入一次，依路徑與 mtime 快取）
+            table_module = load_component_module(os.path.join(ASSETS_PATH, table_file))
 
             # 執行表格生成函數
             if hasattr(table_module, function_name):
@@ -15,13 +15,35 @@ from lxml import etree
 from config import ENVIRONMENT_CONFIG, ENVIRONMENT_IMAGE_MAPPING, TCFD_TABLES, ASSETS_PATH
 from content_engine import ContentEngine
 
-# 加入 assets 路徑
 import sys
+
+# 共享模組（媒體去重、模板快取、原生圖表等）位於 TCFD generator/shared
+# （需在載入 assets 之前加入路徑，emission_pptx 的圖表快取與原生圖表也依賴它）
+_TCFD_GENERATOR_DIR = Path(__file__).resolve().parent.parent / "TCFD generator"
+if str(_TCFD_GENERATOR_DIR) not in sys.path:
+    sys.path.append(str(_TCFD_GENERATOR_DIR))
+
+# 加入 assets 路徑
 sys.path.insert(0, str(Path(__file__).parent / "assets"))
 from TCFD_main_pptx import create_tcfd_main_slide_right
-from emission_pptx import create_emission_table_on_slide_right
+from emission_pptx import add_emission_pie_chart, build_emission_data, create_emission_table_on_slide_right
 sys.path.append(ASSETS_PATH)
 
+from shared.media_dedup import add_picture
+from shared.component_registry import get_component_attr
+from shared.template_cache import load_template
+from shared.native_charts import native_charts_enabled
+
+# TCFD 表格引擎（Step 1 產生的表格資料可直接在記憶體中繪製到環境篇投影片上）
+TCFD_TABLE_DIR = _TCFD_GENERATOR_DIR / "TCFD_Table"
+TCFD_TABLE_MODULES = {
+    "01": "tcfd_01_transformation.py",
+    "02": "tcfd_02_market.py",
+    "03": "tcfd_03_physical.py",
+    "04": "tcfd_04_temperature.py",
+    "05": "tcfd_05_resource.py",
+}
+
 # ============ SASB 產業映射 ============
 SASB_MAP = {
     # 采矿冶金
@@ -96,7 +118,7 @@ EMISSION_OUTPUT_PATH = Path(__file__).parent / "output"
 class EnvironmentPPTXEngine:
     """環境篇 PPTX 報告生成引擎"""
 
-    def __init__(self, template_path=None, test_mode=False, emission_data=None, industry="企業", tcfd_output_folder=None, emission_output_folder=None, company_profile=None, api_key=None):
+    def __init__(self, template_path=None, test_mode=False, emission_data=None, industry="企業", tcfd_output_folder=None, emission_output_folder=None, company_profile=None, api_key=None, tcfd_tables=None):
         """
         初始化引擎
         template_path: 模板檔案路徑（可選）
@@ -107,8 +129,12 @@ class EnvironmentPPTXEngine:
         emission_output_folder: Emission 輸出資料夾路徑（從 Step 2 傳入）
         company_profile: 公司規模資訊 dict（從 Step 2 傳入）
         api_key: Claude API Key
+        tcfd_tables: TCFD 表格資料 {"01": csv_lines, ...}（從 Step 1 傳入；有資料時直接繪製，不讀取 PPTX 檔案）
         """
         self.emission_data = emission_data or {}
+        # 表格 / 圓餅圖使用的排放數據（generate() 時建立，只屬於這個引擎實例）
+        self.emission_table_data = None
+        self.tcfd_tables = tcfd_tables or {}
         self.industry = industry
         self.tcfd_output_folder = tcfd_output_folder  # Step 1 的 TCFD 輸出路徑
         self.emission_output_folder = emission_output_folder  # Step 2 的 Emission 輸出路徑
@@ -124,18 +150,9 @@ class EnvironmentPPTXEngine:
                 shutil.copy(template_path, template_backup_path)
                 print(f"✓ 模板已備份至: {template_backup_path}")
             
-            self.prs = Presentation(template_path)
+            # 模板骨架（已刪除模板頁面）每個程序只建立一次，之後從記憶體複製
+            self.prs, _ = load_template(template_path, self._prepare_template, variant="empty")
             print(f"✓ 載入模板：{template_path}")
-            
-            # 刪除模板自帶的空白頁面
-            template_slide_count = len(self.prs.slides)
-            if template_slide_count > 0:
-                print(f"  ℹ 刪除模板預設頁面 ({template_slide_count} 頁)")
-                # 從後往前刪除，避免索引問題
-                for i in range(template_slide_count - 1, -1, -1):
-                    rId = self.prs.slides._sldIdLst[i].rId
-                    self.prs.part.drop_rel(rId)
-                    del self.prs.slides._sldIdLst[i]
         else:
             self.prs = Presentation()
         
@@ -170,6 +187,18 @@ class EnvironmentPPTXEngine:
         self.primary_color = RGBColor(26, 58, 46)  # 深綠色
         self.secondary_color = RGBColor(74, 124, 89)  # 淺綠色
 
+    @staticmethod
+    def _prepare_template(prs):
+        """刪除模板自帶的空白頁面（只在模板快取未命中時執行）"""
+        template_slide_count = len(prs.slides)
+        if template_slide_count > 0:
+            print(f"  ℹ 刪除模板預設頁面 ({template_slide_count} 頁)")
+            # 從後往前刪除，避免索引問題
+            for i in range(template_slide_count - 1, -1, -1):
+                rId = prs.slides._sldIdLst[i].rId
+                prs.part.drop_rel(rId)
+                del prs.slides._sldIdLst[i]
+
     def _get_blank_layout(self):
         """取得空白版面配置"""
         # 優先使用 index 6（標準空白版面）
@@ -278,13 +307,13 @@ class EnvironmentPPTXEngine:
         if os.path.exists(image_path):
             try:
                 if width and height:
-                    pic = slide.shapes.add_picture(image_path, left, top, width, height)
+                    pic = add_picture(slide.shapes, image_path, left, top, width, height)
                 elif width:
-                    pic = slide.shapes.add_picture(image_path, left, top, width=width)
+                    pic = add_picture(slide.shapes, image_path, left, top, width=width)
                 elif height:
-                    pic = slide.shapes.add_picture(image_path, left, top, height=height)
+                    pic = add_picture(slide.shapes, image_path, left, top, height=height)
                 else:
-                    pic = slide.shapes.add_picture(image_path, left, top)
+                    pic = add_picture(slide.shapes, image_path, left, top)
                 print(f"  ✓ 插入圖片：{os.path.basename(image_path)}")
                 return pic
             except Exception as e:
@@ -339,6 +368,25 @@ class EnvironmentPPTXEngine:
         
         return slide
 
+    def _create_left_chart_right_text_slide(self, title, add_chart, text_content):
+        """建立左圖表右文版面（A4 橫向，add_chart(slide, left, top, width, height) 繪製原生圖表）"""
+        slide = self._add_slide()
+        
+        # 標題
+        self._add_title(slide, title)
+        
+        # 左側圖表
+        add_chart(slide, LEFT_CONTENT_LEFT, CONTENT_TOP, CONTENT_WIDTH, CONTENT_HEIGHT)
+        
+        # 右側文字
+        self._add_text_box(slide, text_content,
+                          left=RIGHT_CONTENT_LEFT,
+                          top=CONTENT_TOP,
+                          width=CONTENT_WIDTH,
+                          height=CONTENT_HEIGHT)
+        
+        return slide
+
     def _create_left_text_right_image_slide(self, title, text_content, image_name):
         """建立左文右圖版面（A4 橫向）"""
         slide = self._add_slide()
@@ -515,6 +563,23 @@ class EnvironmentPPTXEngine:
             print(f"  ✗ 插入失敗 {title}: {e}")
             return False
 
+    def _render_tcfd_table(self, key, csv_lines, title):
+        """以 TCFD 表格引擎的 render_table 直接在新投影片上繪製表格（不經過檔案）"""
+        try:
+            render_table = get_component_attr(TCFD_TABLE_DIR / TCFD_TABLE_MODULES[key], "render_table")
+            new_slide = self._add_slide()
+            try:
+                new_slide.background.fill.solid()
+                new_slide.background.fill.fore_color.rgb = RGBColor(255, 255, 255)  # 白色
+            except:
+                pass
+            render_table(new_slide, csv_lines, self.industry)
+            print(f"  ✓ 繪製 {title}（記憶體）")
+            return True
+        except Exception as e:
+            print(f"  ✗ 繪製失敗 {title}: {e}")
+            return False
+
     def generate_tcfd_pages(self):
         """生成 TCFD 頁面（從 TCFD Generator 插入）"""
         print("\n[生成 TCFD 頁面]")
@@ -535,8 +600,8 @@ class EnvironmentPPTXEngine:
         # 右邊：氣候風險時間軸表格（縮減40%，靠右對齊）
         create_tcfd_main_slide_right(section_slide)
         
-        # 尋找 TCFD PPTX 檔案
-        tcfd_files = self._find_latest_tcfd_files()
+        # 有 Step 1 傳入的表格資料時直接繪製；否則才尋找 TCFD PPTX 檔案
+        tcfd_files = {} if self.tcfd_tables else self._find_latest_tcfd_files()
         
         tcfd_info = [
             ("01", "轉型風險分析"),
@@ -547,6 +612,11 @@ class EnvironmentPPTXEngine:
         ]
         
         for key, title in tcfd_info:
+            if self.tcfd_tables.get(key) and self._render_tcfd_table(key, self.tcfd_tables[key], title):
+                continue
+            if self.tcfd_tables and not tcfd_files:
+                # 記憶體資料不完整時，回退到檔案
+                tcfd_files = self._find_latest_tcfd_files()
             if key in tcfd_files:
                 # 插入 TCFD PPTX
                 self._insert_tcfd_pptx(tcfd_files[key], title)
@@ -741,7 +811,7 @@ class EnvironmentPPTXEngine:
         try:
             print("  ℹ 未找到 Step 2 輸出，重新生成...")
             from emission_pptx import generate_all
-            results = generate_all()
+            results = generate_all(self.emission_table_data)
             return results
         except Exception as e:
             print(f"  ⚠ Emission 引擎錯誤: {e}")
@@ -751,8 +821,8 @@ class EnvironmentPPTXEngine:
         """生成溫室氣體排放管理頁面"""
         print("\n[生成溫室氣體管理頁面]")
         
-        # 先生成 emission 引擎輸出
-        emission_results = self._generate_emission_outputs()
+        # 先生成 emission 引擎輸出（原生圓餅圖直接使用排放數據，不需要 PNG）
+        emission_results = None if native_charts_enabled() else self._generate_emission_outputs()
         
         # Page 11: 4.5 碳盤查表（左文右表）
         section_slide = self._add_slide()
@@ -768,11 +838,18 @@ class EnvironmentPPTXEngine:
                           font_size=Pt(12))
         
         # 右邊：排放表格（縮減50%，靠右對齊）
-        create_emission_table_on_slide_right(section_slide)
+        create_emission_table_on_slide_right(section_slide, self.emission_table_data)
         
         # Page 12: 電力使用與節能政策（使用 emission 圓餅圖）
         electricity_text = self.content_engine.generate_electricity_policy(self.config)
-        if emission_results and "pie_chart" in emission_results:
+        if native_charts_enabled():
+            # 原生 PPTX 圓餅圖（直接使用排放數據；CHART_BACKEND=matplotlib 時使用下方的 PNG）
+            self._create_left_chart_right_text_slide(
+                "電力使用與節能政策",
+                lambda slide, *box: add_emission_pie_chart(slide, *box, emission_data=self.emission_table_data),
+                electricity_text
+            )
+        elif emission_results and "pie_chart" in emission_results:
             # 使用 emission 生成的圓餅圖
             pie_chart_path = emission_results["pie_chart"]
             self._create_left_image_right_text_slide_full_path(
@@ -843,13 +920,12 @@ class EnvironmentPPTXEngine:
         print(f"產業：{self.industry}")
         print("="*50)
         
-        # 設定動態排放數據
-        if self.emission_data:
-            try:
-                from assets.emission_pptx import set_emission_data
-                set_emission_data(self.emission_data)
-            except Exception as e:
-                print(f"  ⚠ 無法載入動態排放數據: {e}")
+        # 設定動態排放數據（只存在這個實例，傳給表格與圓餅圖；同時生成的其他報告不受影響）
+        try:
+            self.emission_table_data = build_emission_data(self.emission_data)
+        except Exception as e:
+            print(f"  ⚠ 無法載入動態排放數據: {e}")
+            self.emission_table_data = build_emission_data(None)
         
         self.generate_cover_page()
         self.generate_policy_pages()